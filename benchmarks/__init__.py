@@ -0,0 +1 @@
+"""WhisperPen benchmarks."""
@@ -0,0 +1,63 @@
+"""文件回放音频源，用于替代 sr.Microphone 进行可复现的测试"""
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+import speech_recognition as sr
+import time
+
+
+def read_pcm16(path) -> tuple:
+    """读取音频文件为单声道 int16 数组"""
+    data, sample_rate = sf.read(str(path), dtype='int16', always_2d=True)
+    if data.shape[1] > 1:
+        return data.mean(axis=1).astype(np.int16), sample_rate
+    return data[:, 0].copy(), sample_rate
+
+
+class _ReplayStream:
+    """模拟 PyAudio 输入流的 read 接口，读到结尾后返回空字节"""
+
+    def __init__(self, frames: np.ndarray, sample_rate: int, realtime: bool):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        chunk = self.frames[self.position:self.position + size]
+        self.position += len(chunk)
+        if self.realtime and len(chunk):
+            # 按真实时间节奏回放
+            time.sleep(len(chunk) / self.sample_rate)
+        return chunk.tobytes()
+
+    def close(self):
+        pass
+
+
+class FileAudioSource(sr.AudioSource):
+    """从 WAV/FLAC 文件回放音频的 AudioSource，可直接传给 Recognizer.listen
+
+    trailing_silence 在结尾补充静音，使 listen 能像真实录音一样检测到停顿。
+    """
+
+    def __init__(self, path, chunk_size: int = 1024, realtime: bool = False, trailing_silence: float = 1.5):
+        self.path = Path(path)
+        frames, self.SAMPLE_RATE = read_pcm16(self.path)
+        silence = np.zeros(int(trailing_silence * self.SAMPLE_RATE), dtype=np.int16)
+        self.frames = np.concatenate([frames, silence])
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        self.realtime = realtime
+        self.stream = None
+
+    @property
+    def duration(self) -> float:
+        return len(self.frames) / self.SAMPLE_RATE
+
+    def __enter__(self):
+        self.stream = _ReplayStream(self.frames, self.SAMPLE_RATE, self.realtime)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
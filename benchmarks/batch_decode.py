@@ -0,0 +1,87 @@
+"""批量解码吞吐量基准测试：比较不同批大小下每秒解码的语音条数
+
+用法：
+    python -m benchmarks.batch_decode --model tiny --clips 16 --batch-sizes 1 2 4 8
+    python -m benchmarks.batch_decode --fixtures recordings/ --output batch.json
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.audio_source import read_pcm16
+from benchmarks.e2e import find_fixtures, git_commit, synthesize_fixtures, summarize
+from config.settings import WHISPER_CONFIG
+
+
+def load_clips(fixtures: list, count: int) -> list:
+    """读取音频并转换为 Whisper 输入，不足 count 条时循环复用"""
+    from src.audio_pipeline import to_whisper_input
+    clips = [to_whisper_input(*read_pcm16(path)) for path in fixtures]
+    return [clips[i % len(clips)] for i in range(count)]
+
+
+def run(model, clips: list, batch_sizes: list, repeat: int) -> list:
+    from src.batch_decoder import decode_batch
+
+    audio_seconds = sum(len(clip) for clip in clips) / 16000
+    rows = []
+    for batch_size in batch_sizes:
+        # 预热一次，排除首次调用的开销
+        decode_batch(model, clips[:batch_size], temperature=0.0)
+        batch_timings = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for i in range(0, len(clips), batch_size):
+                batch_start = time.perf_counter()
+                decode_batch(model, clips[i:i + batch_size], temperature=0.0)
+                batch_timings.append(time.perf_counter() - batch_start)
+        elapsed = time.perf_counter() - start
+        rows.append({
+            'batch_size': batch_size,
+            'utterances_per_second': len(clips) * repeat / elapsed,
+            'audio_seconds_per_second': audio_seconds * repeat / elapsed,
+            'batch_latency': summarize(batch_timings),
+        })
+        print(f"batch={batch_size:>2}  {rows[-1]['utterances_per_second']:.2f} utt/s  "
+              f"{rows[-1]['audio_seconds_per_second']:.1f} audio-s/s  "
+              f"p50 {rows[-1]['batch_latency']['p50_ms']:.0f}ms")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量解码吞吐量基准测试')
+    parser.add_argument('--model', default=WHISPER_CONFIG['fast_model'])
+    parser.add_argument('--fixtures', help='音频目录或通配符（为空时合成 2~6 秒的测试音频）')
+    parser.add_argument('--clips', type=int, default=16, help='每轮解码的语音条数')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=2)
+    parser.add_argument('--output', help='结果 JSON 文件（默认 batch_decode_<commit>.json）')
+    args = parser.parse_args()
+
+    from src.model_registry import get_registry
+    model = get_registry().get(args.model)
+
+    with tempfile.TemporaryDirectory(prefix='whisperpen-batch-') as work_dir:
+        fixtures = find_fixtures(args.fixtures) or synthesize_fixtures(
+            Path(work_dir), 16000, durations=(2.0, 3.0, 4.0, 5.0, 6.0)
+        )
+        clips = load_clips(fixtures, args.clips)
+
+    results = {
+        'commit': git_commit(),
+        'model': args.model,
+        'clips': len(clips),
+        'mean_clip_seconds': float(np.mean([len(clip) for clip in clips]) / 16000),
+        'results': run(model, clips, args.batch_sizes, args.repeat),
+    }
+    output = Path(args.output or f"batch_decode_{results['commit']}.json")
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == '__main__':
+    main()
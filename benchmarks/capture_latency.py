@@ -0,0 +1,106 @@
+"""录音打开延迟基准测试：每次录音重新打开音频源并预热 vs 从常驻采集的环形缓冲区读取
+
+用法：
+    python -m benchmarks.capture_latency
+    python -m benchmarks.capture_latency --runs 20 --microphone
+
+默认用按实时节奏回放的文件模拟麦克风；--microphone 使用真实麦克风（需要 PyAudio）。
+“开头丢失”是从发起录音到第一帧被录下之间说的话，预留（pre-roll）时为负数，表示找回了发起前的音频。
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.audio_source import FileAudioSource
+from benchmarks.e2e import git_commit, summarize
+from config.settings import AUDIO_CONFIG, CAPTURE_CONFIG
+
+
+def _noise_file(path: Path, seconds: float, sample_rate: int) -> Path:
+    rng = np.random.default_rng(0)
+    sf.write(str(path), (rng.standard_normal(int(seconds * sample_rate)) * 300).astype(np.int16), sample_rate, subtype='PCM_16')
+    return path
+
+
+def measure(handler, source_factory, runs: int, before=None) -> dict:
+    """发起录音 → 音频源就绪（打开 + 预热）→ 读到第一块音频"""
+    timings = {'open': [], 'first_chunk': []}
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        with source_factory() as source:
+            handler.quick_ambient_check(source)
+            opened = time.perf_counter()
+            source.stream.read(source.CHUNK)
+            first_chunk = time.perf_counter()
+        timings['open'].append(opened - start)
+        timings['first_chunk'].append(first_chunk - start)
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='录音打开延迟基准测试')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--microphone', action='store_true', help='使用真实麦克风，而不是实时回放的文件')
+    parser.add_argument('--output', help='结果 JSON 文件（默认 capture_latency_<commit>.json）')
+    args = parser.parse_args()
+
+    import speech_recognition as sr
+    from rich.console import Console
+    from rich.table import Table
+    from src.audio_capture import AudioCapture
+    from src.speech_handler import SpeechHandler
+
+    sample_rate = AUDIO_CONFIG['sample_rate']
+    preroll = CAPTURE_CONFIG['preroll_seconds']
+    with tempfile.TemporaryDirectory(prefix='whisperpen-capture-') as work_dir:
+        if args.microphone:
+            factory = lambda: sr.Microphone(sample_rate=sample_rate)
+            capture_factory = factory
+        else:
+            clip = _noise_file(Path(work_dir) / 'clip.wav', 2.0, sample_rate)
+            stream = _noise_file(Path(work_dir) / 'stream.wav', 3.0 * args.runs + 10, sample_rate)
+            factory = lambda: FileAudioSource(clip, realtime=True)
+            capture_factory = lambda: FileAudioSource(stream, realtime=True)
+
+        handler = SpeechHandler(source_factory=factory)
+        results = {'reopen': measure(handler, factory, args.runs)}
+
+        capture = AudioCapture(source_factory=capture_factory).start()
+        try:
+            # 先积累一段音频，供预留使用
+            time.sleep(preroll + 0.5)
+            results['ring_buffer'] = measure(handler, capture.source, args.runs)
+            results['ring_buffer_preroll'] = measure(
+                handler, capture.source, args.runs,
+                before=lambda: capture.rewind_to(capture.position - capture.seconds_to_frames(preroll)),
+            )
+        finally:
+            capture.stop()
+
+    # 开头丢失的音频：重新打开时为打开和预热的耗时，常驻采集时为 0 或负的预留时长
+    lost = {'reopen': results['reopen']['open']['p50_ms'], 'ring_buffer': 0.0, 'ring_buffer_preroll': -preroll * 1000}
+
+    table = Table(show_header=True, header_style="bold magenta", title=f"Capture latency ({'microphone' if args.microphone else 'file replay'})")
+    table.add_column("Path", style="cyan")
+    for column in ("open + warm-up p50", "first chunk p50", "audio lost at start"):
+        table.add_column(column, style="green")
+    for name, stats in results.items():
+        table.add_row(name, f"{stats['open']['p50_ms']:.1f}ms", f"{stats['first_chunk']['p50_ms']:.1f}ms", f"{lost[name]:.0f}ms")
+    Console().print(table)
+    saved = results['reopen']['first_chunk']['p50_ms'] - results['ring_buffer']['first_chunk']['p50_ms']
+    print(f"每次录音节省 {saved:.0f}ms（p50）")
+
+    output = Path(args.output or f"capture_latency_{git_commit()}.json")
+    output.write_text(json.dumps({'results': results, 'lost_ms': lost}, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""端到端延迟基准测试：回放音频文件，使用本地 Ollama 桩服务，逐阶段计时
+
+用法：
+    python -m benchmarks.e2e --output bench.json
+    python -m benchmarks.e2e --fixtures recordings/ --repeat 10 --compare bench.json
+
+未指定 --fixtures 且 benchmarks/fixtures/ 中没有音频时，会合成一组确定性的测试音频。
+"""
+from pathlib import Path
+from datetime import datetime
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from benchmarks.audio_source import FileAudioSource
+from benchmarks.stub_ollama import start_stub_server
+from config.settings import AUDIO_CONFIG, CACHE_CONFIG, OLLAMA_CONFIG, WHISPER_CONFIG
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures'
+
+STAGES = (
+    'listen',
+    'trim_silence',
+    'noise_reduction',
+    'wav_conversion',
+    'fast_decode',
+    'accurate_decode',
+    'enhance_text',
+    'save_and_copy',
+)
+
+
+def synthesize_fixtures(directory: Path, sample_rate: int, durations=(2.0, 5.0, 10.0)) -> list:
+    """合成带音节起伏的谐波信号作为测试音频（前后带静音），结果可复现"""
+    rng = np.random.default_rng(0)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for duration in durations:
+        t = np.arange(int(duration * sample_rate)) / sample_rate
+        pitch = 140.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+        # 每秒约 4 个音节
+        envelope = np.clip(np.sin(2 * np.pi * 2.0 * t), 0.0, None) ** 0.5
+        signal = 0.5 * voice / np.abs(voice).max() * envelope + 0.005 * rng.standard_normal(len(t))
+        silence = np.zeros(int(0.5 * sample_rate))
+        samples = np.concatenate([silence, signal, silence])
+        path = directory / f"synthetic_{duration:g}s.wav"
+        sf.write(str(path), (samples * 32767).astype(np.int16), sample_rate, subtype='PCM_16')
+        paths.append(path)
+    return paths
+
+
+def find_fixtures(target: str = None) -> list:
+    """收集基准测试音频"""
+    from src.batch_processor import collect_audio_files
+    if target:
+        return collect_audio_files(target)
+    return collect_audio_files(str(FIXTURE_DIR)) if FIXTURE_DIR.exists() else []
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def summarize(samples: list) -> dict:
+    """计算单个阶段的延迟分布（毫秒）"""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    if not len(values):
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'min_ms': float(values.min()),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'max_ms': float(values.max()),
+    }
+
+
+class Benchmark:
+    """逐阶段计时的端到端基准测试"""
+
+    def __init__(self, fixtures: list, work_dir: Path, stub_server):
+        # 延迟导入，先让调用方修改配置（桩服务地址、关闭缓存）
+        from src.speech_handler import SpeechHandler
+        from src.text_processor import TextProcessor
+        from src.file_handler import FileHandler
+        from src.history_store import HistoryStore
+
+        self.fixtures = fixtures
+        self.stub_server = stub_server
+        self.handler = SpeechHandler()
+        # 固定能量阈值，使 listen 的结果不依赖上一次运行
+        self.handler.recognizer.dynamic_energy_threshold = False
+        self.handler.recognizer.energy_threshold = 300
+        self.handler._ensure_models_loaded()
+        self.text_processor = TextProcessor()
+        self.history = HistoryStore(db_path=work_dir / 'history.db', markdown_file=work_dir / 'whisperpen.md')
+        self.file_handler = FileHandler(history=self.history)
+        self.timings = {stage: [] for stage in STAGES}
+        self.texts = {}
+
+    def _timed(self, stage: str, func, *args, record: bool = True, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if record:
+            self.timings[stage].append(time.perf_counter() - start)
+        return result
+
+    def run_once(self, path: Path, record: bool = True):
+        """对一个音频文件依次执行所有阶段"""
+        handler = self.handler
+        with FileAudioSource(path) as source:
+            handler.quick_ambient_check(source)
+            audio = self._timed('listen', handler.recognizer.listen, source, timeout=15, phrase_time_limit=60, record=record)
+
+        raw = np.frombuffer(audio.frame_data, dtype=np.int16)
+        trimmed = self._timed('trim_silence', handler._trim_silence, raw, audio.sample_rate, record=record)
+        # 合成音频中没有检测到语音时仍解码完整音频，保证各阶段都有数据
+        raw = raw if trimmed is None else trimmed
+        samples = self._timed('noise_reduction', handler._get_preprocessor(audio.sample_rate).process, raw, record=record)
+        whisper_input = self._timed('wav_conversion', handler._prepare_whisper_input, samples, audio.sample_rate, record=record)
+        fast = self._timed(
+            'fast_decode', handler._transcribe_with_model,
+            handler._load_model(handler.fast_model_name), whisper_input, record=record, **handler.fast_options
+        )
+        accurate = self._timed(
+            'accurate_decode', handler._transcribe_with_model,
+            handler._load_model(handler.accurate_model_name), whisper_input, record=record, **handler.accurate_options
+        )
+
+        # 识别结果为空时（如合成音频）仍用固定文本测量增强阶段
+        original = (accurate and accurate['text']) or (fast and fast['text']) or f"基准测试音频 {path.stem}"
+        enhanced = self._timed('enhance_text', self.text_processor.enhance_text, original, record=record)
+        self._timed('save_and_copy', self.file_handler.save_and_copy, original, enhanced, show=False, record=record)
+        self.texts[path.name] = {'original': original, 'enhanced': enhanced}
+
+    def run(self, repeat: int, warmup: int) -> dict:
+        for _ in range(warmup):
+            for path in self.fixtures:
+                self.run_once(path, record=False)
+        for _ in range(repeat):
+            for path in self.fixtures:
+                self.run_once(path)
+        self.history.flush()
+
+        return {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'config': {
+                'fast_model': self.handler.fast_model_name,
+                'accurate_model': self.handler.accurate_model_name,
+                'repeat': repeat,
+                'warmup': warmup,
+                'stub': dict(self.stub_server.config),
+            },
+            'fixtures': [
+                {'file': path.name, 'seconds': sf.info(str(path)).duration, **self.texts.get(path.name, {})}
+                for path in self.fixtures
+            ],
+            'stages': {stage: summarize(values) for stage, values in self.timings.items()},
+            'trim': self.handler.get_trim_stats(),
+            'decode_cpu': self.handler.get_cpu_stats(),
+        }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """按阶段对比 p50/p95，任一阶段变慢超过阈值时返回 False"""
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(show_header=True, header_style="bold magenta",
+                  title=f"{baseline.get('commit', '?')} → {current.get('commit', '?')}")
+    table.add_column("Stage", style="cyan")
+    for column in ("p50 (ms)", "Δ p50", "p95 (ms)", "Δ p95"):
+        table.add_column(column, style="green")
+
+    ok = True
+    for stage, stats in current['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if not stats.get('count') or not base or not base.get('count'):
+            continue
+        row = [stage]
+        for key in ('p50_ms', 'p95_ms'):
+            change = (stats[key] - base[key]) / max(base[key], 1e-9)
+            regressed = change > threshold
+            ok = ok and not regressed
+            style = 'red' if regressed else 'green'
+            row += [f"{stats[key]:.1f}", f"[{style}]{change:+.1%}[/{style}]"]
+        table.add_row(*row)
+    Console().print(table)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhisperPen 端到端延迟基准测试')
+    parser.add_argument('--fixtures', help='音频目录或通配符（默认 benchmarks/fixtures/，为空时合成）')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--fast-model', default=WHISPER_CONFIG['fast_model'])
+    parser.add_argument('--accurate-model', default=WHISPER_CONFIG['accurate_model'])
+    parser.add_argument('--first-token-latency', type=float, default=0.2)
+    parser.add_argument('--token-interval', type=float, default=0.02)
+    parser.add_argument('--output', help='结果 JSON 文件（默认 benchmark_<commit>.json）')
+    parser.add_argument('--compare', help='与之前的结果 JSON 对比')
+    parser.add_argument('--threshold', type=float, default=0.10, help='判定为性能回退的变慢比例')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='whisperpen-bench-') as work_dir:
+        work_dir = Path(work_dir)
+        fixtures = find_fixtures(args.fixtures) or synthesize_fixtures(work_dir / 'fixtures', AUDIO_CONFIG['sample_rate'])
+
+        server = start_stub_server(
+            models=[OLLAMA_CONFIG['model']],
+            first_token_latency=args.first_token_latency,
+            token_interval=args.token_interval,
+        )
+        # 指向桩服务，并关闭翻译缓存以测量真实的增强耗时
+        OLLAMA_CONFIG['host'] = server.url
+        CACHE_CONFIG['enabled'] = False
+        WHISPER_CONFIG['fast_model'] = args.fast_model
+        WHISPER_CONFIG['accurate_model'] = args.accurate_model
+
+        try:
+            results = Benchmark(fixtures, work_dir, server).run(args.repeat, args.warmup)
+        finally:
+            server.shutdown()
+
+    # 各模块会向标准输出打印进度，结果单独写入文件
+    output = Path(args.output or f"benchmark_{results['commit']}.json")
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""并发推理线程调度基准测试：比较各调度策略下快速识别单独运行和与精确识别并发时的延迟
+
+用法：
+    python -m benchmarks.inference_threads
+    python -m benchmarks.inference_threads --fast-model tiny --accurate-model small --repeat 5 --pin
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+
+from benchmarks.audio_source import read_pcm16
+from benchmarks.e2e import find_fixtures, git_commit, synthesize_fixtures, summarize
+from config.settings import INFERENCE_CONFIG, WHISPER_CONFIG
+
+
+def _timed_decode(handler, model, clip, options: dict, stage: str) -> float:
+    start = time.perf_counter()
+    handler._transcribe_with_model(model, clip, stage=stage, **options)
+    return time.perf_counter() - start
+
+
+def run_policy(handler, policy: str, clips: list, repeat: int, pin: bool) -> dict:
+    """在指定策略下测量：快速识别单独运行、快速与精确识别并发运行"""
+    from src.inference_scheduler import InferenceScheduler
+
+    scheduler = InferenceScheduler({**INFERENCE_CONFIG, 'policy': policy, 'pin_cores': pin})
+    scheduler.report()
+    fast_executor = scheduler.executor('fast')
+    accurate_executor = scheduler.executor('accurate')
+    fast_model = handler._load_model(handler.fast_model_name)
+    accurate_model = handler._load_model(handler.accurate_model_name)
+
+    def fast(clip):
+        return fast_executor.submit(_timed_decode, handler, fast_model, clip, handler.fast_options, 'fast_decode')
+
+    def accurate(clip):
+        return accurate_executor.submit(_timed_decode, handler, accurate_model, clip, handler.accurate_options, 'accurate_decode')
+
+    timings = {'fast_alone': [], 'fast_concurrent': [], 'accurate_concurrent': [], 'cascade_wall': []}
+    try:
+        # 预热：两个执行器的线程启动并应用角色配置
+        fast(clips[0]).result()
+        accurate(clips[0]).result()
+        # 各角色线程中实际生效的 PyTorch 线程数（核对计划是否生效）
+        import torch
+        in_effect = {
+            'fast': fast_executor.submit(torch.get_num_threads).result(),
+            'accurate': accurate_executor.submit(torch.get_num_threads).result(),
+        }
+        for _ in range(repeat):
+            for clip in clips:
+                timings['fast_alone'].append(fast(clip).result())
+
+                start = time.perf_counter()
+                future_fast, future_accurate = fast(clip), accurate(clip)
+                timings['fast_concurrent'].append(future_fast.result())
+                timings['accurate_concurrent'].append(future_accurate.result())
+                timings['cascade_wall'].append(time.perf_counter() - start)
+    finally:
+        fast_executor.shutdown()
+        accurate_executor.shutdown()
+
+    stats = {name: summarize(values) for name, values in timings.items()}
+    stats['fast_slowdown'] = stats['fast_concurrent']['p50_ms'] / stats['fast_alone']['p50_ms']
+    stats['plan'] = scheduler.plan
+    stats['threads_in_effect'] = in_effect
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='并发推理线程调度基准测试')
+    parser.add_argument('--fast-model', default=WHISPER_CONFIG['fast_model'])
+    parser.add_argument('--accurate-model', default=WHISPER_CONFIG['accurate_model'])
+    parser.add_argument('--fixtures', help='音频目录或通配符（为空时合成 3 秒和 6 秒的测试音频）')
+    parser.add_argument('--policies', nargs='+', default=['default', 'split'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pin', action='store_true', help='split 策略下将各角色绑定到不同核心')
+    parser.add_argument('--output', help='结果 JSON 文件（默认 inference_threads_<commit>.json）')
+    args = parser.parse_args()
+
+    from rich.console import Console
+    from rich.table import Table
+    from src.audio_pipeline import to_whisper_input
+    from src.inference_scheduler import available_cores
+    from src.speech_handler import SpeechHandler
+
+    WHISPER_CONFIG['fast_model'] = args.fast_model
+    WHISPER_CONFIG['accurate_model'] = args.accurate_model
+    handler = SpeechHandler()
+    handler._ensure_models_loaded()
+
+    with tempfile.TemporaryDirectory(prefix='whisperpen-threads-') as work_dir:
+        fixtures = find_fixtures(args.fixtures) or synthesize_fixtures(Path(work_dir), 16000, durations=(3.0, 6.0))
+        clips = [to_whisper_input(*read_pcm16(path)) for path in fixtures]
+
+    # default 策略不调整 nice 值，先运行，避免继承后台角色降低的优先级
+    policies = sorted(args.policies, key=lambda policy: policy != 'default')
+    results = {
+        'commit': git_commit(),
+        'cores': len(available_cores()),
+        'fast_model': args.fast_model,
+        'accurate_model': args.accurate_model,
+        'policies': {policy: run_policy(handler, policy, clips, args.repeat, args.pin) for policy in policies},
+    }
+
+    table = Table(show_header=True, header_style="bold magenta", title=f"Inference threads ({results['cores']} cores)")
+    table.add_column("Policy", style="cyan")
+    for column in ("Threads (fast/accurate)", "fast alone p50", "fast concurrent p50", "fast slowdown", "accurate p50", "cascade wall p50"):
+        table.add_column(column, style="green")
+    for policy, stats in results['policies'].items():
+        table.add_row(
+            policy,
+            f"{stats['threads_in_effect']['fast']}/{stats['threads_in_effect']['accurate']}",
+            f"{stats['fast_alone']['p50_ms']:.0f}ms",
+            f"{stats['fast_concurrent']['p50_ms']:.0f}ms",
+            f"{stats['fast_slowdown']:.2f}x",
+            f"{stats['accurate_concurrent']['p50_ms']:.0f}ms",
+            f"{stats['cascade_wall']['p50_ms']:.0f}ms",
+        )
+    Console().print(table)
+
+    output = Path(args.output or f"inference_threads_{results['commit']}.json")
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""LLM 批量请求基准测试：对比逐条请求与合并请求的调用次数和总耗时（每 100 条语音）
+
+用法：
+    python -m benchmarks.llm_batch
+    python -m benchmarks.llm_batch --utterances 100 --batch-sizes 4 8 --first-token-latency 0.3
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from benchmarks.stub_ollama import start_stub_server
+from config.settings import CACHE_CONFIG, OLLAMA_CONFIG
+
+# 用于拼接测试语句的中文片段
+_PHRASES = (
+    '今天下午三点开会', '帮我把这段话翻译一下', '这个函数的返回值不对', '明天记得提交代码',
+    '数据库连接超时了', '请检查一下日志', '我们需要重新设计接口', '这个需求优先级比较高',
+    '测试环境已经部署好了', '周五之前完成评审',
+)
+
+
+def synthesize_utterances(count: int, seed: int = 0) -> list:
+    """生成确定性的中文测试语句"""
+    rng = random.Random(seed)
+    return ['，'.join(rng.sample(_PHRASES, rng.randint(1, 3))) for _ in range(count)]
+
+
+def run(texts: list, batch_size: int) -> dict:
+    """batch_size 为 1 时逐条请求，否则每次合并 batch_size 条"""
+    from src.text_processor import TextProcessor
+
+    OLLAMA_CONFIG['max_batch_items'] = max(batch_size, 1)
+    processor = TextProcessor()
+    start = time.perf_counter()
+    # 屏蔽各模块的进度输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        if batch_size <= 1:
+            results = [processor.enhance_text(text) for text in texts]
+        else:
+            results = processor.enhance_texts(texts)
+    elapsed = time.perf_counter() - start
+    stats = processor.get_stats()
+    return {
+        'batch_size': batch_size,
+        'calls': stats['calls'],
+        'fallback_items': stats['fallback_items'],
+        'seconds': elapsed,
+        'translated': sum(1 for source, result in zip(texts, results) if result != source),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhisperPen LLM 批量请求基准测试')
+    parser.add_argument('--utterances', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8])
+    parser.add_argument('--first-token-latency', type=float, default=0.2)
+    parser.add_argument('--token-interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    from rich.console import Console
+    from rich.table import Table
+
+    server = start_stub_server(
+        models=[OLLAMA_CONFIG['model']],
+        first_token_latency=args.first_token_latency,
+        token_interval=args.token_interval,
+    )
+    OLLAMA_CONFIG['host'] = server.url
+    CACHE_CONFIG['enabled'] = False
+    texts = synthesize_utterances(args.utterances)
+
+    try:
+        rows = [run(texts, size) for size in [1] + args.batch_sizes]
+    finally:
+        server.shutdown()
+
+    per_100 = 100 / len(texts)
+    baseline = rows[0]
+    table = Table(show_header=True, header_style="bold magenta", title=f"LLM requests ({len(texts)} utterances)")
+    table.add_column("Batch size", style="cyan")
+    for column in ("Calls/100", "Wall time/100", "Saved", "Fallbacks", "Translated"):
+        table.add_column(column, style="green")
+    for row in rows:
+        table.add_row(
+            'single' if row['batch_size'] == 1 else str(row['batch_size']),
+            f"{row['calls'] * per_100:.0f}",
+            f"{row['seconds'] * per_100:.2f}s",
+            f"{1 - row['seconds'] / max(baseline['seconds'], 1e-9):.0%}",
+            str(row['fallback_items']),
+            f"{row['translated']}/{len(texts)}",
+        )
+    Console().print(table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""LLM 模型级联基准测试：对比只用大模型与“小模型优先、未通过质量检查再升级”的单条延迟
+
+用法：
+    python -m benchmarks.llm_tiers
+    python -m benchmarks.llm_tiers --utterances 100 --small-refuse-over 20 --large-first-token-latency 0.8
+
+桩服务中小模型更快，但原文超过 --small-refuse-over 个字符时拒答，用来触发升级。
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.e2e import summarize
+from benchmarks.llm_batch import synthesize_utterances
+from benchmarks.stub_ollama import start_stub_server
+from config.settings import CACHE_CONFIG, OLLAMA_CONFIG
+
+
+def run(texts: list, tiers: list) -> dict:
+    """逐条增强（交互模式的路径），记录每条的延迟和服务它的那一级"""
+    from src.text_processor import TextProcessor
+
+    OLLAMA_CONFIG['tiers'] = tiers
+    processor = TextProcessor()
+    latencies = []
+    translated = 0
+    # 屏蔽各模块的进度输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        for text in texts:
+            start = time.perf_counter()
+            result = processor.enhance_text(text)
+            latencies.append(time.perf_counter() - start)
+            translated += result != text
+    stats = processor.get_stats()
+    return {
+        'latency': summarize(latencies),
+        'seconds': sum(latencies),
+        'calls': stats['calls'],
+        'tiers': stats['tiers'],
+        'translated': translated,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhisperPen LLM 模型级联基准测试')
+    parser.add_argument('--utterances', type=int, default=100)
+    parser.add_argument('--small-first-token-latency', type=float, default=0.05)
+    parser.add_argument('--small-token-interval', type=float, default=0.005)
+    parser.add_argument('--large-first-token-latency', type=float, default=0.4)
+    parser.add_argument('--large-token-interval', type=float, default=0.03)
+    parser.add_argument('--small-refuse-over', type=int, default=20, help='小模型拒答的原文长度（字符）')
+    args = parser.parse_args()
+
+    from rich.console import Console
+    from rich.table import Table
+
+    tiers = OLLAMA_CONFIG['tiers']
+    small, large = tiers[0]['model'], tiers[-1]['model']
+    server = start_stub_server(
+        models=[small, large],
+        first_token_latency=args.large_first_token_latency,
+        token_interval=args.large_token_interval,
+        model_profiles={small: {
+            'first_token_latency': args.small_first_token_latency,
+            'token_interval': args.small_token_interval,
+            'max_source_chars': args.small_refuse_over,
+        }},
+    )
+    OLLAMA_CONFIG['host'] = server.url
+    CACHE_CONFIG['enabled'] = False
+    texts = synthesize_utterances(args.utterances)
+
+    try:
+        rows = {
+            'large only': run(texts, [{'name': 'large', 'model': large}]),
+            'tiered': run(texts, tiers),
+        }
+    finally:
+        server.shutdown()
+
+    table = Table(show_header=True, header_style="bold magenta", title=f"LLM tiers ({len(texts)} utterances)")
+    table.add_column("Config", style="cyan")
+    for column in ("p50", "p95", "Total", "Calls", "Served by tier", "Escalated", "Translated"):
+        table.add_column(column, style="green")
+    for name, row in rows.items():
+        table.add_row(
+            name,
+            f"{row['latency']['p50_ms']:.0f}ms",
+            f"{row['latency']['p95_ms']:.0f}ms",
+            f"{row['seconds']:.1f}s",
+            str(row['calls']),
+            ', '.join(f"{tier} {stats['served']}" for tier, stats in row['tiers'].items()),
+            str(sum(stats['escalated'] for stats in row['tiers'].values())),
+            f"{row['translated']}/{len(texts)}",
+        )
+    Console().print(table)
+    baseline, tiered = rows['large only'], rows['tiered']
+    print(f"级联后总耗时减少 {1 - tiered['seconds'] / max(baseline['seconds'], 1e-9):.0%}，"
+          f"p50 {baseline['latency']['p50_ms']:.0f}ms → {tiered['latency']['p50_ms']:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""CLI 启动时间回归检查：`python -m src.main --help` 必须在时间预算内完成，且不导入重量级依赖
+
+用法：
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget 0.5 --runs 10
+
+超出预算或导入了重量级模块时以非零状态退出。
+"""
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = Path(__file__).parent.parent
+
+# 启动时不应导入的模块（只在选定的运行模式中按需导入）
+HEAVY_MODULES = ('whisper', 'torch', 'scipy', 'speech_recognition', 'ollama', 'soundfile', 'pyperclip')
+
+# 默认时间预算（秒），取多次运行的中位数比较
+DEFAULT_BUDGET = 0.5
+
+
+def time_help(runs: int) -> list:
+    """多次运行 --help，返回每次的耗时"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-m', 'src.main', '--help'],
+            cwd=ROOT, check=True, stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def imported_heavy_modules() -> list:
+    """在新进程中导入 src.main，返回已被加载的重量级模块"""
+    code = (
+        'import json, sys, src.main; '
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WhisperPen CLI 启动时间检查')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='--help 的时间预算（秒）')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    heavy = imported_heavy_modules()
+    timings = time_help(args.runs)
+    median = statistics.median(timings)
+
+    print(f"--help 耗时: 中位数 {median * 1000:.0f}ms，最慢 {max(timings) * 1000:.0f}ms（预算 {args.budget * 1000:.0f}ms）")
+    failed = False
+    if heavy:
+        print(f"启动时导入了重量级模块: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget:
+        print("启动时间超出预算")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
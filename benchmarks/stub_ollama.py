@@ -0,0 +1,249 @@
+"""本地 Ollama 桩服务，实现 chat 协议的最小子集，用于测试和基准测试
+
+用法：
+    python -m benchmarks.stub_ollama --port 11435 --first-token-latency 0.5
+    python -m benchmarks.stub_ollama --models qwen2.5:3b qwen2.5:32b
+    OLLAMA_HOST=http://127.0.0.1:11435 python -m src.main
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+import argparse
+import json
+import re
+import threading
+import time
+
+DEFAULT_CONFIG = {
+    # 收到请求到返回第一个 token 的延迟（秒）
+    'first_token_latency': 0.2,
+    # 相邻 token 之间的间隔（秒）
+    'token_interval': 0.02,
+    # 模型未加载时的加载耗时（秒），模拟冷启动
+    'load_latency': 0.0,
+    # 请求未指定 keep_alive 时模型的常驻时间（秒）
+    'default_keep_alive': 300.0,
+    # 按模型名覆盖以上配置，如 {'qwen2.5:3b': {'first_token_latency': 0.05}}；
+    # 其中 max_source_chars 表示原文超过该长度时拒答，模拟小模型处理不了的输入
+    'model_profiles': {},
+}
+
+
+def parse_keep_alive(value, default: float) -> float:
+    """将 keep_alive（如 "30m"、"10s"、300、-1）转换为秒数，负数表示永久常驻"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'(-?\d+(?:\.\d+)?)([smh]?)', str(value).strip())
+    if not match:
+        return default
+    return float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+
+
+def stub_reply(prompt: str, max_source_chars: int = None) -> str:
+    """根据提示词生成确定性的英文回复"""
+    match = re.search(r'原文：(.*)', prompt, re.S)
+    source = (match.group(1) if match else prompt).strip()
+    if max_source_chars is not None and len(source) > max_source_chars:
+        return "I'm sorry, but I cannot translate this text."
+    return f"This is a stub translation of {len(source)} characters."
+
+
+def stub_batch_reply(prompt: str, max_source_chars: int = None) -> str:
+    """批量请求（format=json）：解析“输入：”后的 JSON 数组，逐项返回译文"""
+    match = re.search(r'输入：(.*)', prompt, re.S)
+    try:
+        items = json.loads(match.group(1)) if match else []
+    except ValueError:
+        items = []
+    return json.dumps({'items': [
+        {'id': item.get('id'), 'translation': stub_reply(f"原文：{item.get('text', '')}", max_source_chars)}
+        for item in items if isinstance(item, dict)
+    ]})
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({'models': [{'name': name, 'model': name} for name in self.server.models]})
+        elif self.path == '/api/ps':
+            self._send_json({'models': [{'name': name, 'model': name} for name in self.server.loaded_models()]})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path == '/api/pull':
+            request = self._read_json()
+            self.server.models.append(request.get('model') or request.get('name'))
+            self._send_json({'status': 'success'})
+            return
+        if self.path != '/api/chat':
+            self._send_json({'error': 'not found'}, status=404)
+            return
+
+        request = self._read_json()
+        self.server.request_log.append(request)
+        model = request.get('model', '')
+        if model not in self.server.models:
+            self._send_json({'error': f"model '{model}' not found"}, status=404)
+            return
+        config = self.server.profile(model)
+
+        start = time.perf_counter()
+        load_seconds = self.server.load_model(model, request.get('keep_alive'))
+
+        # 空对话只加载模型（预热）
+        if not request.get('messages'):
+            self._send_json({**self._message(request, '', done=True, start=start, eval_start=start, load_seconds=load_seconds), 'done_reason': 'load'})
+            return
+
+        prompt = request['messages'][-1]['content']
+        reply_fn = stub_batch_reply if request.get('format') == 'json' else stub_reply
+        reply = reply_fn(prompt, config.get('max_source_chars'))
+        tokens = re.findall(r'\S+\s*', reply)
+        # 与 Ollama 一致，超出 num_predict 的部分被截断
+        num_predict = (request.get('options') or {}).get('num_predict')
+        if num_predict is not None and num_predict >= 0:
+            tokens = tokens[:num_predict]
+        time.sleep(config['first_token_latency'])
+        eval_start = time.perf_counter()
+
+        if not request.get('stream', True):
+            time.sleep(config['token_interval'] * len(tokens))
+            self._send_json(self._message(request, ''.join(tokens), done=True, start=start, eval_start=eval_start,
+                                          count=len(tokens), load_seconds=load_seconds))
+            return
+
+        # 流式返回 NDJSON，每行一个 token
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(config['token_interval'])
+            self._write_chunk(self._message(request, token, done=False))
+        self._write_chunk(self._message(request, '', done=True, start=start, eval_start=eval_start,
+                                        count=len(tokens), load_seconds=load_seconds))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, payload: dict):
+        line = (json.dumps(payload) + '\n').encode('utf-8')
+        self.wfile.write(f'{len(line):x}\r\n'.encode('ascii') + line + b'\r\n')
+        self.wfile.flush()
+
+    def _message(self, request: dict, content: str, done: bool, start: float = None, eval_start: float = None,
+                 count: int = 0, load_seconds: float = 0.0) -> dict:
+        payload = {
+            'model': request.get('model', ''),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'message': {'role': 'assistant', 'content': content},
+            'done': done,
+        }
+        if done:
+            now = time.perf_counter()
+            payload.update({
+                'done_reason': 'stop',
+                'total_duration': int((now - start) * 1e9),
+                'load_duration': int(load_seconds * 1e9),
+                'eval_count': count,
+                'eval_duration': int((now - eval_start) * 1e9),
+            })
+        return payload
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, models: list, config: dict):
+        super().__init__(('127.0.0.1', port), StubOllamaHandler)
+        self.config = config
+        self.models = models
+        self.request_log = []
+        self.load_count = 0
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        # 已加载模型 -> 到期时间
+        self._loaded = {}
+        self._load_lock = threading.Lock()
+
+    def profile(self, name: str) -> dict:
+        """该模型生效的配置"""
+        return {**self.config, **self.config['model_profiles'].get(name, {})}
+
+    def loaded_models(self) -> list:
+        with self._load_lock:
+            return self._loaded_models()
+
+    def load_model(self, name: str, keep_alive=None):
+        """模型未加载时模拟加载延迟，并按 keep_alive 刷新到期时间，返回加载耗时（与 Ollama 的 load_duration 对应）"""
+        seconds = parse_keep_alive(keep_alive, self.config['default_keep_alive'])
+        start = time.perf_counter()
+        with self._load_lock:
+            if name not in self._loaded_models():
+                time.sleep(self.profile(name)['load_latency'])
+                self.load_count += 1
+            if seconds == 0:
+                self._loaded.pop(name, None)
+            else:
+                self._loaded[name] = float('inf') if seconds < 0 else time.monotonic() + seconds
+        return time.perf_counter() - start
+
+    def _loaded_models(self) -> list:
+        now = time.monotonic()
+        return [name for name, expires in self._loaded.items() if expires > now]
+
+
+def start_stub_server(port: int = 0, models: list = None, **config) -> StubOllamaServer:
+    """在后台线程启动桩服务，返回的 server.url 可作为 OLLAMA_HOST 使用"""
+    server = StubOllamaServer(port, list(models or ['qwen2.5:32b']), {**DEFAULT_CONFIG, **config})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ollama chat 协议桩服务')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--models', nargs='+', default=['qwen2.5:32b'], help='已下载的模型名')
+    parser.add_argument('--first-token-latency', type=float, default=DEFAULT_CONFIG['first_token_latency'])
+    parser.add_argument('--token-interval', type=float, default=DEFAULT_CONFIG['token_interval'])
+    parser.add_argument('--load-latency', type=float, default=DEFAULT_CONFIG['load_latency'])
+    args = parser.parse_args()
+
+    server = start_stub_server(
+        port=args.port,
+        models=args.models,
+        first_token_latency=args.first_token_latency,
+        token_interval=args.token_interval,
+        load_latency=args.load_latency,
+    )
+    print(f"Stub Ollama listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
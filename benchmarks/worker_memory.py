@@ -0,0 +1,124 @@
+"""多进程工作进程内存基准测试：各进程各自持有一份权重 vs 共享内存映射的 fp32 检查点
+
+用法：
+    python -m benchmarks.worker_memory
+    python -m benchmarks.worker_memory --model medium --workers 4
+
+private 模式下每个进程把检查点完整读入私有内存，相当于没有可用检查点时各进程自行加载模型。
+每个工作进程加载模型并完整前向一次（让全部权重页驻留），然后报告 VmRSS、RssAnon（私有）和 RssFile（文件页）。
+各进程 RSS 相加会重复计算共享页，“实际占用”按私有页之和加一份文件页估算。
+"""
+from pathlib import Path
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.e2e import git_commit
+from config.settings import BATCH_CONFIG, WHISPER_CONFIG
+
+# 工作进程中的模型、加载耗时和等待所有进程都完成前向的屏障
+_model = None
+_load_seconds = 0.0
+_barrier = None
+
+
+def _init(model_name: str, shared: bool, barrier):
+    global _model, _load_seconds, _barrier
+    import torch
+    from src.model_registry import get_registry
+
+    torch.set_num_threads(1)
+    registry = get_registry()
+    registry.use_shared_weights()
+    start = time.perf_counter()
+    if shared:
+        _model = registry.get(model_name)
+    else:
+        checkpoint, _ = registry._checkpoint_paths(registry._make_key(model_name))
+        _model = torch.load(checkpoint, map_location='cpu', weights_only=False)
+    _load_seconds = time.perf_counter() - start
+    _barrier = barrier
+
+
+def _measure() -> dict:
+    """前向一次后报告内存；等其他进程也完成，保证每个进程恰好处理一个任务"""
+    import torch
+    import whisper
+    from src.model_registry import process_memory
+
+    mel = whisper.log_mel_spectrogram(torch.zeros(whisper.audio.N_SAMPLES), _model.dims.n_mels)
+    tokens = torch.tensor([[whisper.tokenizer.get_tokenizer(_model.is_multilingual).sot]])
+    start = time.perf_counter()
+    with torch.no_grad():
+        _model(mel.unsqueeze(0), tokens)
+    forward_seconds = time.perf_counter() - start
+    memory = process_memory()
+    _barrier.wait()
+    return {**memory, 'load_seconds': _load_seconds, 'forward_seconds': forward_seconds}
+
+
+def run(model_name: str, workers: int, shared: bool) -> dict:
+    from src.model_registry import get_registry, report_worker_memory
+
+    # 先在父进程生成 fp32 检查点，两种模式下工作进程都从同一个检查点加载
+    get_registry().prepare_checkpoint(model_name, quantization='none')
+    context = multiprocessing.get_context(BATCH_CONFIG['start_method'])
+    barrier = context.Barrier(workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init, initargs=(model_name, shared, barrier)) as executor:
+        samples = [future.result() for future in [executor.submit(_measure) for _ in range(workers)]]
+
+    report_worker_memory({sample['pid']: sample for sample in samples}, shared)
+    result = {
+        'workers': samples,
+        'rss_sum_mb': sum(sample['rss'] for sample in samples),
+        'load_seconds': max(sample['load_seconds'] for sample in samples),
+        'forward_seconds': max(sample['forward_seconds'] for sample in samples),
+    }
+    if all('anon' in sample for sample in samples):
+        result['estimated_mb'] = sum(sample['anon'] for sample in samples) + max(sample['file'] for sample in samples)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多进程工作进程内存基准测试')
+    parser.add_argument('--model', default=WHISPER_CONFIG['accurate_model'])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--output', help='结果 JSON 文件（默认 worker_memory_<commit>.json）')
+    args = parser.parse_args()
+
+    from rich.console import Console
+    from rich.table import Table
+
+    results = {
+        'commit': git_commit(),
+        'model': args.model,
+        'workers': args.workers,
+        'modes': {mode: run(args.model, args.workers, mode == 'shared') for mode in ('private', 'shared')},
+    }
+
+    table = Table(show_header=True, header_style="bold magenta", title=f"Worker memory ({args.model}, {args.workers} workers)")
+    table.add_column("Weights", style="cyan")
+    for column in ("RSS sum", "Estimated actual", "Per extra worker", "Load", "Forward"):
+        table.add_column(column, style="green")
+    for mode, stats in results['modes'].items():
+        samples = stats['workers']
+        per_worker = sum(sample.get('anon', sample['rss']) for sample in samples) / len(samples)
+        table.add_row(
+            f"{mode} ({'mmap' if mode == 'shared' else 'copy per worker'})",
+            f"{stats['rss_sum_mb']:.0f}MB",
+            f"{stats['estimated_mb']:.0f}MB" if 'estimated_mb' in stats else '-',
+            f"{per_worker:.0f}MB",
+            f"{stats['load_seconds']:.1f}s",
+            f"{stats['forward_seconds']:.2f}s",
+        )
+    Console().print(table)
+
+    output = Path(args.output or f"worker_memory_{results['commit']}.json")
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,8 +18,29 @@ WHISPER_CONFIG = {
 # Ollama 配置
 OLLAMA_CONFIG = {
     'model': 'qwen2.5:32b',
+    # None 表示使用 OLLAMA_HOST 环境变量或默认地址
+    'host': None,
+    'timeout': 300,
+    # 模型在 Ollama 中的常驻时间，避免两次识别之间被卸载
+    'keep_alive': '30m',
+    # 流式响应最后一块的 load_duration 超过该值时视为冷启动（常驻模型只有几毫秒）
+    'cold_load_seconds': 0.05,
+    # 输出 token 上限按输入长度估算（num_predict = base + per_char * 字数，限制在 min~max 之间）
+    'token_budget': {
+        'base': 32,
+        'per_char': 1.5,
+        'min': 64,
+        'max': 2048,
+    },
+    # 多条待增强文本合并为一次请求时的最大条数
+    'max_batch_items': 8,
+    # 模型级联：按顺序尝试，文本超出某一级的长度或分句数限制时跳过该级；
+    # 结果未通过质量检查（长度比、中文残留、拒答）时升级到下一级。最后一级通常与 model 相同
+    'tiers': [
+        {'name': 'small', 'model': 'qwen2.5:3b', 'max_chars': 40, 'max_clauses': 2},
+        {'name': 'large', 'model': 'qwen2.5:32b'},
+    ],
     'options': {
-        'num_predict': 100,
         'top_k': 50,
         'top_p': 0.95,
         'repeat_penalty': 1.1,
@@ -43,4 +64,200 @@ FILE_CONFIG = {
     'output_file': 'whisperpen.md',
     'config_file': CACHE_DIR / 'config.json',
     'model_cache': CACHE_DIR / 'models',
-} 
\ No newline at end of file
+} 
+
+# 批量转写配置
+BATCH_CONFIG = {
+    'workers': 2,
+    'start_method': 'spawn',
+    'extensions': ('.wav', '.flac'),
+    'output_file': 'whisperpen_batch.jsonl',
+}
+
+# 唤醒词检测配置
+WAKE_CONFIG = {
+    'wake_phrase': '小王小王',
+    'model': 'tiny',
+    # 第一级：帧能量门限
+    'energy': {
+        'frame_ms': 20,
+        'hop_ms': 10,
+        'margin_db': 10.0,
+        'min_level_db': -50.0,
+        'min_speech_seconds': 0.4,
+    },
+    # 第二级：频谱关键词模板匹配
+    'keyword': {
+        'n_bands': 24,
+        'max_distance': 0.6,
+        # 距离在 max_distance 与该值之间时不确定，仍交给 Whisper 确认
+        'uncertain_distance': 0.9,
+        # 连续被模板拒绝该次数后，下一个多音节片段交给 Whisper（防止模板不适用时永远无法唤醒）
+        'fallback_every': 20,
+        'min_syllables': 2,
+        'max_templates': 5,
+        'template_dir': CACHE_DIR / 'wake_templates',
+    },
+}
+
+# 模型注册表配置
+MODEL_CONFIG = {
+    'cache_dir': CACHE_DIR / 'model_cache',
+    # 所有常驻模型的内存上限，超出时按 LRU 淘汰
+    'memory_cap_mb': 3072,
+    # 校验量化检查点的内容哈希（文件大小或修改时间变化时才重新计算）
+    'verify_checkpoint': True,
+    # 多进程工作进程（批量转写、长录音）的模型权重：
+    # shared 为工作进程以只读内存映射方式加载 fp32 检查点，权重页在进程间共享；
+    # private 为使用默认的量化检查点（其中重新打包的量化权重加载时会复制到各进程的私有内存）
+    'worker_weights': 'shared',
+    # fp32 权重约为 int8 的 3 倍（medium 约 3GB 对 1GB），工作进程数不少于该值时共享才更省内存
+    'shared_weights_min_workers': 4,
+}
+
+# 快速/精确识别级联配置
+CASCADE_CONFIG = {
+    # 快速识别结果的采纳门限（基于 Whisper 分段置信度）
+    'min_avg_logprob': -0.5,
+    'max_no_speech_prob': 0.6,
+    'max_compression_ratio': 2.4,
+    # 等待各路径结果的超时（秒）
+    'fast_timeout': 3,
+    'accurate_timeout': 10,
+}
+
+# 流式转写配置
+STREAM_CONFIG = {
+    # 录音过程中每隔多少秒用快速模型解码一次
+    'step_seconds': 1.0,
+    # 单次解码窗口的最大长度，超过后提交已稳定的分段
+    'max_window_seconds': 10.0,
+    # 窗口末尾视为未稳定、不提交的长度
+    'tail_seconds': 3.0,
+    'timeout': 15,
+    'phrase_time_limit': 60,
+}
+
+# 翻译缓存配置
+CACHE_CONFIG = {
+    'enabled': True,
+    'db_path': CACHE_DIR / 'translations.db',
+    # 内存 LRU 条目数
+    'memory_entries': 256,
+    # 磁盘条目上限，超出时淘汰最久未使用的条目
+    'max_entries': 10000,
+    'ttl_seconds': 30 * 24 * 3600,
+}
+
+# 持续模式流水线配置
+PIPELINE_CONFIG = {
+    # 各级之间队列的容量，队列满时上游阻塞（背压）
+    'queue_size': 4,
+    'listen_timeout': 15,
+    'phrase_time_limit': 60,
+}
+
+# 历史记录配置
+HISTORY_CONFIG = {
+    'db_path': CACHE_DIR / 'history.db',
+    # Markdown 镜像文件（当前目录），设为 None 则只写数据库
+    'markdown_file': 'whisperpen.md',
+    # 后台写入线程每批最多写入的条数和最长等待时间（秒）
+    'batch_size': 64,
+    'flush_interval': 0.5,
+    'search_limit': 20,
+}
+
+# 埋点配置
+TELEMETRY_CONFIG = {
+    # Prometheus 指标名前缀
+    'prefix': 'whisperpen',
+    'metrics_host': '127.0.0.1',
+    # 耗时直方图的桶边界（秒）
+    'buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+}
+
+# 多条语音批量解码配置
+BATCH_DECODE_CONFIG = {
+    # 单批最多解码的语音条数
+    'max_batch_size': 8,
+    # 超过 Whisper 单个窗口（30 秒）的语音不参与批量解码
+    'max_audio_seconds': 30.0,
+    # 一批解码的延迟上限（秒），据此自适应调整批大小
+    'deadline_seconds': 3.0,
+    # 单条解码耗时的指数滑动平均系数
+    'ema_alpha': 0.3,
+}
+
+# 长录音转写配置
+INGEST_CONFIG = {
+    # 每次从文件读取的时长（秒）
+    'block_seconds': 1.0,
+    # VAD 帧长（毫秒）
+    'hop_ms': 10,
+    # 高于噪声基底多少 dB 视为语音
+    'margin_db': 10,
+    'min_level_db': -50,
+    # 停顿超过该时长时切分
+    'min_silence_seconds': 0.5,
+    # 短于该时长的片段视为噪声丢弃
+    'min_speech_seconds': 0.3,
+    # 片段最大时长，需小于 Whisper 的 30 秒窗口
+    'max_segment_seconds': 28.0,
+    # 片段前后保留的静音（秒）
+    'pad_seconds': 0.2,
+    'workers': 2,
+    # 同时处理的片段数上限，None 表示工作进程数的 2 倍
+    'max_in_flight': None,
+}
+
+# 常驻服务配置（serve 子命令与 src.client）
+SERVER_CONFIG = {
+    # Unix 域套接字路径
+    'socket_path': CACHE_DIR / 'whisperpen.sock',
+    # 单条请求（一行 JSON）的最大字节数，transcribe_buffer 的音频以 base64 传输
+    'max_request_bytes': 64 * 1024 * 1024,
+    # 客户端等待响应的超时（秒），record 请求包含录音时间
+    'client_timeout': 300,
+}
+
+# 并发推理线程调度配置
+INFERENCE_CONFIG = {
+    # 'default'：沿用 PyTorch 默认线程数（每个模型都使用全部核心）
+    # 'split'：进程级线程数按并发解码切分核心，快速识别靠调度优先级优先
+    'policy': 'split',
+    # 每个解码使用的核心比例和上限（PyTorch 线程数是进程级的，快速和精确识别并发时各用一份）
+    'thread_share': 0.5,
+    'max_threads': 8,
+    # 绑定核心时唤醒检测使用的核心数
+    'wake_cores': 1,
+    # 是否将各角色绑定到不同的核心（仅 Linux）
+    'pin_cores': False,
+    # 后台角色（精确识别、唤醒检测）的 nice 值增量，0 表示不调整
+    'background_nice': 5,
+}
+
+# 常驻音频采集配置（唤醒检测和语音识别共享一个麦克风流）
+CAPTURE_CONFIG = {
+    'enabled': True,
+    # 环形缓冲区长度（秒），需大于单句录音的最长时长
+    'buffer_seconds': 90.0,
+    # 唤醒后命令录音从唤醒词结束处向前多保留的时长（秒）
+    'preroll_seconds': 0.3,
+    # 等待音频设备打开的超时（秒）
+    'open_timeout': 5.0,
+}
+
+# 识别前的静音裁剪配置
+TRIM_CONFIG = {
+    'enabled': True,
+    'frame_ms': 20,
+    'hop_ms': 10,
+    # 高于本段音频噪声基底（第 10 百分位帧能量）多少 dB 视为语音
+    'margin_db': 10,
+    'min_level_db': -50,
+    # 语音帧总时长低于该值时视为没有语音，跳过识别和增强
+    'min_speech_seconds': 0.15,
+    # 语音前后保留的时长（秒）
+    'pad_seconds': 0.2,
+}
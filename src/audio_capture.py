@@ -0,0 +1,197 @@
+import speech_recognition as sr
+from rich.console import Console
+import numpy as np
+import threading
+
+from src.telemetry import get_telemetry
+from config.settings import AUDIO_CONFIG, CAPTURE_CONFIG
+
+console = Console()
+
+
+class AudioCapture:
+    """常驻采集线程：麦克风只打开一次，音频写入固定大小的 int16 环形缓冲区
+
+    唤醒检测和语音识别各自持有读取位置（按采集开始以来的总帧数计），从同一个缓冲区读取，
+    不再为每次录音重新打开麦克风和预热，也可以从过去的某个位置（如唤醒词结束处）开始读取。
+    """
+
+    def __init__(self, source_factory=None, config: dict = None):
+        self.config = config or CAPTURE_CONFIG
+        self.source_factory = source_factory or (lambda: sr.Microphone(sample_rate=AUDIO_CONFIG['sample_rate']))
+        self.telemetry = get_telemetry()
+        self.sample_rate = None
+        self.chunk = None
+        self.capacity = 0
+        self.buffer = None
+
+        # 已写入的总帧数，以及正在写入的区间终点（读取方据此判断数据是否已被覆盖）
+        self._written = 0
+        self._writing_to = 0
+        self._condition = threading.Condition()
+        self._opened = threading.Event()
+        self._stopped = threading.Event()
+        self._error = None
+        self._next_start = None
+        self._thread = None
+
+    def start(self) -> 'AudioCapture':
+        """启动采集线程，等待音频设备打开"""
+        self._thread = threading.Thread(target=self._run, name='whisperpen-capture', daemon=True)
+        self._thread.start()
+        if not self._opened.wait(self.config['open_timeout']) or self._error:
+            self.stop()
+            raise Exception(f"打开音频设备失败: {self._error or '超时'}")
+        console.print(f"[blue]音频采集已启动（缓冲 {self.config['buffer_seconds']:g}s）[/blue]")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def _run(self):
+        try:
+            with self.source_factory() as source:
+                if source.SAMPLE_WIDTH != 2:
+                    raise Exception("只支持 16 位采样")
+                self.sample_rate = source.SAMPLE_RATE
+                self.chunk = source.CHUNK
+                self.capacity = int(self.config['buffer_seconds'] * self.sample_rate)
+                self.buffer = np.zeros(self.capacity, dtype=np.int16)
+                self._opened.set()
+                while not self._stopped.is_set():
+                    data = source.stream.read(self.chunk)
+                    if not data:
+                        break
+                    self._write(np.frombuffer(data, dtype=np.int16))
+        except Exception as e:
+            self._error = str(e)
+            if self._opened.is_set():
+                console.print(f"[red]音频采集错误: {str(e)}[/red]")
+        finally:
+            self._opened.set()
+            self.stop()
+
+    def _write(self, frames: np.ndarray):
+        frames = frames[-self.capacity:]
+        count = len(frames)
+        with self._condition:
+            start = self._written
+            self._writing_to = start + count
+        index = start % self.capacity
+        first = min(count, self.capacity - index)
+        self.buffer[index:index + first] = frames[:first]
+        self.buffer[:count - first] = frames[first:]
+        with self._condition:
+            self._written = start + count
+            self._condition.notify_all()
+
+    @property
+    def position(self) -> int:
+        """当前写入位置（采集开始以来的总帧数）"""
+        with self._condition:
+            return self._written
+
+    def seconds_to_frames(self, seconds: float) -> int:
+        return int(seconds * self.sample_rate)
+
+    def read(self, position: int, count: int) -> tuple:
+        """从 position 读取 count 帧，数据不足时阻塞等待
+
+        返回 (bytes, 新位置)。读取落后超过缓冲区长度时跳到最早的可用数据。
+        采集结束后返回剩余数据，没有数据时返回空字节。
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._written >= position + count or self._stopped.is_set())
+            # 正在写入的区间会覆盖最早的数据
+            oldest = self._writing_to - self.capacity
+            if position < oldest:
+                self.telemetry.increment('capture_overruns_total')
+                position = oldest
+            end = min(position + count, self._written)
+        if end <= position:
+            return b'', position
+
+        # 直接从环形缓冲区复制到返回的字节串（speech_recognition 需要 bytes）
+        index = position % self.capacity
+        first = min(end - position, self.capacity - index)
+        data = self.buffer[index:index + first].tobytes()
+        if first < end - position:
+            data += self.buffer[:end - position - first].tobytes()
+
+        # 复制期间被覆盖时重新读取
+        with self._condition:
+            overwritten = position < self._writing_to - self.capacity
+        if overwritten:
+            return self.read(position, count)
+        return data, end
+
+    def find_phrase_start(self, frame_data: bytes, end: int, max_trailing: int):
+        """找到一段已读取的音频（Recognizer.listen 返回的 AudioData）在采集时间轴上的起点
+
+        listen 读到 end 后返回，但会丢掉末尾多读的若干块静音，丢掉的块数取决于动态能量门限，
+        因此在 end 之前按块向前比较缓冲区内容来定位。找不到或数据已被覆盖时返回 None。
+        """
+        frames = len(frame_data) // 2
+        for trailing in range(0, max_trailing + 1, self.chunk):
+            start = end - trailing - frames
+            with self._condition:
+                if start < 0 or start < self._writing_to - self.capacity:
+                    return None
+            data, _ = self.read(start, frames)
+            if data == frame_data:
+                return start
+        return None
+
+    def rewind_to(self, position: int):
+        """下一个打开的读取源从 position 开始（如唤醒词结束处），而不是当前位置"""
+        with self._condition:
+            self._next_start = position
+
+    def source(self) -> 'RingBufferSource':
+        """创建一个读取源，可直接传给 Recognizer.listen，用法与 sr.Microphone 相同"""
+        with self._condition:
+            start, self._next_start = self._next_start, None
+        return RingBufferSource(self, start)
+
+
+class _RingStream:
+    """模拟 PyAudio 输入流的 read 接口，从环形缓冲区按位置读取"""
+
+    def __init__(self, capture: AudioCapture, position: int):
+        self.capture = capture
+        self.position = position
+
+    def read(self, size: int) -> bytes:
+        data, self.position = self.capture.read(self.position, size)
+        return data
+
+    def close(self):
+        pass
+
+
+class RingBufferSource(sr.AudioSource):
+    """从常驻采集的环形缓冲区读取的 AudioSource，进入时无需打开设备或预热"""
+
+    # 音频设备已处于稳定状态，不需要丢弃开头的音频
+    warm = True
+
+    def __init__(self, capture: AudioCapture, start: int = None):
+        self.capture = capture
+        self.start = start
+        self.SAMPLE_RATE = capture.sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = capture.chunk
+        self.stream = None
+
+    def __enter__(self):
+        position = self.capture.position
+        if self.start is not None:
+            # 不早于缓冲区中最早的数据
+            position = max(self.start, position - self.capture.capacity)
+        self.stream = _RingStream(self.capture, position)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
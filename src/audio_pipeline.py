@@ -0,0 +1,130 @@
+import numpy as np
+from functools import lru_cache
+from math import gcd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import butter, resample_poly, sosfilt
+
+from config.settings import AUDIO_CONFIG
+
+# Whisper 模型要求的输入采样率
+WHISPER_SAMPLE_RATE = 16000
+
+
+def pcm_to_float32(samples: np.ndarray) -> np.ndarray:
+    """将 int16 PCM 缩放为 [-1, 1] 的 float32，已是浮点数组时不复制"""
+    if samples.dtype == np.int16:
+        return np.multiply(samples, 1.0 / 32768.0, dtype=np.float32)
+    return samples.astype(np.float32, copy=False)
+
+
+@lru_cache(maxsize=16)
+def _design_bandpass(sample_rate: int, low_freq: float, high_freq: float, order: int) -> np.ndarray:
+    """设计带通滤波器并缓存 SOS 系数"""
+    # 高频截止必须低于奈奎斯特频率
+    high_freq = min(high_freq, sample_rate * 0.49)
+    sos = butter(order, [low_freq, high_freq], btype='band', fs=sample_rate, output='sos')
+    return sos.astype(np.float32)
+
+
+class AudioPreprocessor:
+    """可复用的流式降噪处理器（带通滤波 + 归一化）
+
+    process 不读写实例状态，可被多个线程同时调用；process_chunk 的滤波器状态属于实例，
+    逐块处理的调用方需要各自持有一个实例。
+    """
+
+    def __init__(self, sample_rate: int = None, config: dict = None):
+        config = config or AUDIO_CONFIG
+        noise_config = config['noise_reduction']
+        self.sample_rate = sample_rate or config['sample_rate']
+        self.sos = _design_bandpass(
+            self.sample_rate,
+            noise_config['low_freq'],
+            noise_config['high_freq'],
+            noise_config['filter_order'],
+        )
+        self.reset()
+
+    def reset(self):
+        """清空滤波器状态，开始新的一段音频"""
+        self._zi = np.zeros((self.sos.shape[0], 2), dtype=np.float32)
+
+    def process_chunk(self, chunk: np.ndarray) -> np.ndarray:
+        """处理一个音频块，滤波器状态延续到下一个块，可在录音过程中逐块调用"""
+        filtered, self._zi = sosfilt(self.sos, pcm_to_float32(chunk), zi=self._zi)
+        return filtered
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """处理一段完整的音频：滤波后原地峰值归一化（使用局部的滤波器状态）"""
+        zi = np.zeros((self.sos.shape[0], 2), dtype=np.float32)
+        filtered, _ = sosfilt(self.sos, pcm_to_float32(samples), zi=zi)
+        return normalize_peak(filtered)
+
+
+def normalize_peak(samples: np.ndarray) -> np.ndarray:
+    """原地峰值归一化，静音时保持不变"""
+    peak = np.max(np.abs(samples)) if samples.size else 0.0
+    if peak > 1e-6:
+        samples *= 1.0 / peak
+    return samples
+
+
+def to_whisper_input(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """将采集到的音频转换为 Whisper 可直接使用的 16kHz float32 数组"""
+    samples = pcm_to_float32(samples)
+
+    if sample_rate == WHISPER_SAMPLE_RATE:
+        return samples
+
+    # 多相重采样（44100 -> 16000 即上采样 160、下采样 441）
+    divisor = gcd(WHISPER_SAMPLE_RATE, sample_rate)
+    return resample_poly(
+        samples,
+        WHISPER_SAMPLE_RATE // divisor,
+        sample_rate // divisor,
+    ).astype(np.float32, copy=False)
+
+
+def frame_signal(samples: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """将音频切分为重叠的帧（零拷贝视图）"""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    return sliding_window_view(samples, frame_length)[::hop_length]
+
+
+def frame_energy_db(samples: np.ndarray, sample_rate: int, frame_ms: float = 20.0, hop_ms: float = 10.0) -> np.ndarray:
+    """计算逐帧能量（dBFS），输入为 [-1, 1] 的 float32 数组"""
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    hop_length = max(1, int(sample_rate * hop_ms / 1000))
+    frames = frame_signal(samples, frame_length, hop_length)
+    power = np.einsum('ij,ij->i', frames, frames) / frame_length
+    return 10.0 * np.log10(power + 1e-10)
+
+
+def speech_bounds(samples: np.ndarray, sample_rate: int, config: dict) -> tuple:
+    """按帧能量找出语音的起止位置（含前后保留），没有语音时返回 None
+
+    阈值取本段音频的噪声基底（第 10 百分位帧能量）加 margin_db，且不低于 min_level_db，
+    只裁剪首尾的静音，中间的停顿保持不变。输入为 [-1, 1] 的 float32 数组。
+
+    整段都是持续的响亮语音时噪声基底就是语音本身，没有帧能高出 margin_db；
+    此时只要基底高于 min_level_db 就视为整段都是语音，不裁剪。
+    """
+    if not len(samples):
+        return None
+    frame_length = max(1, int(sample_rate * config['frame_ms'] / 1000))
+    hop_length = max(1, int(sample_rate * config['hop_ms'] / 1000))
+    energy = frame_energy_db(samples, sample_rate, config['frame_ms'], config['hop_ms'])
+
+    floor = float(np.percentile(energy, 10))
+    threshold = max(floor + config['margin_db'], config['min_level_db'])
+    speech_frames = np.flatnonzero(energy > threshold)
+    if len(speech_frames) * config['hop_ms'] / 1000 < config['min_speech_seconds']:
+        if floor > config['min_level_db'] and len(samples) / sample_rate >= config['min_speech_seconds']:
+            return 0, len(samples)
+        return None
+
+    pad = int(config['pad_seconds'] * sample_rate)
+    start = max(0, int(speech_frames[0]) * hop_length - pad)
+    end = min(len(samples), int(speech_frames[-1]) * hop_length + frame_length + pad)
+    return start, end
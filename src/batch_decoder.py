@@ -0,0 +1,102 @@
+import numpy as np
+import threading
+import time
+import warnings
+
+from src.audio_pipeline import WHISPER_SAMPLE_RATE
+from src.model_registry import get_registry
+from src.telemetry import get_telemetry
+from config.settings import BATCH_DECODE_CONFIG
+
+
+def decode_batch(model, samples_list: list, **options) -> list:
+    """将多条语音的 log-mel 频谱堆叠为一个批次，一次前向计算完成编码和解码
+
+    每条语音必须不超过 30 秒（Whisper 单个窗口）。返回与
+    SpeechHandler._transcribe_with_model 相同格式的结果列表。
+    """
+    import torch
+    import whisper
+
+    start = time.perf_counter()
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(samples), n_mels=model.dims.n_mels)
+        for samples in samples_list
+    ]).to(model.device)
+
+    decoding_options = whisper.DecodingOptions(
+        task='transcribe',
+        language='zh',
+        without_timestamps=True,
+        fp16=model.device.type == 'cuda',
+        **options,
+    )
+    with warnings.catch_warnings(), torch.no_grad(), get_registry().inference_lock(model):
+        warnings.filterwarnings("ignore", category=UserWarning)
+        decoded = whisper.decode(model, mel, decoding_options)
+
+    seconds = time.perf_counter() - start
+    results = []
+    for samples, result in zip(samples_list, decoded):
+        text = result.text.strip()
+        # 没有时间戳时，整条语音作为一个分段
+        segment = {
+            'start': 0.0,
+            'end': len(samples) / WHISPER_SAMPLE_RATE,
+            'text': text,
+            'tokens': result.tokens,
+            'avg_logprob': result.avg_logprob,
+            'no_speech_prob': result.no_speech_prob,
+            'compression_ratio': result.compression_ratio,
+        }
+        results.append({
+            'text': text,
+            # 批次耗时按条数平摊
+            'seconds': seconds / len(samples_list),
+            'segments': [segment],
+            'avg_logprob': result.avg_logprob,
+            'no_speech_prob': result.no_speech_prob,
+            'compression_ratio': result.compression_ratio,
+        })
+    return results
+
+
+class BatchDecoder:
+    """按积压的语音条数和延迟上限自适应选择批大小的批量解码器"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or BATCH_DECODE_CONFIG
+        self.telemetry = get_telemetry()
+        # 单条语音的平均解码耗时（指数滑动平均），尚无观测时为 None
+        self.item_seconds = None
+        self._lock = threading.Lock()
+
+    def can_batch(self, samples: np.ndarray) -> bool:
+        """只有不超过单个 Whisper 窗口的语音可以批量解码"""
+        return len(samples) <= self.config['max_audio_seconds'] * WHISPER_SAMPLE_RATE
+
+    def choose_batch_size(self, pending: int) -> int:
+        """批大小不超过积压条数，并使预计的批次耗时不超过延迟上限"""
+        size = max(1, min(pending, self.config['max_batch_size']))
+        with self._lock:
+            item_seconds = self.item_seconds
+        if item_seconds:
+            size = min(size, max(1, int(self.config['deadline_seconds'] / item_seconds)))
+        return size
+
+    def decode(self, model, samples_list: list, **options) -> list:
+        """批量解码并更新单条耗时的滑动平均"""
+        start = time.perf_counter()
+        with self.telemetry.span('batch_decode', batch_size=len(samples_list)):
+            results = decode_batch(model, samples_list, **options)
+        item_seconds = (time.perf_counter() - start) / len(samples_list)
+
+        alpha = self.config['ema_alpha']
+        with self._lock:
+            if self.item_seconds is None:
+                self.item_seconds = item_seconds
+            else:
+                self.item_seconds = alpha * item_seconds + (1 - alpha) * self.item_seconds
+        self.telemetry.increment('batch_decodes_total')
+        self.telemetry.increment('batch_decoded_utterances_total', len(samples_list))
+        return results
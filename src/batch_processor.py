@@ -0,0 +1,159 @@
+from rich.console import Console
+from rich.table import Table
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import multiprocessing
+import glob
+import json
+import math
+import os
+import time
+
+from config.settings import BATCH_CONFIG, BATCH_DECODE_CONFIG, WHISPER_CONFIG
+
+console = Console()
+
+# 每个工作进程各自持有的处理器实例
+_speech_handler = None
+_text_processor = None
+
+
+def _init_worker(threads_per_worker: int, shared_weights: bool = False):
+    """工作进程初始化：加载模型，限制每个进程的推理线程数"""
+    global _speech_handler, _text_processor
+    from src.inference_scheduler import set_process_threads
+    from src.model_registry import get_registry
+    from src.speech_handler import SpeechHandler
+    from src.text_processor import TextProcessor
+
+    # 避免多个进程争抢全部 CPU 核心；推理调度器沿用这一预算
+    set_process_threads(threads_per_worker)
+    if shared_weights:
+        get_registry().use_shared_weights()
+
+    _speech_handler = SpeechHandler()
+    _speech_handler._ensure_models_loaded()
+    _text_processor = TextProcessor()
+
+
+def _process_files(file_paths: list) -> tuple:
+    """在工作进程中批量转写一组文件，再合并为一次批量请求增强
+
+    返回 (结果列表, 当前进程的内存占用)。
+    """
+    from src.model_registry import process_memory
+
+    start = time.perf_counter()
+    results = _speech_handler.transcribe_files(file_paths)
+    # 没有语音的文件不需要增强
+    transcribed = [result for result in results if not isinstance(result, Exception) and result['type'] != 'skipped']
+    enhanced_texts = iter(_text_processor.enhance_texts([result['original'] for result in transcribed]))
+    records = []
+    for file_path, result in zip(file_paths, results):
+        if isinstance(result, Exception):
+            records.append({
+                'file': file_path,
+                'duration': 0.0,
+                'error': str(result),
+                'elapsed': time.perf_counter() - start,
+            })
+            continue
+        records.append({
+            'file': file_path,
+            'duration': result['duration'],
+            'type': result['type'],
+            'original': result['original'],
+            'enhanced': next(enhanced_texts) if result['type'] != 'skipped' else '',
+            'elapsed': time.perf_counter() - start,
+        })
+    return records, process_memory()
+
+
+def collect_audio_files(target: str) -> list:
+    """根据目录或通配符收集待处理的音频文件"""
+    extensions = BATCH_CONFIG['extensions']
+    path = Path(target)
+    if path.is_dir():
+        candidates = path.rglob('*')
+    else:
+        candidates = (Path(p) for p in glob.glob(target, recursive=True))
+    return sorted(p for p in candidates if p.is_file() and p.suffix.lower() in extensions)
+
+
+class BatchProcessor:
+    def __init__(self, workers: int = None, output_file: str = None, decode_batch_size: int = None):
+        self.workers = workers or BATCH_CONFIG['workers']
+        self.output_file = Path(output_file or BATCH_CONFIG['output_file'])
+        self.decode_batch_size = decode_batch_size or BATCH_DECODE_CONFIG['max_batch_size']
+
+    def run(self, target: str) -> dict:
+        """使用进程池批量转写，结果逐条写入 JSONL 文件"""
+        files = collect_audio_files(target)
+        if not files:
+            raise Exception(f"未找到音频文件: {target}")
+
+        workers = min(self.workers, len(files))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context(BATCH_CONFIG['start_method'])
+        # 每个任务包含一组文件，由工作进程合并为批次解码；文件较少时保证每个进程都有任务
+        group_size = max(1, min(self.decode_batch_size, math.ceil(len(files) / workers)))
+        groups = [[str(f) for f in files[i:i + group_size]] for i in range(0, len(files), group_size)]
+        console.print(f"[yellow]共 {len(files)} 个文件，使用 {workers} 个工作进程，每批最多 {group_size} 个[/yellow]")
+        shared_weights = self._prepare_worker_weights(workers)
+
+        stats = {'files': 0, 'failed': 0, 'skipped': 0, 'audio_seconds': 0.0}
+        # 各工作进程最近一次报告的内存占用
+        worker_memory = {}
+        start = time.perf_counter()
+        with open(self.output_file, 'a', encoding='utf-8') as output, \
+                ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(threads_per_worker, shared_weights),
+                ) as executor:
+            futures = [executor.submit(_process_files, group) for group in groups]
+            for future in as_completed(futures):
+                records, memory = future.result()
+                worker_memory[memory['pid']] = memory
+                for record in records:
+                    # 逐条写入，中途中断也不会丢失已完成的结果
+                    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    output.flush()
+
+                    stats['files'] += 1
+                    stats['audio_seconds'] += record['duration']
+                    if 'error' in record:
+                        stats['failed'] += 1
+                        console.print(f"[red]{record['file']} 处理失败: {record['error']}[/red]")
+                    elif record['type'] == 'skipped':
+                        stats['skipped'] += 1
+                        console.print(f"[yellow]{record['file']} 没有语音，已跳过[/yellow]")
+                    else:
+                        console.print(f"[green]{record['file']} 完成 ({record['elapsed']:.1f}s)[/green]")
+
+        stats['elapsed'] = time.perf_counter() - start
+        stats['worker_memory'] = worker_memory
+        self._report(stats)
+        from src.model_registry import report_worker_memory
+        report_worker_memory(worker_memory, shared_weights)
+        return stats
+
+    @staticmethod
+    def _prepare_worker_weights(workers: int) -> bool:
+        from src.model_registry import get_registry
+        return get_registry().prepare_worker_weights([WHISPER_CONFIG['fast_model'], WHISPER_CONFIG['accurate_model']], workers)
+
+    def _report(self, stats: dict):
+        """输出吞吐量统计"""
+        elapsed = max(stats['elapsed'], 1e-9)
+        table = Table(show_header=True, header_style="bold magenta", title="Batch Summary")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green")
+        table.add_row("Files", f"{stats['files']} ({stats['failed']} failed, {stats['skipped']} without speech)")
+        table.add_row("Audio seconds", f"{stats['audio_seconds']:.1f}")
+        table.add_row("Wall time", f"{stats['elapsed']:.1f}s")
+        table.add_row("Files/sec", f"{stats['files'] / elapsed:.3f}")
+        table.add_row("Audio-seconds/sec", f"{stats['audio_seconds'] / elapsed:.3f}")
+        console.print(table)
+        console.print(f"[blue]结果已保存到 {self.output_file}[/blue]")
@@ -0,0 +1,122 @@
+"""WhisperPen 常驻服务的轻量客户端，只依赖标准库，适合绑定到快捷键
+
+用法：
+    python -m src.client ping
+    python -m src.client record
+    python -m src.client transcribe recording.wav
+    python -m src.client transcribe recording.wav --upload
+    python -m src.client enhance "需要翻译的文本"
+    python -m src.client shutdown
+"""
+from pathlib import Path
+import argparse
+import array
+import base64
+import itertools
+import json
+import socket
+import sys
+import wave
+
+from config.settings import SERVER_CONFIG
+
+
+class WhisperPenClient:
+    """通过 Unix 套接字调用 serve 子命令启动的常驻服务，一个连接可以发送多条请求"""
+
+    def __init__(self, socket_path=None, timeout: float = None):
+        self.socket_path = Path(socket_path or SERVER_CONFIG['socket_path'])
+        self._ids = itertools.count(1)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout or SERVER_CONFIG['client_timeout'])
+        try:
+            self._socket.connect(str(self.socket_path))
+        except OSError as e:
+            self._socket.close()
+            raise Exception(f"无法连接 WhisperPen 服务（{self.socket_path}），请先运行 python -m src.main serve: {e}")
+        self._reader = self._socket.makefile('rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def call(self, method: str, **params):
+        """发送一条请求并等待响应，服务端报错时抛出异常"""
+        request = {'id': next(self._ids), 'method': method, 'params': params}
+        self._socket.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        line = self._reader.readline()
+        if not line:
+            raise Exception("服务端关闭了连接")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise Exception(response.get('error', '未知错误'))
+        return response['result']
+
+    def transcribe_wav(self, path) -> dict:
+        """读取本地 16 位 WAV 并上传音频数据（服务端无法访问该文件时使用）"""
+        with wave.open(str(path), 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise Exception("只支持 16 位 PCM WAV")
+            frames = wav.readframes(wav.getnframes())
+            if wav.getnchannels() > 1:
+                # 只取第一个声道
+                samples = array.array('h', frames)
+                frames = samples[::wav.getnchannels()].tobytes()
+            sample_rate = wav.getframerate()
+        return self.call(
+            'transcribe_buffer',
+            audio=base64.b64encode(frames).decode('ascii'),
+            sample_rate=sample_rate,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='whisperpen-client', description='WhisperPen 常驻服务客户端')
+    parser.add_argument('--socket', help=f"服务套接字路径（默认 {SERVER_CONFIG['socket_path']}）")
+    parser.add_argument('--json', action='store_true', help='输出完整的 JSON 结果')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('ping', help='检查服务状态')
+    record = subparsers.add_parser('record', help='录一句话，识别并增强，结果复制到剪贴板')
+    record.add_argument('--no-enhance', action='store_true', help='只识别，不做 AI 增强')
+    transcribe = subparsers.add_parser('transcribe', help='转写音频文件')
+    transcribe.add_argument('path')
+    transcribe.add_argument('--upload', action='store_true', help='上传音频数据（仅 16 位 WAV），而不是由服务端读取文件')
+    enhance = subparsers.add_parser('enhance', help='AI 增强文本')
+    enhance.add_argument('text')
+    subparsers.add_parser('shutdown', help='停止服务')
+    args = parser.parse_args(argv)
+
+    try:
+        with WhisperPenClient(args.socket) as client:
+            if args.command == 'ping':
+                result = client.call('ping')
+            elif args.command == 'record':
+                result = client.call('record', enhance=not args.no_enhance)
+            elif args.command == 'transcribe':
+                if args.upload:
+                    result = client.transcribe_wav(args.path)
+                else:
+                    result = client.call('transcribe_file', path=str(Path(args.path).resolve()))
+            elif args.command == 'enhance':
+                result = client.call('enhance', text=args.text)
+            else:
+                result = client.call('shutdown')
+    except Exception as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+
+    if args.json or args.command in ('ping', 'shutdown'):
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(result.get('enhanced') or result.get('original', ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,60 +1,51 @@
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
+from rich.live import Live
+from contextlib import contextmanager
 import pyperclip
-from datetime import datetime
-import os
-from pathlib import Path
+
+from src.history_store import HistoryStore
 
 console = Console()
 
 class FileHandler:
-    def __init__(self):
-        # 使用当前目录作为基础路径
-        self.base_dir = Path.cwd()
-        self.file_path = self.base_dir / "whisperpen.md"
+    def __init__(self, history: HistoryStore = None):
+        # 历史记录写入 SQLite，当前目录的 whisperpen.md 作为镜像
+        self.history = history or HistoryStore()
+    
+    def _results_panel(self, original_text: str, enhanced_text: str) -> Panel:
+        """创建原文/增强文本对照面板"""
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Original", style="cyan", width=40)
+        table.add_column("Enhanced", style="green", width=40)
+        table.add_row(original_text, enhanced_text)
+        return Panel(table, title="Recognition Results")
+    
+    @contextmanager
+    def live_results(self, original_text: str):
+        """实时显示流式增强结果，返回以当前累计文本更新面板的回调"""
+        console.print("\n")
+        with Live(self._results_panel(original_text, "..."), console=console, refresh_per_second=12) as live:
+            yield lambda text: live.update(self._results_panel(original_text, text or "..."))
     
-    def save_and_copy(self, original_text: str, enhanced_text: str):
+    def save_and_copy(self, original_text: str, enhanced_text: str, show: bool = True, entry_type: str = None):
         """保存原始文本和增强文本，并复制增强文本到剪贴板"""
         try:
-            # 创建漂亮的输出
-            table = Table(show_header=True, header_style="bold magenta")
-            table.add_column("Original", style="cyan", width=40)
-            table.add_column("Enhanced", style="green", width=40)
-            table.add_row(original_text, enhanced_text)
-            
-            # 显示到控制台
-            console.print("\n")
-            console.print(Panel(table, title="Recognition Results"))
-            
-            # 保存到文件
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            content = f"""
-## {timestamp}
-
-### Original Text
-{original_text}
-
-### Enhanced Text
-{enhanced_text}
-
----
-"""
-            
-            # 确保文件存在
-            if not self.file_path.exists():
-                self.file_path.touch()
+            # 显示到控制台（流式显示时面板已经渲染过）
+            if show:
+                console.print("\n")
+                console.print(self._results_panel(original_text, enhanced_text))
             
-            # 写入文件
-            with open(self.file_path, "a", encoding="utf-8") as f:
-                f.write(content)
+            # 交给后台线程批量写入，不阻塞当前识别流程
+            self.history.add(original_text, enhanced_text, entry_type)
             
             # 复制到剪贴板
             try:
                 pyperclip.copy(enhanced_text)
-                console.print(f"[blue]已保存到 {self.file_path} 并复制到剪贴板[/blue]")
+                console.print("[blue]已保存到历史记录并复制到剪贴板[/blue]")
             except Exception as e:
-                console.print(f"[yellow]复制到剪贴板失败，但文件已保存到 {self.file_path}[/yellow]")
+                console.print("[yellow]复制到剪贴板失败，但已保存到历史记录[/yellow]")
                 
         except Exception as e:
-            raise Exception(f"保存文件失败: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"保存文件失败: {str(e)}")
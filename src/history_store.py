@@ -0,0 +1,250 @@
+from datetime import datetime
+from pathlib import Path
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+from config.settings import HISTORY_CONFIG
+
+# 写入线程结束标记
+_STOP = None
+
+# FTS5 trigram 分词器要求查询词至少 3 个字符，更短的查询走二元组索引
+_MIN_FTS_QUERY = 3
+
+
+def _word_runs(text: str) -> list:
+    """按标点和空白切分出连续的文字（汉字、字母、数字）片段"""
+    runs, run = [], []
+    for char in text:
+        if char.isalnum():
+            run.append(char)
+        elif run:
+            runs.append(''.join(run))
+            run = []
+    if run:
+        runs.append(''.join(run))
+    return runs
+
+
+def cjk_bigrams(text: str) -> str:
+    """生成供 unicode61 分词器索引的二元组文本（空格分隔）
+
+    每个片段输出所有相邻两字，再加上片段最后一个字：
+    两字查询精确匹配二元组，单字查询用前缀匹配（以该字开头的二元组或片段末尾的单字）。
+    """
+    tokens = []
+    for run in _word_runs(text):
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return ' '.join(tokens)
+
+
+def format_markdown(created_at: float, original_text: str, enhanced_text: str) -> str:
+    """生成与旧版 whisperpen.md 相同格式的 Markdown 条目"""
+    timestamp = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S")
+    return f"""
+## {timestamp}
+
+### Original Text
+{original_text}
+
+### Enhanced Text
+{enhanced_text}
+
+---
+"""
+
+
+class HistoryStore:
+    """识别历史：SQLite（WAL）+ FTS5 全文索引，写入在后台线程中批量完成"""
+
+    def __init__(self, db_path: Path = None, markdown_file=None, config: dict = None):
+        self.config = config or HISTORY_CONFIG
+        self.db_path = Path(db_path or self.config['db_path'])
+        markdown_file = markdown_file if markdown_file is not None else self.config['markdown_file']
+        self.markdown_path = Path(markdown_file) if markdown_file else None
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = self._connect()
+        self._create_schema()
+
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def _create_schema(self):
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'id INTEGER PRIMARY KEY, created_at REAL NOT NULL, '
+            'original TEXT NOT NULL, enhanced TEXT NOT NULL, type TEXT);'
+            'CREATE INDEX IF NOT EXISTS idx_entries_created ON entries (created_at);'
+            "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+            "original, enhanced, content='entries', content_rowid='id', tokenize='trigram');"
+            'CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN '
+            'INSERT INTO entries_fts (rowid, original, enhanced) VALUES (new.id, new.original, new.enhanced); END;'
+            'CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN '
+            "INSERT INTO entries_fts (entries_fts, rowid, original, enhanced) "
+            "VALUES ('delete', old.id, old.original, old.enhanced); END;"
+        )
+        # trigram 无法索引一两个字的查询（中文里很常见），另建二元组索引；
+        # 二元组在 Python 中生成，由写入线程与 entries 在同一事务中写入
+        has_bigrams = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'entries_bigram'"
+        ).fetchone()
+        self._db.executescript(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS entries_bigram USING fts5("
+            "original, enhanced, tokenize='unicode61 remove_diacritics 0');"
+            'CREATE TRIGGER IF NOT EXISTS entries_bigram_ad AFTER DELETE ON entries BEGIN '
+            'DELETE FROM entries_bigram WHERE rowid = old.id; END;'
+        )
+        if not has_bigrams:
+            # 旧数据库升级：为已有记录补建二元组索引
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO entries_bigram (rowid, original, enhanced) VALUES (?, ?, ?)',
+                    ((row[0], cjk_bigrams(row[1]), cjk_bigrams(row[2]))
+                     for row in self._db.execute('SELECT id, original, enhanced FROM entries')),
+                )
+        self._db.commit()
+
+    def add(self, original_text: str, enhanced_text: str, entry_type: str = None):
+        """记录一条识别结果，立即返回，实际写入由后台线程完成"""
+        if self._closed:
+            raise Exception("历史记录已关闭")
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+            self._queue.put((time.time(), original_text, enhanced_text, entry_type))
+
+    def _write_loop(self):
+        """批量写入数据库，并在同一线程追加 Markdown 镜像"""
+        db = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.config['flush_interval']
+            while len(batch) < self.config['batch_size']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not _STOP]
+            if batch:
+                self._write_batch(db, batch)
+        db.close()
+
+    def _write_batch(self, db: sqlite3.Connection, batch: list):
+        with db:
+            for entry in batch:
+                rowid = db.execute(
+                    'INSERT INTO entries (created_at, original, enhanced, type) VALUES (?, ?, ?, ?)',
+                    entry,
+                ).lastrowid
+                db.execute(
+                    'INSERT INTO entries_bigram (rowid, original, enhanced) VALUES (?, ?, ?)',
+                    (rowid, cjk_bigrams(entry[1]), cjk_bigrams(entry[2])),
+                )
+        if self.markdown_path:
+            with open(self.markdown_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(format_markdown(*entry[:3]) for entry in batch))
+
+    def flush(self):
+        """等待已提交的记录全部写入"""
+        with self._writer_lock:
+            if self._writer is not None:
+                self._queue.put(_STOP)
+                self._writer.join()
+                self._writer = None
+
+    def close(self):
+        """写完剩余记录后关闭"""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._db.close()
+
+    def search(self, query: str, limit: int = None) -> list:
+        """全文检索原文和增强文本，按时间倒序返回"""
+        limit = limit or self.config['search_limit']
+        query = query.strip()
+        if len(query) >= _MIN_FTS_QUERY:
+            # 整个查询作为短语匹配，避免用户输入被解析为 FTS 语法
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = self._db.execute(
+                'SELECT e.id, e.created_at, e.original, e.enhanced, e.type '
+                'FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid '
+                'WHERE entries_fts MATCH ? ORDER BY entries_fts.rowid DESC LIMIT ?',
+                (phrase, limit),
+            ).fetchall()
+        elif query and _word_runs(query) == [query]:
+            # 一两个字的查询：两字精确匹配二元组，单字前缀匹配
+            term = '"' + query + '"' + ('*' if len(query) == 1 else '')
+            rows = self._db.execute(
+                'SELECT e.id, e.created_at, e.original, e.enhanced, e.type '
+                'FROM entries_bigram JOIN entries e ON e.id = entries_bigram.rowid '
+                'WHERE entries_bigram MATCH ? ORDER BY entries_bigram.rowid DESC LIMIT ?',
+                (term, limit),
+            ).fetchall()
+        else:
+            # 空查询或含标点的短查询无法索引，退化为扫描
+            pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            rows = self._db.execute(
+                "SELECT id, created_at, original, enhanced, type FROM entries "
+                "WHERE original LIKE ? ESCAPE '\\' OR enhanced LIKE ? ESCAPE '\\' "
+                'ORDER BY id DESC LIMIT ?',
+                (pattern, pattern, limit),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def recent(self, limit: int = None) -> list:
+        """返回最近的记录"""
+        rows = self._db.execute(
+            'SELECT id, created_at, original, enhanced, type FROM entries ORDER BY id DESC LIMIT ?',
+            (limit or self.config['search_limit'],),
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def export_markdown(self, path: Path, since: float = None) -> int:
+        """将历史记录导出为 Markdown，返回导出的条数"""
+        count = 0
+        cursor = self._db.execute(
+            'SELECT created_at, original, enhanced FROM entries WHERE created_at >= ? ORDER BY id',
+            (since or 0,),
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in cursor:
+                f.write(format_markdown(*row))
+                count += 1
+        return count
+
+    def count(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        return {
+            'id': row[0],
+            'created_at': row[1],
+            'original': row[2],
+            'enhanced': row[3],
+            'type': row[4],
+        }
@@ -0,0 +1,168 @@
+from rich.console import Console
+from rich.table import Table
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+from src.telemetry import get_telemetry
+from config.settings import INFERENCE_CONFIG
+
+console = Console()
+
+# 当前线程已应用的角色
+_thread_state = threading.local()
+# 进程启动时显式设置的 PyTorch 线程预算（批量转写的工作进程），调度器沿用而不覆盖
+_process_threads = None
+
+
+def available_cores() -> list:
+    """当前进程可用的 CPU 核心编号"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def set_process_threads(threads: int):
+    """设置进程级 PyTorch 线程预算
+
+    多进程转写时每个工作进程只分到 cpu_count // workers 个线程，须在创建识别器之前调用；
+    之后调度器以该预算为准，不再按核心数重新设置线程数。
+    """
+    global _process_threads
+    import torch
+    torch.set_num_threads(threads)
+    _process_threads = threads
+
+
+class InferenceScheduler:
+    """为并发推理的各个角色分配 CPU 线程预算
+
+    快速识别、精确识别和唤醒检测同时运行时，各自使用 PyTorch 默认的全部核心会造成超额订阅，
+    快速识别反而比单独运行时更慢。
+
+    PyTorch 的 intra-op 线程数是进程级的：每个线程第一次并行计算时都会被重置为最后一次
+    torch.set_num_threads 的值（MKL 的线程数也是全局的），无法按线程分配不同的线程数。
+    因此 split 策略只设置一次进程级线程数，让并发的快速和精确识别合计不超过核心数；
+    按线程生效的只有调度优先级和核心绑定——角色线程启动的 OpenMP 工作线程会继承它们，
+    后台角色降低优先级，快速识别在争抢中优先，可选地把各角色绑定到不同的核心。
+    """
+
+    ROLES = ('fast', 'accurate', 'wake')
+    POLICIES = ('default', 'split')
+    # 延迟不敏感的角色，调度优先级低于快速识别
+    BACKGROUND_ROLES = ('accurate', 'wake')
+
+    def __init__(self, config: dict = None, cores: list = None):
+        self.config = config or INFERENCE_CONFIG
+        self.policy = self.config['policy']
+        if self.policy not in self.POLICIES:
+            raise Exception(f"未知的调度策略: {self.policy}（可选 {', '.join(self.POLICIES)}）")
+        self.cores = sorted(cores or available_cores())
+        self.plan = self._plan()
+        self.telemetry = get_telemetry()
+        self._threads_applied = False
+        self._threads_lock = threading.Lock()
+
+    def _plan(self) -> dict:
+        """计算每个角色的线程数、核心和 nice 值；None 表示保持默认"""
+        if self.policy == 'default':
+            return {role: {'threads': None, 'cores': None, 'nice': 0} for role in self.ROLES}
+
+        total = len(self.cores)
+        # 进程级线程数，所有角色相同；进程已有线程预算时沿用
+        threads = _process_threads or min(self.config['max_threads'], max(1, round(total * self.config['thread_share'])))
+        wake = min(self.config['wake_cores'], total)
+        pin = self.config['pin_cores'] and hasattr(os, 'sched_setaffinity')
+        nice = self.config['background_nice']
+        # 核心不足时精确识别与快速识别共享核心，靠优先级区分
+        accurate_cores = self.cores[threads:] or self.cores
+        return {
+            'fast': {'threads': threads, 'cores': self.cores[:threads] if pin else None, 'nice': 0},
+            'accurate': {'threads': threads, 'cores': accurate_cores if pin else None, 'nice': nice},
+            'wake': {'threads': threads, 'cores': self.cores[-wake:] if pin else None, 'nice': nice},
+        }
+
+    def _apply_threads(self, threads: int):
+        """设置进程级的 PyTorch 线程数（只设置一次，须在角色线程第一次并行计算之前）
+
+        进程已通过 set_process_threads 设置了预算时不再覆盖。
+        """
+        with self._threads_lock:
+            if self._threads_applied:
+                return
+            if _process_threads:
+                self.telemetry.set_gauge('inference_threads', _process_threads)
+                self._threads_applied = True
+                return
+            import torch
+            torch.set_num_threads(threads)
+            self.telemetry.set_gauge('inference_threads', threads)
+            self._threads_applied = True
+
+    def configure_thread(self, role: str):
+        """将当前线程配置为指定角色（同一线程只配置一次）"""
+        if getattr(_thread_state, 'role', None) == role:
+            return
+        _thread_state.role = role
+        plan = self.plan[role]
+
+        if plan['threads']:
+            self._apply_threads(plan['threads'])
+        if plan['cores']:
+            try:
+                # Linux 上 pid 为 0 时只作用于当前线程
+                os.sched_setaffinity(0, plan['cores'])
+            except OSError as e:
+                console.print(f"[yellow]{role} 线程绑定核心失败: {str(e)}[/yellow]")
+        # nice 值和核心绑定按线程生效，之后本线程创建的 OpenMP 工作线程会继承
+        if plan['nice']:
+            try:
+                thread_id = threading.get_native_id()
+                current = os.getpriority(os.PRIO_PROCESS, thread_id)
+                os.setpriority(os.PRIO_PROCESS, thread_id, current + plan['nice'])
+            except (AttributeError, OSError):
+                # 不支持按线程调整优先级的平台上忽略
+                pass
+
+    def executor(self, role: str) -> ThreadPoolExecutor:
+        """创建角色专用的单线程执行器，线程启动时应用该角色的配置
+
+        nice 值提高后不能再降低，因此不同角色不共用线程。
+        """
+        return ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"whisperpen-{role}",
+            initializer=self.configure_thread,
+            initargs=(role,),
+        )
+
+    def report(self):
+        """显示各角色的线程预算"""
+        table = Table(show_header=True, header_style="bold magenta", title=f"Inference Threads ({self.policy})")
+        table.add_column("Role", style="cyan")
+        table.add_column("Threads (process-wide)", style="green")
+        table.add_column("Cores", style="green")
+        table.add_column("Nice", style="green")
+        for role in self.ROLES:
+            plan = self.plan[role]
+            cores = plan['cores']
+            table.add_row(
+                role,
+                str(plan['threads'] or 'default'),
+                f"{cores[0]}-{cores[-1]}" if cores else 'any',
+                f"+{plan['nice']}" if plan['nice'] else '0',
+            )
+        console.print(table)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    """进程级共享的推理调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
@@ -0,0 +1,329 @@
+from rich.console import Console
+from rich.table import Table
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import multiprocessing
+import numpy as np
+import json
+import os
+import resource
+import sys
+import time
+
+from src.audio_pipeline import AudioPreprocessor, frame_energy_db, normalize_peak, pcm_to_float32, to_whisper_input
+from config.settings import BATCH_CONFIG, INGEST_CONFIG, WHISPER_CONFIG
+
+console = Console()
+
+# 每个工作进程各自持有的识别器
+_speech_handler = None
+
+
+def _init_worker(threads_per_worker: int, shared_weights: bool = False):
+    """工作进程初始化：只加载语音识别模型"""
+    global _speech_handler
+    from src.inference_scheduler import set_process_threads
+    from src.model_registry import get_registry
+    from src.speech_handler import SpeechHandler
+
+    set_process_threads(threads_per_worker)
+    if shared_weights:
+        get_registry().use_shared_weights()
+    _speech_handler = SpeechHandler()
+    _speech_handler._ensure_models_loaded()
+
+
+def _transcribe_segment(index: int, samples: np.ndarray) -> tuple:
+    """在工作进程中识别一个语音片段，返回 (结果, 当前进程的内存占用)"""
+    from src.model_registry import process_memory
+
+    start = time.perf_counter()
+    try:
+        result = _speech_handler.transcribe_samples(samples, fast_timeout=None, accurate_timeout=None)
+        record = {'index': index, 'text': result['original'], 'type': result['type'], 'elapsed': time.perf_counter() - start}
+    except Exception as e:
+        record = {'index': index, 'text': '', 'error': str(e), 'elapsed': time.perf_counter() - start}
+    return record, process_memory()
+
+
+def format_timestamp(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:04.1f}"
+
+
+class SilenceSegmenter:
+    """流式 VAD 切分：逐块输入音频，在停顿处切出语音片段
+
+    只缓存当前片段的音频（最长 max_segment_seconds），内存占用与文件长度无关。
+    """
+
+    def __init__(self, sample_rate: int, config: dict = None):
+        self.config = config or INGEST_CONFIG
+        self.sample_rate = sample_rate
+        self.hop = max(1, int(sample_rate * self.config['hop_ms'] / 1000))
+        self.preprocessor = AudioPreprocessor(sample_rate=sample_rate)
+
+        seconds_to_frames = lambda seconds: max(1, int(seconds * sample_rate / self.hop))
+        self.min_silence_frames = seconds_to_frames(self.config['min_silence_seconds'])
+        self.min_speech_frames = seconds_to_frames(self.config['min_speech_seconds'])
+        self.max_segment_frames = seconds_to_frames(self.config['max_segment_seconds'])
+        self.pad_frames = seconds_to_frames(self.config['pad_seconds'])
+
+        # 当前片段的缓冲区（按帧对齐），预分配后循环使用
+        capacity = (self.max_segment_frames + 2 * self.pad_frames + self.frames_per_block + 2) * self.hop
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._energy = np.zeros(capacity // self.hop, dtype=np.float32)
+        self._start_frame = 0      # 缓冲区第一帧的全局帧号
+        self._length = 0           # 缓冲区中的帧数
+        self._frame = 0            # 已处理的全局帧数
+        self._speech_start = None  # 当前语音的起始全局帧号
+        self._last_speech = None   # 最近一个语音帧的全局帧号
+        self._speech_frames = 0
+        self.noise_floor_db = None
+
+    @property
+    def frames_per_block(self) -> int:
+        return max(1, int(self.config['block_seconds'] * self.sample_rate / self.hop))
+
+    @property
+    def block_size(self) -> int:
+        """建议的读取块大小（帧长的整数倍）"""
+        return self.frames_per_block * self.hop
+
+    def feed(self, block: np.ndarray):
+        """输入一块 int16 音频，返回已完成的片段列表 [(开始秒, 结束秒, 16kHz float32)]"""
+        filtered = self.preprocessor.process_chunk(pcm_to_float32(block))
+        usable = len(filtered) // self.hop * self.hop
+        if usable == 0:
+            return []
+        energy = frame_energy_db(filtered[:usable], self.sample_rate, self.config['hop_ms'], self.config['hop_ms'])
+
+        # 用每块最安静的帧跟踪噪声基底
+        floor = float(np.percentile(energy, 10))
+        if self.noise_floor_db is None:
+            self.noise_floor_db = floor
+        elif floor < self.noise_floor_db:
+            # 噪声变小时快速跟随，变大时缓慢跟随，避免长句把基底抬高
+            self.noise_floor_db = 0.5 * self.noise_floor_db + 0.5 * floor
+        else:
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * floor
+        threshold = max(self.noise_floor_db + self.config['margin_db'], self.config['min_level_db'])
+        is_speech = energy > threshold
+
+        segments = []
+        for offset in range(len(energy)):
+            self._append_frame(filtered[offset * self.hop:(offset + 1) * self.hop], energy[offset])
+            segment = self._step(bool(is_speech[offset]))
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def flush(self):
+        """文件结束时输出最后一个片段"""
+        segments = []
+        if self._speech_start is not None:
+            segment = self._emit(self._last_speech + 1 + self.pad_frames)
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def _append_frame(self, samples: np.ndarray, energy: float):
+        if (self._length + 1) * self.hop > len(self._buffer):
+            # 缓冲区已满时丢弃最旧的帧，但不丢弃当前语音
+            keep_from = self._speech_start if self._speech_start is not None else self._frame - self.pad_frames
+            self._drop(keep_from - self._start_frame)
+        position = self._length * self.hop
+        self._buffer[position:position + self.hop] = samples
+        self._energy[self._length] = energy
+        self._length += 1
+        self._frame += 1
+
+    def _drop(self, frames: int):
+        """丢弃缓冲区开头的若干帧"""
+        frames = max(0, min(frames, self._length))
+        if frames == 0:
+            return
+        remaining = self._length - frames
+        self._buffer[:remaining * self.hop] = self._buffer[frames * self.hop:self._length * self.hop]
+        self._energy[:remaining] = self._energy[frames:self._length]
+        self._length = remaining
+        self._start_frame += frames
+
+    def _step(self, is_speech: bool):
+        frame = self._frame - 1
+        if is_speech:
+            if self._speech_start is None:
+                self._speech_start = max(self._start_frame, frame - self.pad_frames)
+                self._speech_frames = 0
+            self._last_speech = frame
+            self._speech_frames += 1
+        elif self._speech_start is None:
+            # 静音期间只保留前导填充
+            if self._length > 2 * self.pad_frames + self.frames_per_block:
+                self._drop(self._length - self.pad_frames)
+            return None
+
+        # 停顿足够长时在停顿处切分
+        if not is_speech and frame - self._last_speech >= self.min_silence_frames:
+            return self._emit(self._last_speech + 1 + self.pad_frames)
+
+        # 超过最大长度时在后半段最安静的帧处强制切分
+        if frame + 1 - self._speech_start >= self.max_segment_frames:
+            search_from = max(self._speech_start + self.max_segment_frames // 2, self._start_frame)
+            window = self._energy[search_from - self._start_frame:frame + 1 - self._start_frame]
+            cut = search_from + int(np.argmin(window)) + 1
+            return self._emit(cut, forced=True)
+        return None
+
+    def _emit(self, end_frame: int, forced: bool = False):
+        """切出 [语音起点, end_frame) 的片段"""
+        end_frame = min(end_frame, self._frame)
+        start_frame = self._speech_start
+        speech_frames = self._speech_frames
+        begin = (start_frame - self._start_frame) * self.hop
+        samples = self._buffer[begin:(end_frame - self._start_frame) * self.hop].copy()
+        self._drop(end_frame - self._start_frame)
+
+        if forced and self._frame > end_frame:
+            # 强制切分后剩余部分仍在语音中
+            self._speech_start = end_frame
+            self._speech_frames = self._frame - end_frame
+        else:
+            self._speech_start = None
+
+        if speech_frames < self.min_speech_frames:
+            return None
+        return (
+            start_frame * self.hop / self.sample_rate,
+            end_frame * self.hop / self.sample_rate,
+            to_whisper_input(normalize_peak(samples), self.sample_rate),
+        )
+
+
+def iter_blocks(path, block_size: int):
+    """使用 soundfile 逐块读取音频并混合为单声道 int16，不把整个文件读入内存"""
+    import soundfile as sf
+    for block in sf.blocks(str(path), blocksize=block_size, dtype='int16', always_2d=True):
+        if block.shape[1] > 1:
+            yield block.mean(axis=1).astype(np.int16)
+        else:
+            yield block[:, 0]
+
+
+class Ingestor:
+    """长录音转写：流式读取、VAD 切分、多进程并行识别，按顺序输出带时间戳的结果"""
+
+    def __init__(self, workers: int = None, config: dict = None):
+        self.config = config or INGEST_CONFIG
+        self.workers = workers or self.config['workers']
+        self.max_in_flight = self.config['max_in_flight'] or self.workers * 2
+
+    def run(self, path, output_file=None) -> dict:
+        import soundfile as sf
+
+        path = Path(path)
+        info = sf.info(str(path))
+        output_file = Path(output_file or path.with_suffix('.transcript.jsonl'))
+        segmenter = SilenceSegmenter(info.samplerate, self.config)
+        threads_per_worker = max(1, (os.cpu_count() or 1) // self.workers)
+        context = multiprocessing.get_context(BATCH_CONFIG['start_method'])
+        console.print(
+            f"[yellow]{path.name}: {info.duration / 60:.1f} 分钟，使用 {self.workers} 个工作进程，"
+            f"最多 {self.max_in_flight} 个片段同时处理[/yellow]"
+        )
+
+        shared_weights = self._prepare_worker_weights(self.workers)
+
+        stats = {'segments': 0, 'failed': 0, 'audio_seconds': info.duration, 'speech_seconds': 0.0}
+        worker_memory = {}  # 各工作进程最近一次报告的内存占用
+        segments = {}     # 已提交、尚未输出的片段时间戳
+        completed = {}    # 已完成、等待按顺序输出的结果
+        in_flight = set()
+        next_index = 0
+        written = 0
+        start = time.perf_counter()
+
+        with open(output_file, 'w', encoding='utf-8') as output, \
+                ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(threads_per_worker, shared_weights),
+                ) as executor:
+
+            def collect(block: bool):
+                """收集已完成的片段，并按顺序写出连续的结果"""
+                nonlocal in_flight, written
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record, memory = future.result()
+                    worker_memory[memory['pid']] = memory
+                    completed[record['index']] = record
+                while written in completed:
+                    record = completed.pop(written)
+                    begin, end = segments.pop(written)
+                    self._write(output, record, begin, end, stats)
+                    written += 1
+
+            def submit(segment):
+                nonlocal next_index
+                begin, end, samples = segment
+                # 同时处理的片段数有上限，读取速度不会超过识别速度
+                while len(in_flight) >= self.max_in_flight:
+                    collect(block=True)
+                segments[next_index] = (begin, end)
+                in_flight.add(executor.submit(_transcribe_segment, next_index, samples))
+                stats['speech_seconds'] += end - begin
+                next_index += 1
+
+            for block in iter_blocks(path, segmenter.block_size):
+                for segment in segmenter.feed(block):
+                    submit(segment)
+                collect(block=False)
+            for segment in segmenter.flush():
+                submit(segment)
+            while in_flight:
+                collect(block=True)
+
+        stats['elapsed'] = time.perf_counter() - start
+        stats['output_file'] = str(output_file)
+        stats['worker_memory'] = worker_memory
+        self._report(stats)
+        from src.model_registry import report_worker_memory
+        report_worker_memory(worker_memory, shared_weights)
+        return stats
+
+    @staticmethod
+    def _prepare_worker_weights(workers: int) -> bool:
+        from src.model_registry import get_registry
+        return get_registry().prepare_worker_weights([WHISPER_CONFIG['fast_model'], WHISPER_CONFIG['accurate_model']], workers)
+
+    def _write(self, output, record: dict, begin: float, end: float, stats: dict):
+        entry = {'start': round(begin, 2), 'end': round(end, 2), **record}
+        output.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        output.flush()
+        stats['segments'] += 1
+        if 'error' in record:
+            stats['failed'] += 1
+            console.print(f"[red][{format_timestamp(begin)} → {format_timestamp(end)}] {record['error']}[/red]")
+        else:
+            console.print(f"[cyan][{format_timestamp(begin)} → {format_timestamp(end)}][/cyan] {record['text']}")
+
+    def _report(self, stats: dict):
+        """输出吞吐量和内存峰值"""
+        elapsed = max(stats['elapsed'], 1e-9)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+        table = Table(show_header=True, header_style="bold magenta", title="Ingest Summary")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Value", style="green")
+        table.add_row("Segments", f"{stats['segments']} ({stats['failed']} failed)")
+        table.add_row("Audio", f"{stats['audio_seconds'] / 60:.1f} min（语音 {stats['speech_seconds'] / 60:.1f} min）")
+        table.add_row("Wall time", f"{stats['elapsed']:.1f}s")
+        table.add_row("Realtime factor", f"{stats['audio_seconds'] / elapsed:.1f}x")
+        table.add_row("Peak RSS (main)", f"{peak_mb:.0f}MB")
+        console.print(table)
+        console.print(f"[blue]结果已保存到 {stats['output_file']}[/blue]")
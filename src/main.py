@@ -1,8 +1,7 @@
 from rich.console import Console
-from src.speech_handler import SpeechHandler
-from src.text_processor import TextProcessor
-from src.file_handler import FileHandler
-from src.wake_detector import WakeDetector
+from src.telemetry import get_telemetry, profile_session
+from datetime import datetime
+from pathlib import Path
 import click
 import signal
 import sys
@@ -14,11 +13,37 @@ def handle_exit(signum, frame):
     console.print("\n👋 感谢使用 WhisperPen")
     sys.exit(0)
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('--background', '-b', is_flag=True, help='后台监听模式（使用唤醒词"小王小王"）')
 @click.option('--continuous', '-c', is_flag=True, help='持续监听模式（无需唤醒词）')
-def main(background: bool, continuous: bool):
+@click.option('--stream', '-s', is_flag=True, help='流式识别（边说边显示部分结果）')
+@click.option('--batch', 'batch_target', metavar='<dir|glob>', help='离线批量转写目录或通配符匹配的 WAV/FLAC 文件')
+@click.option('--workers', type=int, default=None, help='批量转写的工作进程数')
+@click.option('--output', 'batch_output', default=None, help='批量转写结果文件（JSONL）')
+@click.option('--decode-batch', type=int, default=None, help='批量转写时每批合并解码的最大文件数')
+@click.option('--metrics-port', type=int, default=None, help='在本地端口提供 Prometheus 指标（/metrics）')
+@click.option('--trace-file', default=None, help='将各阶段耗时写入 JSONL 轨迹文件')
+@click.option('--profile', 'profile_file', default=None, help='将本次会话的 cProfile 结果写入文件')
+@click.option('--inference-policy', type=click.Choice(['default', 'split']), default=None,
+              help='并发推理的线程分配策略（default: PyTorch 默认，split: 按角色分配，快速识别优先）')
+@click.pass_context
+def main(ctx, background: bool, continuous: bool, stream: bool, batch_target: str, workers: int, batch_output: str,
+         decode_batch: int, metrics_port: int, trace_file: str, profile_file: str, inference_policy: str):
     """WhisperPen - 语音转文字增强工具"""
+    if ctx.invoked_subcommand is not None:
+        return
+
+    # 埋点导出和性能分析在退出（包括信号退出）时收尾
+    telemetry = get_telemetry()
+    telemetry.configure(trace_file=trace_file, metrics_port=metrics_port)
+    ctx.call_on_close(telemetry.close)
+    if metrics_port is not None:
+        console.print(f"[blue]Prometheus 指标: http://127.0.0.1:{metrics_port}/metrics[/blue]")
+    ctx.with_resource(profile_session(profile_file))
+    if inference_policy:
+        from config.settings import INFERENCE_CONFIG
+        INFERENCE_CONFIG['policy'] = inference_policy
+
     # 注册信号处理
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
@@ -26,13 +51,39 @@ def main(background: bool, continuous: bool):
     try:
         console.print("🎤 WhisperPen 已启动")
         
-        speech_handler = SpeechHandler()
+        # 各模式的组件（以及 whisper、torch 等重量级依赖）只在用到时才导入和创建
+        if batch_target:
+            # 离线批量模式（不使用麦克风）
+            from src.batch_processor import BatchProcessor
+            BatchProcessor(workers=workers, output_file=batch_output, decode_batch_size=decode_batch).run(batch_target)
+            return
+        
+        from src.speech_handler import SpeechHandler
+        from src.text_processor import TextProcessor
+        from src.file_handler import FileHandler
+        
+        # 麦克风只打开一次，唤醒检测和每次录音都从常驻采集的环形缓冲区读取
+        capture = start_capture()
+        
         text_processor = TextProcessor()
+        speech_handler = SpeechHandler(source_factory=capture.source if capture else None)
+        
+        # Qwen 模型预热与 Whisper 模型加载并行进行
+        prewarm = text_processor.prewarm_async()
+        speech_handler._ensure_models_loaded()
+        prewarm.join()
+        speech_handler.scheduler.report()
+        
+        if stream:
+            # 流式识别与普通识别接口一致，可直接替换
+            from src.stream_transcriber import StreamingTranscriber
+            speech_handler = StreamingTranscriber(speech_handler)
         file_handler = FileHandler()
-        wake_detector = WakeDetector()
         
         if background:
-            # 后台监听模式（使用唤醒词）
+            # 后台监听模式（使用唤醒词），只在此模式下创建并校准唤醒检测器
+            from src.wake_detector import WakeDetector
+            wake_detector = WakeDetector(capture=capture)
             wake_detector.start()
             while True:
                 try:
@@ -48,6 +99,13 @@ def main(background: bool, continuous: bool):
         elif continuous:
             # 持续监听模式（无需唤醒词）
             console.print("[yellow]持续监听模式已启动，按 Ctrl+C 退出[/yellow]")
+            if not stream:
+                # 采集、识别、增强分级并行，上一句处理期间可以继续说话
+                from src.pipeline import SpeechPipeline
+                # Ctrl+C 交给流水线处理：第一次停止采集并等队列中的语音输出完，第二次立即退出
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+                SpeechPipeline(speech_handler, text_processor, file_handler, source_factory=speech_handler.source_factory).run()
+                return
             while True:
                 try:
                     process_speech(speech_handler, text_processor, file_handler)
@@ -65,23 +123,107 @@ def main(background: bool, continuous: bool):
     except Exception as e:
         console.print(f"[red]程序错误: {str(e)}[/red]")
 
+def start_capture():
+    """启动常驻音频采集，未启用或打开失败时返回 None（每次录音单独打开麦克风）"""
+    from config.settings import CAPTURE_CONFIG
+    if not CAPTURE_CONFIG['enabled']:
+        return None
+    from src.audio_capture import AudioCapture
+    try:
+        return AudioCapture().start()
+    except Exception as e:
+        console.print(f"[yellow]{str(e)}，改为每次录音时打开麦克风[/yellow]")
+        return None
+
 def process_speech(speech_handler, text_processor, file_handler):
     """处理单次语音识别"""
+    with get_telemetry().span('process_speech'):
+        _process_speech(speech_handler, text_processor, file_handler)
+
+def _process_speech(speech_handler, text_processor, file_handler):
     # 获取语音输入
     result = speech_handler.record_and_transcribe()
     original_text = result['original']
     recognition_type = result['type']
+    if recognition_type == 'skipped':
+        # 只有静音或噪声，不调用 AI 增强，也不写入历史
+        return
     
     # 显示识别类型
-    type_msg = "快速识别" if recognition_type == 'fast' else "精确识别"
+    type_msg = {'fast': "快速识别", 'stream': "流式识别"}.get(recognition_type, "精确识别")
     console.print(f"[yellow]使用{type_msg}完成[/yellow]")
     
-    # AI 增强
+    # AI 增强（流式显示生成的 token）
     console.print("[yellow]正在进行 AI 增强...[/yellow]")
-    enhanced_text = text_processor.enhance_text(original_text)
+    with file_handler.live_results(original_text) as update:
+        enhanced_text = text_processor.enhance_text_stream(original_text, on_update=update)
     
-    # 保存和显示结果
-    file_handler.save_and_copy(original_text, enhanced_text)
+    # 完成后保存并复制到剪贴板
+    with get_telemetry().span('save_and_copy'):
+        file_handler.save_and_copy(original_text, enhanced_text, show=False, entry_type=recognition_type)
+
+@main.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=int, default=None, help='并行识别的工作进程数')
+@click.option('--output', 'output_file', default=None, help='结果文件（JSONL，默认 <音频文件名>.transcript.jsonl）')
+def ingest(path: str, workers: int, output_file: str):
+    """转写长录音：流式读取，在停顿处切分并并行识别"""
+    from src.ingest import Ingestor
+    Ingestor(workers=workers).run(path, output_file)
+
+@main.command()
+@click.option('--socket', 'socket_path', default=None, help='Unix 套接字路径（默认 ~/.whisperpen/whisperpen.sock）')
+def serve(socket_path: str):
+    """常驻服务：模型只加载一次，通过本地套接字接受请求（客户端: python -m src.client）"""
+    from src.speech_handler import SpeechHandler
+    from src.text_processor import TextProcessor
+    from src.file_handler import FileHandler
+    from src.server import WhisperPenServer
+
+    # 退出信号在主线程中结束 serve_forever，由服务等待进行中的请求后关闭
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    try:
+        text_processor = TextProcessor()
+        speech_handler = SpeechHandler()
+        prewarm = text_processor.prewarm_async()
+        speech_handler._ensure_models_loaded()
+        prewarm.join()
+        WhisperPenServer(speech_handler, text_processor, FileHandler(), socket_path=socket_path).serve()
+    except Exception as e:
+        console.print(f"[red]服务错误: {str(e)}[/red]")
+        sys.exit(1)
+
+@main.group()
+def history():
+    """查询和导出识别历史"""
+
+@history.command('search')
+@click.argument('query')
+@click.option('--limit', '-n', type=int, default=None, help='最多显示的条数')
+def history_search(query: str, limit: int):
+    """全文检索历史记录（原文和增强文本）"""
+    from src.history_store import HistoryStore
+    entries = HistoryStore(markdown_file='').search(query, limit=limit)
+    if not entries:
+        console.print("[yellow]没有找到匹配的记录[/yellow]")
+        return
+    for entry in entries:
+        timestamp = datetime.fromtimestamp(entry['created_at']).strftime("%Y-%m-%d %H:%M:%S")
+        console.print(f"[cyan]#{entry['id']} {timestamp}[/cyan]")
+        console.print(f"  {entry['original']}")
+        console.print(f"  [green]{entry['enhanced']}[/green]")
+
+@history.command('export')
+@click.argument('path', type=click.Path(dir_okay=False), default='whisperpen.md')
+@click.option('--days', type=float, default=None, help='只导出最近若干天的记录')
+def history_export(path: str, days: float):
+    """将历史记录导出为 Markdown"""
+    from src.history_store import HistoryStore
+    since = datetime.now().timestamp() - days * 86400 if days else None
+    count = HistoryStore(markdown_file='').export_markdown(Path(path), since=since)
+    console.print(f"[blue]已导出 {count} 条记录到 {path}[/blue]")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,371 @@
+from rich.console import Console
+from rich.table import Table
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import warnings
+import weakref
+
+from src.telemetry import get_telemetry
+from config.settings import MODEL_CONFIG
+
+console = Console()
+
+# 检查点格式版本，生成方式变化时递增以使旧的检查点失效（2：量化覆盖 Whisper 的线性层）
+CHECKPOINT_FORMAT = 2
+
+
+def _tensor_bytes(value) -> int:
+    """计算 state_dict 中张量（含量化打包参数）占用的字节数"""
+    import torch
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(item) for item in value)
+    return 0
+
+
+def _file_sha256(path: Path) -> str:
+    """分块计算文件内容哈希"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_signature(path: Path) -> dict:
+    """文件大小和修改时间，用于判断检查点写入后是否被改动"""
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def quantize_int8(model):
+    """对模型中的全部线性层做 int8 动态量化
+
+    Whisper 的线性层是 nn.Linear 的子类（whisper.model.Linear，只在前向时把权重转换为输入的精度），
+    quantize_dynamic 按精确类型匹配，不会转换子类，因此先将其还原为 nn.Linear。
+    CPU 上输入总是 fp32，还原后前向结果不变。
+    """
+    import torch
+
+    converted = 0
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+        if type(module) is torch.nn.Linear:
+            converted += 1
+    if not converted:
+        console.print("[yellow]模型中没有可量化的线性层，保持 fp32[/yellow]")
+        return model
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def model_footprint(model) -> int:
+    """估算模型权重的内存占用（字节）"""
+    return sum(_tensor_bytes(value) for value in model.state_dict().values())
+
+
+def process_memory() -> dict:
+    """当前进程的内存占用（MB）
+
+    Linux 上从 /proc/self/status 读取 VmRSS 及其组成：anon 为进程私有的匿名页，
+    file 为文件页（内存映射的共享权重计入这里，多个进程共用同一份页缓存）。
+    其他平台只有峰值 RSS。
+    """
+    memory = {'pid': os.getpid()}
+    fields = {'VmRSS': 'rss', 'RssAnon': 'anon', 'RssFile': 'file', 'RssShmem': 'shmem'}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] = int(value.split()[0]) / 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory['rss'] = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    return memory
+
+
+def report_worker_memory(workers: dict, shared: bool):
+    """显示各工作进程的内存占用
+
+    各进程 RSS 相加会重复计算共享的文件页，实际占用估算为私有页之和加一份文件页。
+    """
+    if not workers:
+        return
+    table = Table(show_header=True, header_style="bold magenta", title=f"Worker Memory ({'shared' if shared else 'private'} weights)")
+    table.add_column("Worker", style="cyan")
+    table.add_column("RSS", style="green")
+    table.add_column("Private (anon)", style="green")
+    table.add_column("File-backed", style="green")
+    for pid, memory in sorted(workers.items()):
+        table.add_row(
+            str(pid),
+            f"{memory['rss']:.0f}MB",
+            f"{memory['anon']:.0f}MB" if 'anon' in memory else '-',
+            f"{memory['file']:.0f}MB" if 'file' in memory else '-',
+        )
+    console.print(table)
+    if all('anon' in memory for memory in workers.values()):
+        estimate = sum(memory['anon'] for memory in workers.values()) + max(memory['file'] for memory in workers.values())
+        console.print(f"[blue]工作进程 RSS 合计 {sum(memory['rss'] for memory in workers.values()):.0f}MB，"
+                      f"去除重复的共享页后约 {estimate:.0f}MB[/blue]")
+
+
+class ModelRegistry:
+    """进程内共享的 Whisper 模型注册表，按 (名称, 设备, 量化方式) 复用模型"""
+
+    def __init__(self, memory_cap_mb: int = None, cache_dir: Path = None):
+        self.memory_cap = (memory_cap_mb or MODEL_CONFIG['memory_cap_mb']) * 1024 * 1024
+        self.cache_dir = Path(cache_dir or MODEL_CONFIG['cache_dir'])
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading_locks = {}
+        # 每个模型实例的推理锁（模型被回收时自动移除）
+        self._inference_locks = weakref.WeakKeyDictionary()
+        # 未指定量化方式时使用的默认值，None 表示 CPU 上 int8、GPU 上不量化
+        self.default_quantization = None
+
+    @staticmethod
+    def default_device() -> str:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+
+    def _make_key(self, name: str, device: str = None, quantization: str = None) -> tuple:
+        device = device or self.default_device()
+        if quantization is None:
+            # CPU 上默认使用 int8 动态量化
+            quantization = self.default_quantization or ("int8" if device == "cpu" else "none")
+        return (name, device, quantization)
+
+    def prepare_checkpoint(self, name: str, device: str = None, quantization: str = None) -> Path:
+        """只生成检查点、不保留模型，供其他进程以内存映射方式加载"""
+        key = self._make_key(name, device, quantization)
+        checkpoint, meta_file = self._checkpoint_paths(key)
+        if not self._is_checkpoint_valid(checkpoint, meta_file, self._checkpoint_meta(key)):
+            self._load(key)
+        return checkpoint
+
+    def prepare_worker_weights(self, names: list, workers: int) -> bool:
+        """在父进程中准备工作进程要加载的检查点，返回工作进程是否应使用共享权重
+
+        检查点由父进程生成一次，工作进程不会各自下载、量化并同时写入同一个检查点。
+        共享权重是不量化的 fp32 检查点：各工作进程以 mmap 只读加载，权重页由页缓存提供，
+        不会被复制到进程私有内存。
+        """
+        # GPU 上权重位于显存，共享主机内存没有意义；进程少时各自持有 int8 权重更省内存
+        shared = MODEL_CONFIG['worker_weights'] == 'shared' and self.default_device() == 'cpu' \
+            and workers >= MODEL_CONFIG['shared_weights_min_workers']
+        for name in dict.fromkeys(names):
+            self.prepare_checkpoint(name, quantization='none' if shared else None)
+        if shared:
+            console.print(f"[blue]{workers} 个工作进程共享内存映射的 fp32 模型权重[/blue]")
+        return shared
+
+    def use_shared_weights(self):
+        """工作进程：之后加载的模型使用父进程准备的 fp32 检查点（内存映射，只读共享）"""
+        self.default_quantization = 'none'
+
+    def get(self, name: str, device: str = None, quantization: str = None):
+        """获取模型，未加载时加载，已加载时标记为最近使用"""
+        key = self._make_key(name, device, quantization)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]['model']
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        # 同一模型只加载一次，其他线程等待加载完成
+        with loading_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]['model']
+
+            start = time.perf_counter()
+            model, source = self._load(key)
+            size = model_footprint(model)
+            load_seconds = time.perf_counter() - start
+            console.print(f"[green]Whisper {key[0]} 模型已加载（{source}，{load_seconds:.1f}s）[/green]")
+            get_telemetry().observe('model_load_seconds', load_seconds, model=key[0], source=source)
+
+            with self._lock:
+                self._evict(size)
+                self._models[key] = {
+                    'model': model,
+                    'bytes': size,
+                    'load_seconds': load_seconds,
+                    'source': source,
+                }
+                get_telemetry().set_gauge('models_loaded_bytes', self.total_bytes())
+            return model
+
+    def inference_lock(self, model) -> threading.Lock:
+        """同一模型实例的推理锁
+
+        Whisper 解码时在模型共享的 key/value 层上安装 kv-cache 钩子并在结束时移除，
+        快速识别、流式识别、批量解码和唤醒确认拿到的是同一个实例，必须串行解码。
+        """
+        with self._lock:
+            lock = self._inference_locks.get(model)
+            if lock is None:
+                lock = self._inference_locks[model] = threading.Lock()
+            return lock
+
+    def _checkpoint_paths(self, key: tuple) -> tuple:
+        name, device, quantization = key
+        stem = f"whisper_{name}_{device}_{quantization}"
+        return self.cache_dir / f"{stem}.pt", self.cache_dir / f"{stem}.json"
+
+    def _checkpoint_meta(self, key: tuple) -> dict:
+        """描述检查点来源的元数据，任一项变化都会使检查点失效"""
+        import torch
+        import whisper
+
+        url = whisper._MODELS.get(key[0], '')
+        return {
+            # 官方模型下载地址中包含原始权重的 sha256
+            'source_sha256': url.split('/')[-2] if url else key[0],
+            'torch': torch.__version__,
+            'whisper': whisper.__version__,
+            'format': CHECKPOINT_FORMAT,
+        }
+
+    def _load(self, key: tuple) -> tuple:
+        """加载模型：优先使用已量化的检查点，否则加载原始权重、量化并保存"""
+        import torch
+        import whisper
+
+        name, device, quantization = key
+        checkpoint, meta_file = self._checkpoint_paths(key)
+        expected_meta = self._checkpoint_meta(key)
+
+        console.print(f"[yellow]正在加载 Whisper {name} 模型...[/yellow]")
+        try:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore")
+
+                if self._is_checkpoint_valid(checkpoint, meta_file, expected_meta):
+                    # 内存映射加载，跳过下载校验和重新量化
+                    model = torch.load(checkpoint, map_location=device, mmap=True, weights_only=False)
+                    return model, "checkpoint"
+
+                model = whisper.load_model(name, device=device, download_root=str(self.cache_dir))
+
+                # 应用量化优化
+                if quantization == "int8":
+                    model = quantize_int8(model)
+
+            self._save_checkpoint(model, checkpoint, meta_file, expected_meta)
+            return model, "fresh"
+        except Exception as e:
+            console.print(f"[red]模型 {name} 加载失败: {str(e)}[/red]")
+            raise
+
+    def _is_checkpoint_valid(self, checkpoint: Path, meta_file: Path, expected_meta: dict) -> bool:
+        """校验检查点元数据和内容哈希
+
+        内容哈希在保存时计算一次，同时记录文件大小和修改时间；二者不变时不再重新哈希，
+        避免每次启动都读完整个检查点，抵消内存映射加载的收益。
+        """
+        if not checkpoint.exists() or not meta_file.exists():
+            return False
+        try:
+            meta = json.loads(meta_file.read_text())
+        except Exception:
+            return False
+        if any(meta.get(field) != value for field, value in expected_meta.items()):
+            return False
+        if not MODEL_CONFIG['verify_checkpoint']:
+            return True
+        signature = _file_signature(checkpoint)
+        if all(meta.get(field) == value for field, value in signature.items()):
+            return True
+        # 文件被改动过（或旧版本的元数据没有记录大小和时间），重新校验内容
+        if meta.get('sha256') != _file_sha256(checkpoint):
+            console.print(f"[yellow]检查点 {checkpoint.name} 校验失败，重新生成[/yellow]")
+            return False
+        meta_file.write_text(json.dumps({**meta, **signature}))
+        return True
+
+    def _save_checkpoint(self, model, checkpoint: Path, meta_file: Path, meta: dict):
+        """保存量化后的模型，供下次启动直接加载"""
+        import torch
+
+        try:
+            # 先写临时文件再替换，避免中断时留下损坏的检查点
+            temp_file = checkpoint.with_suffix('.tmp')
+            torch.save(model, temp_file)
+            temp_file.replace(checkpoint)
+            meta_file.write_text(json.dumps({**meta, 'sha256': _file_sha256(checkpoint), **_file_signature(checkpoint)}))
+        except Exception as e:
+            console.print(f"[yellow]保存模型检查点失败: {str(e)}[/yellow]")
+
+    def _evict(self, incoming_bytes: int):
+        """按 LRU 顺序淘汰模型，直到为新模型腾出空间"""
+        while self._models and self.total_bytes() + incoming_bytes > self.memory_cap:
+            key, entry = self._models.popitem(last=False)
+            console.print(f"[blue]内存超出上限，已卸载模型 {key[0]} ({entry['bytes'] / 1024 ** 2:.0f}MB)[/blue]")
+        if incoming_bytes > self.memory_cap:
+            console.print("[yellow]单个模型已超过内存上限[/yellow]")
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._models.values())
+
+    def stats(self) -> list:
+        """返回当前常驻模型的内存占用，按最近使用排序"""
+        with self._lock:
+            return [
+                {
+                    'name': key[0],
+                    'device': key[1],
+                    'quantization': key[2],
+                    'bytes': entry['bytes'],
+                    'load_seconds': entry['load_seconds'],
+                    'source': entry['source'],
+                }
+                for key, entry in self._models.items()
+            ]
+
+    def report(self):
+        """显示模型加载耗时和内存占用"""
+        table = Table(show_header=True, header_style="bold magenta", title="Model Startup")
+        table.add_column("Model", style="cyan")
+        table.add_column("Source", style="green")
+        table.add_column("Load time", style="green")
+        table.add_column("Memory", style="green")
+        for entry in self.stats():
+            table.add_row(
+                f"{entry['name']} ({entry['device']}, {entry['quantization']})",
+                entry['source'],
+                f"{entry['load_seconds']:.2f}s",
+                f"{entry['bytes'] / 1024 ** 2:.0f}MB",
+            )
+        console.print(table)
+
+    def unload(self, name: str, device: str = None, quantization: str = None):
+        """手动卸载模型"""
+        with self._lock:
+            self._models.pop(self._make_key(name, device, quantization), None)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """获取进程级共享的模型注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
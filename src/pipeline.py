@@ -0,0 +1,301 @@
+import speech_recognition as sr
+from rich.console import Console
+from rich.table import Table
+from contextlib import contextmanager
+import asyncio
+import queue
+import threading
+import time
+
+from src.telemetry import get_telemetry
+from config.settings import AUDIO_CONFIG, PIPELINE_CONFIG
+
+console = Console()
+
+# 流水线结束标记
+_STOP = None
+
+
+class SpeechPipeline:
+    """持续模式的分级流水线：采集 → 降噪 → 识别 → 增强 → 输出
+
+    采集、降噪、识别运行在各自的线程中，增强和输出运行在 asyncio 事件循环中。
+    各级之间使用有界队列，下游处理不过来时上游阻塞，形成背压。
+    """
+
+    STAGES = ('capture', 'dsp', 'asr', 'enhance', 'output')
+
+    def __init__(self, speech_handler, text_processor, file_handler, config: dict = None, source_factory=None):
+        self.speech_handler = speech_handler
+        self.text_processor = text_processor
+        self.file_handler = file_handler
+        self.config = config or PIPELINE_CONFIG
+        self.source_factory = source_factory or (lambda: sr.Microphone(sample_rate=AUDIO_CONFIG['sample_rate']))
+
+        size = self.config['queue_size']
+        self.dsp_queue = queue.Queue(maxsize=size)
+        self.asr_queue = queue.Queue(maxsize=size)
+        self.loop = asyncio.new_event_loop()
+        self.enhance_queue = None
+        self.output_queue = None
+        self._loop_ready = threading.Event()
+
+        self.stats = {name: {'processed': 0, 'busy': 0.0, 'errors': 0} for name in self.STAGES}
+        self._stop = threading.Event()
+        self._started_at = None
+        # 已采集但尚未输出（或被丢弃）的语音条数
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._threads = []
+
+    def run(self):
+        """启动流水线并阻塞到结束（Ctrl+C 或停止信号）
+
+        第一次 Ctrl+C 停止采集，结束标记依次经过各级，等队列中的语音全部输出后再退出；
+        再按一次 Ctrl+C 立即退出，并报告丢弃的条数。
+        """
+        self._started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=target, daemon=True)
+            for target in (self._capture_stage, self._dsp_stage, self._asr_stage, self._run_loop)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            self._join()
+        except KeyboardInterrupt:
+            self.stop()
+            console.print(f"[yellow]停止采集，等待 {self._in_flight} 条语音处理完毕（再按 Ctrl+C 立即退出）...[/yellow]")
+            try:
+                self._join()
+            except KeyboardInterrupt:
+                pass
+            raise
+        finally:
+            self.stop()
+            self.report()
+
+    def stop(self):
+        """停止采集，已进入流水线的语音继续处理（run 会等各级处理完再返回）"""
+        self._stop.set()
+
+    def _join(self):
+        """按流水线顺序等待各级线程结束（分段等待，以便响应 Ctrl+C）"""
+        for thread in self._threads:
+            while thread.is_alive():
+                thread.join(0.5)
+
+    def _track(self, delta: int):
+        """采集时加一，语音输出或在任一级被丢弃时减一"""
+        with self._in_flight_lock:
+            self._in_flight += delta
+
+    @contextmanager
+    def _timed(self, stage: str, count: int = 1):
+        """统计每一级的处理次数和忙碌时间，单条出错时记录并继续处理下一条"""
+        start = time.perf_counter()
+        try:
+            with get_telemetry().span(f"pipeline_{stage}"):
+                yield
+            self.stats[stage]['processed'] += count
+        except Exception as e:
+            self._record_error(stage, e)
+        finally:
+            self.stats[stage]['busy'] += time.perf_counter() - start
+
+    def _record_error(self, stage: str, error: Exception):
+        self.stats[stage]['errors'] += 1
+        console.print(f"[red]{stage} 阶段错误: {str(error)}[/red]")
+
+    def _capture_stage(self):
+        """采集：麦克风全程保持打开，上一句仍在处理时也能继续录音"""
+        handler = self.speech_handler
+        try:
+            with self.source_factory() as source:
+                handler.quick_ambient_check(source)
+                console.print("[green]开始录音，请说话...[/green]")
+                while not self._stop.is_set():
+                    try:
+                        audio = handler.recognizer.listen(
+                            source,
+                            timeout=self.config['listen_timeout'],
+                            phrase_time_limit=self.config['phrase_time_limit'],
+                        )
+                    except sr.WaitTimeoutError:
+                        continue
+                    self.stats['capture']['processed'] += 1
+                    self._track(1)
+                    self.dsp_queue.put(audio)
+        except Exception as e:
+            self.stats['capture']['errors'] += 1
+            console.print(f"[red]capture 阶段错误: {str(e)}[/red]")
+        finally:
+            self.dsp_queue.put(_STOP)
+
+    def _dsp_stage(self):
+        """降噪并转换为 16kHz float32"""
+        while True:
+            audio = self.dsp_queue.get()
+            if audio is _STOP:
+                self.asr_queue.put(_STOP)
+                return
+            samples = None
+            with self._timed('dsp'):
+                samples = self.speech_handler.preprocess(audio)
+            # 没有语音的片段在这里丢弃，不进入识别和增强
+            if samples is not None:
+                self.asr_queue.put(samples)
+            else:
+                self._track(-1)
+
+    def _asr_stage(self):
+        """快速/精确级联识别，结果交给事件循环中的增强阶段
+
+        队列中有积压时，一次取出多条语音批量解码。
+        """
+        handler = self.speech_handler
+        stopping = False
+        while not stopping:
+            samples = self.asr_queue.get()
+            if samples is _STOP:
+                break
+
+            batch = [samples]
+            size = handler.batch_decoder.choose_batch_size(1 + self.asr_queue.qsize())
+            while len(batch) < size:
+                try:
+                    samples = self.asr_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if samples is _STOP:
+                    stopping = True
+                    break
+                batch.append(samples)
+
+            if len(batch) == 1:
+                result = None
+                with self._timed('asr'):
+                    result = handler.transcribe_samples(batch[0])
+                if result is not None:
+                    self._put_async('enhance_queue', result)
+                else:
+                    self._track(-1)
+                continue
+
+            results = []
+            with self._timed('asr', count=0):
+                results = handler.transcribe_batch(batch)
+            self._track(len(results) - len(batch))
+            for result in results:
+                if isinstance(result, Exception):
+                    self._record_error('asr', result)
+                    self._track(-1)
+                else:
+                    self.stats['asr']['processed'] += 1
+                    self._put_async('enhance_queue', result)
+        self._put_async('enhance_queue', _STOP)
+
+    def _put_async(self, queue_name: str, item):
+        """从线程向事件循环中的队列投递，队列满时阻塞当前线程"""
+        self._loop_ready.wait()
+        target = getattr(self, queue_name)
+        asyncio.run_coroutine_threadsafe(target.put(item), self.loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._async_stages())
+
+    async def _async_stages(self):
+        size = self.config['queue_size']
+        self.enhance_queue = asyncio.Queue(maxsize=size)
+        self.output_queue = asyncio.Queue(maxsize=size)
+        self._loop_ready.set()
+        await asyncio.gather(self._enhance_stage(), self._output_stage())
+
+    async def _enhance_stage(self):
+        """AI 增强：在线程中调用 Ollama，不阻塞事件循环
+
+        队列中有积压时，一次取出多条文本合并为一个批量请求。
+        """
+        stopping = False
+        while not stopping:
+            result = await self.enhance_queue.get()
+            if result is _STOP:
+                break
+
+            batch = [result]
+            while not self.enhance_queue.empty():
+                result = self.enhance_queue.get_nowait()
+                if result is _STOP:
+                    stopping = True
+                    break
+                batch.append(result)
+
+            texts = [result['original'] for result in batch]
+            enhanced_texts = None
+            if len(batch) == 1:
+                with self._timed('enhance'):
+                    enhanced_texts = [await asyncio.to_thread(self.text_processor.enhance_text, texts[0])]
+            else:
+                with self._timed('enhance', count=len(batch)):
+                    enhanced_texts = await asyncio.to_thread(self.text_processor.enhance_texts, texts)
+            if enhanced_texts is not None:
+                for result, enhanced_text in zip(batch, enhanced_texts):
+                    await self.output_queue.put((result['original'], enhanced_text, result.get('type')))
+            else:
+                self._track(-len(batch))
+        await self.output_queue.put(_STOP)
+
+    async def _output_stage(self):
+        """保存、复制到剪贴板并显示队列深度"""
+        while True:
+            item = await self.output_queue.get()
+            if item is _STOP:
+                return
+            original_text, enhanced_text, entry_type = item
+            with self._timed('output'):
+                await asyncio.to_thread(self.file_handler.save_and_copy, original_text, enhanced_text, entry_type=entry_type)
+                console.print(f"[blue]队列深度: {self._queue_depths()}[/blue]")
+            self._track(-1)
+
+    def _queue_depths(self) -> dict:
+        return {
+            'dsp': self.dsp_queue.qsize(),
+            'asr': self.asr_queue.qsize(),
+            'enhance': self.enhance_queue.qsize() if self.enhance_queue else 0,
+            'output': self.output_queue.qsize() if self.output_queue else 0,
+        }
+
+    def report(self):
+        """输出各级吞吐量和队列深度"""
+        minutes = max(time.perf_counter() - (self._started_at or time.perf_counter()), 1e-9) / 60
+        depths = self._queue_depths()
+        table = Table(show_header=True, header_style="bold magenta", title="Pipeline")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Processed", style="green")
+        table.add_column("Errors", style="green")
+        table.add_column("Busy", style="green")
+        table.add_column("Utterances/min", style="green")
+        table.add_column("Queue depth", style="green")
+        for stage in self.STAGES:
+            stats = self.stats[stage]
+            table.add_row(
+                stage,
+                str(stats['processed']),
+                str(stats['errors']),
+                f"{stats['busy']:.1f}s",
+                f"{stats['processed'] / minutes:.2f}",
+                str(depths.get(stage, '-')),
+            )
+        console.print(table)
+        if self._in_flight:
+            console.print(f"[red]退出时丢弃 {self._in_flight} 条未处理完的语音[/red]")
+        trim = self.speech_handler.get_trim_stats()
+        console.print(f"[blue]静音裁剪 {trim['trim_ratio']:.0%}，跳过 {trim['skipped']}/{trim['clips']} 段无语音音频[/blue]")
+        cpu = self.speech_handler.get_cpu_stats()
+        thread, process = cpu['thread'], cpu['process']
+        console.print(f"[blue]解码线程 CPU：快速 {thread['fast_decode']:.1f}s，精确 {thread['accurate_decode']:.1f}s"
+                      f"（{cpu['cancelled_decodes']} 次被取消的解码 {thread['cancelled']:.1f}s）；"
+                      f"含 intra-op 线程池的进程 CPU 上限：快速 {process['fast_decode']:.1f}s，"
+                      f"精确 {process['accurate_decode']:.1f}s[/blue]")
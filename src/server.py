@@ -0,0 +1,198 @@
+from rich.console import Console
+from pathlib import Path
+import base64
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from src.telemetry import get_telemetry
+from config.settings import SERVER_CONFIG
+
+console = Console()
+
+
+def _json_default(value):
+    # 识别结果中可能包含 numpy 标量
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """每个连接一个线程，按行读取 JSON 请求并逐行返回响应"""
+
+    def setup(self):
+        super().setup()
+        self.server.track(self.connection)
+
+    def finish(self):
+        self.server.untrack(self.connection)
+        super().finish()
+
+    def handle(self):
+        limit = self.server.config['max_request_bytes']
+        while True:
+            line = self.rfile.readline(limit + 1)
+            if not line:
+                return
+            if len(line) > limit:
+                self._send({'ok': False, 'error': f"请求超过 {limit} 字节"})
+                return
+            if line.strip():
+                self._send(self.server.dispatch(line))
+
+    def _send(self, response: dict):
+        self.wfile.write((json.dumps(response, ensure_ascii=False, default=_json_default) + '\n').encode('utf-8'))
+        self.wfile.flush()
+
+
+class WhisperPenServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """常驻服务：Whisper 模型、Ollama 连接和历史记录只加载一次，通过 Unix 套接字接受请求
+
+    协议为 JSON Lines，请求 {"id": ..., "method": ..., "params": {...}}，
+    响应 {"id": ..., "ok": true, "result": ...} 或 {"id": ..., "ok": false, "error": ...}。
+    多个连接并发处理；同一时间只有一个请求使用 Whisper 模型，麦克风同理。
+    """
+
+    daemon_threads = False
+    # 关闭时等待正在处理的请求完成
+    block_on_close = True
+
+    METHODS = ('ping', 'transcribe_file', 'transcribe_buffer', 'enhance', 'record', 'shutdown')
+
+    def __init__(self, speech_handler, text_processor, file_handler, socket_path=None, config: dict = None):
+        self.config = config or SERVER_CONFIG
+        self.socket_path = Path(socket_path or self.config['socket_path'])
+        self.speech_handler = speech_handler
+        self.text_processor = text_processor
+        self.file_handler = file_handler
+        self.telemetry = get_telemetry()
+        self.started_at = time.time()
+        self.requests = 0
+
+        # 同一模型的并发解码由模型注册表的推理锁串行化，这里只需保证麦克风同时只有一个请求使用
+        self._mic_lock = threading.Lock()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._closing = False
+
+        self._remove_stale_socket()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(self.socket_path), _RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def _remove_stale_socket(self):
+        """清理上次异常退出遗留的套接字文件；已有服务在运行时报错"""
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+        else:
+            raise Exception(f"WhisperPen 服务已在运行: {self.socket_path}")
+        finally:
+            probe.close()
+
+    def track(self, connection):
+        with self._connections_lock:
+            self._connections.add(connection)
+
+    def untrack(self, connection):
+        with self._connections_lock:
+            self._connections.discard(connection)
+
+    def dispatch(self, line: bytes) -> dict:
+        """解析并执行一条请求，异常转换为错误响应"""
+        request_id = method = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise Exception("请求必须是 JSON 对象")
+            request_id = request.get('id')
+            method = request.get('method')
+            if method not in self.METHODS:
+                raise Exception(f"未知方法: {method}")
+            self.requests += 1
+            with self.telemetry.span(f"server_{method}"):
+                result = getattr(self, f"_{method}")(**(request.get('params') or {}))
+            self.telemetry.increment('server_requests_total', method=method, result='ok')
+            return {'id': request_id, 'ok': True, 'result': result}
+        except Exception as e:
+            self.telemetry.increment('server_requests_total', method=str(method), result='error')
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+
+    def _ping(self) -> dict:
+        return {
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started_at,
+            'requests': self.requests,
+        }
+
+    def _transcribe_file(self, path: str) -> dict:
+        return self.speech_handler.transcribe_file(path)
+
+    def _transcribe_buffer(self, audio: str, sample_rate: int, fast_timeout: float = None, accurate_timeout: float = None) -> dict:
+        """转写客户端上传的音频：base64 编码的 16 位单声道 PCM"""
+        import speech_recognition as sr
+        frames = base64.b64decode(audio)
+        data = sr.AudioData(frames, int(sample_rate), 2)
+        result = self.speech_handler.transcribe_audio(data, fast_timeout=fast_timeout, accurate_timeout=accurate_timeout)
+        result['duration'] = len(frames) / 2 / int(sample_rate)
+        return result
+
+    def _enhance(self, text: str = None, texts: list = None) -> dict:
+        """增强单条（text）或多条（texts）文本，不涉及 Whisper 模型"""
+        if texts is not None:
+            return {'enhanced': self.text_processor.enhance_texts(texts)}
+        if not text:
+            raise Exception("缺少 text 参数")
+        return {'enhanced': self.text_processor.enhance_text(text)}
+
+    def _record(self, enhance: bool = True, save: bool = True) -> dict:
+        """用服务端麦克风录一句话，识别、增强，并保存到历史记录和剪贴板"""
+        with self._mic_lock:
+            result = self.speech_handler.record_and_transcribe()
+        if result['type'] == 'skipped':
+            return {**result, 'enhanced': ''}
+        enhanced_text = self.text_processor.enhance_text(result['original']) if enhance else result['original']
+        if save:
+            with self.telemetry.span('save_and_copy'):
+                self.file_handler.save_and_copy(result['original'], enhanced_text, entry_type=result['type'])
+        return {**result, 'enhanced': enhanced_text}
+
+    def _shutdown(self) -> dict:
+        # serve_forever 所在线程之外才能调用 shutdown，交给后台线程避免阻塞当前响应
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return {'stopping': True}
+
+    def close(self):
+        """优雅关闭：停止接受新连接，等待进行中的请求完成，删除套接字文件"""
+        if self._closing:
+            return
+        self._closing = True
+        # 关闭各连接的读取端，空闲连接立即结束，处理中的请求仍能写回响应
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        self.server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def serve(self):
+        """阻塞运行，直到收到 shutdown 请求或退出信号"""
+        console.print(f"[green]WhisperPen 服务已启动: {self.socket_path}[/green]")
+        try:
+            self.serve_forever(poll_interval=0.2)
+        finally:
+            console.print("[yellow]正在关闭服务，等待进行中的请求完成...[/yellow]")
+            self.close()
+
@@ -1,24 +1,64 @@
 import speech_recognition as sr
 from rich.console import Console
 import numpy as np
-from scipy.signal import butter, lfilter
 import json
-import os
 from pathlib import Path
 import time
-import whisper
-import tempfile
+import threading
 import soundfile as sf
 import warnings
-import torch
-import hashlib
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from src.audio_pipeline import WHISPER_SAMPLE_RATE, AudioPreprocessor, pcm_to_float32, speech_bounds, to_whisper_input
+from src.batch_decoder import BatchDecoder
+from src.inference_scheduler import get_scheduler
+from src.model_registry import get_registry
+from src.telemetry import get_telemetry
+
+from config.settings import AUDIO_CONFIG, CASCADE_CONFIG, TRIM_CONFIG, WHISPER_CONFIG
 
 console = Console()
 
+# 当前线程的取消标记，由模型前向钩子检查
+_cancel_state = threading.local()
+
+
+class TranscriptionCancelled(Exception):
+    """转写被协作式取消"""
+
+
+def _check_cancelled(module, inputs):
+    """模型前向计算前检查取消标记（每个解码窗口和每个 token 步都会经过）"""
+    event = getattr(_cancel_state, 'event', None)
+    if event is not None and event.is_set():
+        raise TranscriptionCancelled()
+
+
+def _install_cancel_hook(model):
+    """为共享模型安装取消检查钩子（只安装一次）"""
+    if getattr(model, '_cancel_hook_installed', False):
+        return
+    model.encoder.register_forward_pre_hook(_check_cancelled)
+    model.decoder.register_forward_pre_hook(_check_cancelled)
+    model._cancel_hook_installed = True
+
+
+def _segment_confidence(segments: list) -> dict:
+    """汇总 Whisper 分段置信度：按 token 数加权的平均对数概率、最大无语音概率和压缩比"""
+    if not segments:
+        return {'avg_logprob': float('-inf'), 'no_speech_prob': 1.0, 'compression_ratio': 0.0}
+    weights = np.array([max(len(segment['tokens']), 1) for segment in segments], dtype=np.float64)
+    logprobs = np.array([segment['avg_logprob'] for segment in segments])
+    return {
+        'avg_logprob': float(np.dot(weights, logprobs) / weights.sum()),
+        'no_speech_prob': max(segment['no_speech_prob'] for segment in segments),
+        'compression_ratio': max(segment['compression_ratio'] for segment in segments),
+    }
+
+
 class SpeechHandler:
-    def __init__(self):
+    def __init__(self, source_factory=None):
+        # 音频源工厂，默认使用麦克风；基准测试可替换为文件回放
+        self.source_factory = source_factory or (lambda: sr.Microphone(sample_rate=AUDIO_CONFIG['sample_rate']))
         self.recognizer = sr.Recognizer()
         # 基础配置
         self.recognizer.pause_threshold = 1.0
@@ -31,37 +71,50 @@ class SpeechHandler:
         self.recognizer.dynamic_energy_ratio = 1.5
         self.recognizer.energy_threshold = 3000
         
-        # 检查 ffmpeg
-        self._check_ffmpeg()
-        
-        # 模型缓存路径
-        self.cache_dir = Path.home() / '.whisperpen' / 'model_cache'
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 延迟加载模型
-        self.whisper_model = None
+        # 模型由进程级注册表统一加载和缓存，与唤醒检测共享
+        self.registry = get_registry()
+        self.telemetry = get_telemetry()
         
         # 读取缓存的噪音配置
         self.config_file = Path.home() / '.whisperpen_config.json'
         self.load_cached_config()
         
-        # 初始化两个模型用于快速/精确识别
-        self.whisper_model_fast = None  # tiny model for quick recognition
-        self.whisper_model_accurate = None  # medium model for accurate recognition
+        # 两个模型用于快速/精确识别
+        self.fast_model_name = WHISPER_CONFIG['fast_model']  # tiny model for quick recognition
+        self.accurate_model_name = WHISPER_CONFIG['accurate_model']  # medium model for accurate recognition
+        self.fast_options = {
+            'temperature': 0.0,
+            'best_of': 1,
+        }
+        self.accurate_options = {
+            'temperature': 0.0,
+            'best_of': 5,
+            'beam_size': 5,
+            'condition_on_previous_text': True,
+            'initial_prompt': "这是一段中文语音。",
+        }
         
-        # 设置并行处理
-        self.executor = ThreadPoolExecutor(max_workers=2)
-    
-    def _check_ffmpeg(self):
-        """检查并安装 ffmpeg"""
-        try:
-            import subprocess
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            console.print("[red]未检测到 ffmpeg，请安装后重试[/red]")
-            console.print("[yellow]在 macOS 上可以使用以下命令安装：[/yellow]")
-            console.print("[blue]brew install ffmpeg[/blue]")
-            raise Exception("请先安装 ffmpeg")
+        # 降噪处理器（滤波器系数只设计一次，process 无状态，可在多个线程中共用）
+        self.preprocessor = AudioPreprocessor()
+        # 静音裁剪统计，监听、流式识别和批量解码线程都会更新
+        self.trim_stats = {'clips': 0, 'skipped': 0, 'input_seconds': 0.0, 'kept_seconds': 0.0}
+        self._trim_lock = threading.Lock()
+        # 解码 CPU 时间，被取消的解码计到取消生效为止：
+        # thread 为解码线程自身（thread_time，不含 PyTorch intra-op 线程池，是下限），
+        # process 为解码期间整个进程（process_time，含线程池，也含同时运行的其他工作，是上限）
+        self.cpu_stats = {
+            'thread': {'fast_decode': 0.0, 'accurate_decode': 0.0, 'cancelled': 0.0},
+            'process': {'fast_decode': 0.0, 'accurate_decode': 0.0, 'cancelled': 0.0},
+            'cancelled_decodes': 0,
+        }
+        self._cpu_lock = threading.Lock()
+        
+        # 快速和精确识别各有专用线程，按调度策略分配线程预算，避免争抢 CPU
+        self.scheduler = get_scheduler()
+        self.fast_executor = self.scheduler.executor('fast')
+        self.accurate_executor = self.scheduler.executor('accurate')
+        # 有积压时多条语音合并为一个批次解码
+        self.batch_decoder = BatchDecoder()
     
     def load_cached_config(self):
         """加载缓存的噪音配置"""
@@ -89,186 +142,388 @@ class SpeechHandler:
         except Exception:
             pass
     
-    def _apply_noise_reduction(self, audio_data):
-        """应用降噪处理"""
-        y = np.frombuffer(audio_data.frame_data, dtype=np.int16)
-        
-        # 1. 音量归一化
-        y = y.astype(np.float32)
-        y = y / np.max(np.abs(y))
+    def _get_preprocessor(self, sample_rate: int) -> AudioPreprocessor:
+        """获取与采样率匹配的降噪处理器（滤波器系数已缓存）"""
+        if self.preprocessor.sample_rate != sample_rate:
+            return AudioPreprocessor(sample_rate=sample_rate)
+        return self.preprocessor
+    
+    def _apply_noise_reduction(self, audio_data) -> np.ndarray:
+        """应用降噪处理，返回采集采样率下的 float32 数组"""
+        samples = np.frombuffer(audio_data.frame_data, dtype=np.int16)
+        return self._get_preprocessor(audio_data.sample_rate).process(samples)
+    
+    def _trim_silence(self, samples: np.ndarray, sample_rate: int):
+        """裁剪首尾静音（在降噪和重采样之前，按原始电平判断），没有语音时返回 None"""
+        with self.telemetry.span('trim_silence'):
+            bounds = speech_bounds(pcm_to_float32(samples), sample_rate, TRIM_CONFIG)
+        input_seconds = len(samples) / sample_rate
+        kept_seconds = (bounds[1] - bounds[0]) / sample_rate if bounds else 0.0
         
-        # 2. 带通滤波（保留人声频率范围）
-        nyq = 22050 / 2
-        low = 100 / nyq  # 降低低频截止，保留更多人声
-        high = 8000 / nyq  # 提高高频截止，保留更多细节
-        b, a = butter(6, [low, high], btype='band')  # 提高滤波器阶数
-        filtered_data = lfilter(b, a, y)
+        with self._trim_lock:
+            self.trim_stats['clips'] += 1
+            self.trim_stats['input_seconds'] += input_seconds
+            self.trim_stats['kept_seconds'] += kept_seconds
+            if bounds is None:
+                self.trim_stats['skipped'] += 1
+        self.telemetry.increment('trim_audio_seconds_total', input_seconds, part='input')
+        self.telemetry.increment('trim_audio_seconds_total', kept_seconds, part='kept')
+        if bounds is None:
+            self.telemetry.increment('clips_skipped_total')
+            console.print("[yellow]未检测到语音，跳过识别[/yellow]")
+            return None
         
-        # 3. 重新归一化并转换回 int16
-        filtered_data = filtered_data * 32767
-        audio_data.frame_data = filtered_data.astype(np.int16).tobytes()
-        return audio_data
+        if kept_seconds < input_seconds:
+            console.print(f"[blue]裁剪静音 {1 - kept_seconds / input_seconds:.0%}（{input_seconds:.1f}s → {kept_seconds:.1f}s）[/blue]")
+        return samples[bounds[0]:bounds[1]]
+    
+    def get_trim_stats(self) -> dict:
+        """返回静音裁剪统计，trim_ratio 为被裁掉的音频占比"""
+        with self._trim_lock:
+            stats = dict(self.trim_stats)
+        stats['trim_ratio'] = 1 - stats['kept_seconds'] / stats['input_seconds'] if stats['input_seconds'] else 0.0
+        return stats
+    
+    def _record_cpu(self, stage: str, thread_seconds: float, process_seconds: float, cancelled: bool = False):
+        """累计一次解码的线程 CPU 时间和进程 CPU 时间"""
+        with self._cpu_lock:
+            for scope, seconds in (('thread', thread_seconds), ('process', process_seconds)):
+                stats = self.cpu_stats[scope]
+                stats[stage] = stats.get(stage, 0.0) + seconds
+                if cancelled:
+                    stats['cancelled'] += seconds
+            if cancelled:
+                self.cpu_stats['cancelled_decodes'] += 1
+        labels = {'stage': stage, 'cancelled': str(cancelled).lower()}
+        self.telemetry.increment('decode_thread_cpu_seconds_total', thread_seconds, **labels)
+        self.telemetry.increment('decode_process_cpu_seconds_total', process_seconds, **labels)
+    
+    def get_cpu_stats(self) -> dict:
+        """返回各类解码的线程 / 进程 CPU 时间，cancelled 为被取消的解码（精确识别、流式窗口）在取消前消耗的部分
+
+        线程 CPU 不含 PyTorch intra-op 线程池，多线程推理时偏低；进程 CPU 含线程池，
+        但也包含同时运行的其他解码和采集线程，二者之间为实际消耗。单线程推理时线程 CPU 即为准确值。
+        """
+        with self._cpu_lock:
+            return {
+                'thread': dict(self.cpu_stats['thread']),
+                'process': dict(self.cpu_stats['process']),
+                'cancelled_decodes': self.cpu_stats['cancelled_decodes'],
+            }
     
     def quick_ambient_check(self, source):
         """快速环境检查"""
+        # 常驻采集的音频流已经稳定，无需预热
+        if getattr(source, 'warm', False):
+            return
         # 读取一小段音频来预热
         source.stream.read(int(source.SAMPLE_RATE * 0.5))
     
-    def _convert_audio_to_wav(self, audio_data):
-        """将音频数据转换为临时WAV文件"""
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-            # 将音频数据写入WAV文件
-            sf.write(
-                temp_wav.name,
-                np.frombuffer(audio_data.frame_data, dtype=np.int16),
-                audio_data.sample_rate,
-                format='WAV',
-                subtype='PCM_16'
-            )
-            return temp_wav.name
+    def _prepare_whisper_input(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """将降噪后的音频直接转换为内存中的 16kHz float32 数组，无需临时文件和 ffmpeg"""
+        return to_whisper_input(samples, sample_rate)
     
     def _load_model(self, model_name="medium"):
-        """优化的模型加载"""
-        if model_name == "tiny" and self.whisper_model_fast:
-            return self.whisper_model_fast
-        if model_name == "medium" and self.whisper_model_accurate:
-            return self.whisper_model_accurate
-            
-        cache_file = self.cache_dir / f"whisper_{model_name}_cache.pt"
-        
-        try:
-            with warnings.catch_warnings():
-                warnings.filterwarnings("ignore")
-                model = whisper.load_model(
-                    model_name,
-                    device="cpu" if not torch.cuda.is_available() else "cuda",
-                    download_root=str(self.cache_dir)
-                )
-                
-                # 应用量化优化
-                if not torch.cuda.is_available():
-                    model = torch.quantization.quantize_dynamic(
-                        model, {torch.nn.Linear}, dtype=torch.qint8
-                    )
-                
-                if model_name == "tiny":
-                    self.whisper_model_fast = model
-                else:
-                    self.whisper_model_accurate = model
-                    
-                return model
-                
-        except Exception as e:
-            console.print(f"[red]模型 {model_name} 加载失败: {str(e)}[/red]")
-            raise
+        """从共享注册表获取模型（首次使用时加载并量化）"""
+        return self.registry.get(model_name)
     
-    def _transcribe_with_model(self, model, audio_path, **kwargs):
-        """使用指定模型进行转写"""
+    def _transcribe_with_model(self, model, audio, cancel_event=None, stage='decode', **kwargs):
+        """使用指定模型进行转写，返回文本和置信度信息"""
+        _install_cancel_hook(model)
+        _cancel_state.event = cancel_event
+        start = time.perf_counter()
+        # 线程 CPU 只统计本线程（不含 PyTorch intra-op 线程池），进程 CPU 作为上限，取消时计到钩子抛出为止
+        cpu_start = time.thread_time()
+        process_start = time.process_time()
+        cancelled = False
         try:
-            with warnings.catch_warnings():
+            with self.telemetry.span(stage, audio_seconds=len(audio) / WHISPER_SAMPLE_RATE), warnings.catch_warnings(), \
+                    self.registry.inference_lock(model):
                 warnings.filterwarnings("ignore", category=UserWarning)
                 result = model.transcribe(
-                    audio_path,
+                    audio,
                     language='zh',
                     task='transcribe',
-                    fp16=torch.cuda.is_available(),
+                    fp16=self.registry.default_device() == "cuda",
                     no_speech_threshold=0.6,
                     logprob_threshold=-1.0,
                     compression_ratio_threshold=2.4,
                     **kwargs
                 )
-            return result['text'].strip()
+            return {
+                'text': result['text'].strip(),
+                'seconds': time.perf_counter() - start,
+                'thread_cpu_seconds': time.thread_time() - cpu_start,
+                'process_cpu_seconds': time.process_time() - process_start,
+                'segments': result['segments'],
+                **_segment_confidence(result['segments']),
+            }
+        except TranscriptionCancelled:
+            cancelled = True
+            self.telemetry.increment('decodes_cancelled_total', stage=stage)
+            return None
         except Exception as e:
             console.print(f"[red]转写失败: {str(e)}[/red]")
             return None
+        finally:
+            _cancel_state.event = None
+            self._record_cpu(stage, time.thread_time() - cpu_start, time.process_time() - process_start, cancelled)
+    
+    def _is_confident(self, result: dict) -> bool:
+        """根据 Whisper 分段置信度判断快速识别结果是否可以直接采用"""
+        return bool(result['text']) \
+            and result['avg_logprob'] >= CASCADE_CONFIG['min_avg_logprob'] \
+            and result['no_speech_prob'] <= CASCADE_CONFIG['max_no_speech_prob'] \
+            and result['compression_ratio'] <= CASCADE_CONFIG['max_compression_ratio']
+    
+    def _ensure_models_loaded(self):
+        """延迟加载快速和精确识别模型"""
+        loaded = len(self.registry.stats())
+        self._load_model(self.fast_model_name)
+        self._load_model(self.accurate_model_name)
+        
+        # 有新加载的模型时输出启动耗时报告
+        if len(self.registry.stats()) > loaded:
+            self.registry.report()
     
     def record_and_transcribe(self) -> dict:
         """优化的录音和转写过程"""
+        with self.telemetry.span('record_and_transcribe'):
+            return self._record_and_transcribe()
+    
+    def _record_and_transcribe(self) -> dict:
         try:
             # 延迟加载模型
-            if self.whisper_model_fast is None:
-                console.print("[yellow]正在加载快速识别模型...[/yellow]")
-                self._load_model("tiny")
-            if self.whisper_model_accurate is None:
-                console.print("[yellow]正在加载精确识别模型...[/yellow]")
-                self._load_model("medium")
+            self._ensure_models_loaded()
 
-            with sr.Microphone(sample_rate=44100) as source:
+            with ExitStack() as stack:
                 try:
-                    # 增加环境噪音调整时间
-                    console.print("[yellow]正在快速检查环境...[/yellow]")
-                    self.quick_ambient_check(source)
+                    # 打开音频源并预热（常驻采集时两者都可以省去）
+                    with self.telemetry.span('open_stream'):
+                        source = stack.enter_context(self.source_factory())
+                        console.print("[yellow]正在快速检查环境...[/yellow]")
+                        self.quick_ambient_check(source)
                     console.print("[green]开始录音，请说话...[/green]")
                     
                     # 调整录音参数
-                    audio = self.recognizer.listen(
-                        source,
-                        timeout=15,
-                        phrase_time_limit=60,
-                    )
-                    
-                    audio = self._apply_noise_reduction(audio)
-                    console.print("[yellow]正在识别...[/yellow]")
-                    
-                    temp_wav = self._convert_audio_to_wav(audio)
-                    
-                    try:
-                        # 并行运行快速和精确识别
-                        future_fast = self.executor.submit(
-                            self._transcribe_with_model,
-                            self.whisper_model_fast,
-                            temp_wav,
-                            temperature=0.0,
-                            best_of=1
-                        )
-                        
-                        future_accurate = self.executor.submit(
-                            self._transcribe_with_model,
-                            self.whisper_model_accurate,
-                            temp_wav,
-                            temperature=0.0,
-                            best_of=5,
-                            beam_size=5,
-                            condition_on_previous_text=True,
-                            initial_prompt="这是一段中文语音。"
+                    with self.telemetry.span('listen'):
+                        audio = self.recognizer.listen(
+                            source,
+                            timeout=15,
+                            phrase_time_limit=60,
                         )
-                        
-                        # 首先检查快速识别结果
-                        try:
-                            text_fast = future_fast.result(timeout=3)
-                            if text_fast and len(text_fast) > 10 and not any(char.isascii() for char in text_fast):
-                                console.print("[green]快速识别完成[/green]")
-                                return {
-                                    'original': text_fast,
-                                    'type': 'fast'
-                                }
-                        except Exception as e:
-                            console.print("[yellow]快速识别失败，等待精确识别...[/yellow]")
-                        
-                        # 等待精确识别结果
-                        try:
-                            text_accurate = future_accurate.result(timeout=10)
-                            if text_accurate:
-                                return {
-                                    'original': text_accurate,
-                                    'type': 'accurate'
-                                }
-                        except Exception as e:
-                            raise Exception(f"精确识别失败: {str(e)}")
-                        
-                        raise Exception("未能识别到有效内容")
-                        
-                    finally:
-                        # 清理临时文件
-                        try:
-                            if os.path.exists(temp_wav):
-                                os.unlink(temp_wav)
-                        except Exception:
-                            pass
+                    
+                    return self.transcribe_audio(audio)
                         
                 except Exception as e:
                     raise Exception(f"录音或识别错误: {str(e)}")
                 
         except Exception as e:
-            raise Exception(f"系统错误: {str(e)}")
\ No newline at end of file
+            raise Exception(f"系统错误: {str(e)}")
+    
+    @staticmethod
+    def read_audio_file(file_path) -> sr.AudioData:
+        """读取 WAV/FLAC 文件为 16 位单声道 AudioData"""
+        data, sample_rate = sf.read(str(file_path), dtype='int16', always_2d=True)
+        # 多声道音频混合为单声道
+        if data.shape[1] > 1:
+            frames = data.mean(axis=1).astype(np.int16)
+        else:
+            frames = data[:, 0]
+        return sr.AudioData(frames.tobytes(), sample_rate, 2)
+    
+    def transcribe_file(self, file_path) -> dict:
+        """转写预先录制的音频文件（WAV/FLAC），不使用麦克风"""
+        audio = self.read_audio_file(file_path)
+        self._ensure_models_loaded()
+        
+        # 离线处理不受实时超时限制
+        result = self.transcribe_audio(audio, fast_timeout=None, accurate_timeout=None)
+        result['duration'] = len(audio.frame_data) / audio.sample_width / audio.sample_rate
+        return result
+    
+    def transcribe_files(self, file_paths: list) -> list:
+        """批量转写多个文件，短音频合并为批次解码；失败的文件对应位置为异常对象"""
+        audios = []
+        for file_path in file_paths:
+            try:
+                audios.append(self.read_audio_file(file_path))
+            except Exception as e:
+                audios.append(e)
+        self._ensure_models_loaded()
+        
+        results = list(audios)
+        samples = {}
+        for i, audio in enumerate(audios):
+            if isinstance(audio, Exception):
+                continue
+            samples[i] = self.preprocess(audio)
+            if samples[i] is None:
+                # 没有语音的文件不解码
+                results[i] = self._skipped_result()
+                del samples[i]
+        
+        decoded = self.transcribe_batch(list(samples.values()), fast_timeout=None, accurate_timeout=None)
+        for i, result in zip(samples, decoded):
+            results[i] = result
+        for i, result in enumerate(results):
+            if isinstance(result, dict):
+                audio = audios[i]
+                result['duration'] = len(audio.frame_data) / audio.sample_width / audio.sample_rate
+        return results
+    
+    def transcribe_audio(self, audio, fast_timeout=CASCADE_CONFIG['fast_timeout'], accurate_timeout=CASCADE_CONFIG['accurate_timeout']) -> dict:
+        """对已采集的音频进行降噪和快速/精确并行识别，没有语音时返回 type 为 skipped 的空结果"""
+        samples = self.preprocess(audio)
+        if samples is None:
+            return self._skipped_result()
+        return self.transcribe_samples(samples, fast_timeout, accurate_timeout)
+    
+    def preprocess(self, audio) -> np.ndarray:
+        """裁剪静音、降噪并转换为 Whisper 输入（16kHz float32），没有语音时返回 None"""
+        samples = np.frombuffer(audio.frame_data, dtype=np.int16)
+        if TRIM_CONFIG['enabled']:
+            # 解码耗时与音频长度成正比，首尾静音不再交给两个模型
+            samples = self._trim_silence(samples, audio.sample_rate)
+            if samples is None:
+                return None
+        # 降噪全程保持 float32，不再转换回 int16
+        with self.telemetry.span('noise_reduction'):
+            samples = self._get_preprocessor(audio.sample_rate).process(samples)
+        # 只解码一次，快速和精确模型共享同一份数组
+        with self.telemetry.span('wav_conversion'):
+            return self._prepare_whisper_input(samples, audio.sample_rate)
+    
+    def _skipped_result(self) -> dict:
+        """没有语音的音频：不解码，也不需要增强"""
+        return {'original': '', 'type': 'skipped', 'metrics': {'path': 'skipped'}}
+    
+    def transcribe_samples(self, samples: np.ndarray, fast_timeout=CASCADE_CONFIG['fast_timeout'], accurate_timeout=CASCADE_CONFIG['accurate_timeout']) -> dict:
+        """对预处理后的音频进行快速/精确并行识别"""
+        console.print("[yellow]正在识别...[/yellow]")
+        
+        # 并行运行快速和精确识别
+        cancel_accurate = threading.Event()
+        future_fast = self.fast_executor.submit(
+            self._transcribe_with_model,
+            self._load_model(self.fast_model_name),
+            samples,
+            stage='fast_decode',
+            **self.fast_options
+        )
+        
+        future_accurate = self.accurate_executor.submit(
+            self._transcribe_with_model,
+            self._load_model(self.accurate_model_name),
+            samples,
+            cancel_event=cancel_accurate,
+            stage='accurate_decode',
+            **self.accurate_options
+        )
+        
+        # 首先检查快速识别结果的置信度
+        try:
+            result_fast = future_fast.result(timeout=fast_timeout)
+            if result_fast and self._is_confident(result_fast):
+                # 快速结果可信，协作式取消精确识别（在下一次模型前向计算前停止）
+                cancel_accurate.set()
+                console.print("[green]快速识别完成[/green]")
+                return self._build_result(result_fast, 'fast')
+            self._record_decision('rejected_fast', result_fast)
+            console.print("[yellow]快速识别置信度不足，等待精确识别...[/yellow]")
+        except Exception as e:
+            result_fast = None
+            self._record_decision('fast_failed', None)
+            console.print("[yellow]快速识别失败，等待精确识别...[/yellow]")
+        
+        # 等待精确识别结果
+        try:
+            result_accurate = future_accurate.result(timeout=accurate_timeout)
+            if result_accurate and result_accurate['text']:
+                built = self._build_result(result_accurate, 'accurate')
+                if result_fast:
+                    built['metrics']['fast_thread_cpu_seconds'] = result_fast['thread_cpu_seconds']
+                    built['metrics']['fast_process_cpu_seconds'] = result_fast['process_cpu_seconds']
+                return built
+        except Exception as e:
+            raise Exception(f"精确识别失败: {str(e)}")
+        
+        self._record_decision('failed', None)
+        raise Exception("未能识别到有效内容")
+    
+    def transcribe_batch(self, samples_list: list, fast_timeout=CASCADE_CONFIG['fast_timeout'], accurate_timeout=CASCADE_CONFIG['accurate_timeout']) -> list:
+        """对多条已预处理的语音批量进行快速识别
+        
+        快速模型以批次方式解码，置信度足够的结果直接采用；置信度不足、超过 30 秒
+        或批量解码失败的语音再单独走快速/精确级联。结果顺序与输入一致，
+        识别失败的位置为异常对象。
+        """
+        results = [None] * len(samples_list)
+        pending = [i for i, samples in enumerate(samples_list) if self.batch_decoder.can_batch(samples)]
+        
+        while len(pending) > 1:
+            size = self.batch_decoder.choose_batch_size(len(pending))
+            if size < 2:
+                break
+            batch, pending = pending[:size], pending[size:]
+            cpu_start = time.thread_time()
+            process_start = time.process_time()
+            try:
+                decoded = self.batch_decoder.decode(
+                    self._load_model(self.fast_model_name),
+                    [samples_list[i] for i in batch],
+                    temperature=self.fast_options['temperature'],
+                )
+            except Exception as e:
+                console.print(f"[yellow]批量解码失败，逐条识别: {str(e)}[/yellow]")
+                continue
+            # 批量解码在当前线程中同步执行，CPU 时间按条数平摊
+            thread_seconds = time.thread_time() - cpu_start
+            process_seconds = time.process_time() - process_start
+            self._record_cpu('fast_decode', thread_seconds, process_seconds)
+            for i, result in zip(batch, decoded):
+                result['thread_cpu_seconds'] = thread_seconds / len(batch)
+                result['process_cpu_seconds'] = process_seconds / len(batch)
+                if self._is_confident(result):
+                    results[i] = self._build_result(result, 'fast')
+                    results[i]['metrics']['batch_size'] = len(batch)
+                else:
+                    self._record_decision('rejected_fast', result)
+            console.print(f"[blue]批量解码 {len(batch)} 条语音[/blue]")
+        
+        for i, samples in enumerate(samples_list):
+            if results[i] is None:
+                try:
+                    results[i] = self.transcribe_samples(samples, fast_timeout, accurate_timeout)
+                except Exception as e:
+                    results[i] = e
+        return results
+    
+    def _record_decision(self, decision: str, result: dict):
+        """记录级联决策及其依据的置信度"""
+        self.telemetry.increment('cascade_decisions_total', decision=decision)
+        confidence = {key: result[key] for key in ('avg_logprob', 'no_speech_prob', 'compression_ratio')} if result else {}
+        self.telemetry.event('cascade_decision', decision=decision, **confidence)
+    
+    def _build_result(self, result: dict, path: str) -> dict:
+        """组装识别结果，记录胜出路径和胜出解码的线程 / 进程 CPU 时间
+        
+        快速路径胜出时精确识别仍在停止途中，它取消前消耗的 CPU 时间计入 get_cpu_stats()。
+        """
+        metrics = {
+            'path': path,
+            'thread_cpu_seconds': result['thread_cpu_seconds'],
+            'process_cpu_seconds': result['process_cpu_seconds'],
+            'decode_seconds': result['seconds'],
+            'avg_logprob': result['avg_logprob'],
+            'no_speech_prob': result['no_speech_prob'],
+            'compression_ratio': result['compression_ratio'],
+        }
+        self._record_decision(path, result)
+        console.print(f"[blue]识别路径: {path}，线程 CPU {metrics['thread_cpu_seconds']:.2f}s"
+                      f"（进程 {metrics['process_cpu_seconds']:.2f}s）[/blue]")
+        return {
+            'original': result['text'],
+            'type': path,
+            'metrics': metrics,
+        }
@@ -0,0 +1,211 @@
+from rich.console import Console
+from rich.live import Live
+from rich.panel import Panel
+from collections import deque
+import numpy as np
+import threading
+import time
+
+from src.audio_pipeline import AudioPreprocessor, to_whisper_input
+from src.telemetry import get_telemetry
+from config.settings import STREAM_CONFIG
+
+console = Console()
+
+
+class StreamingTranscriber:
+    """边说边转写：录音过程中用快速模型解码滑动窗口，说完后只用精确模型重新解码未稳定的尾部"""
+
+    def __init__(self, speech_handler, config: dict = None):
+        self.speech_handler = speech_handler
+        self.config = config or STREAM_CONFIG
+
+    def record_and_transcribe(self) -> dict:
+        """录音并流式转写，返回与 SpeechHandler.record_and_transcribe 相同格式的结果"""
+        with get_telemetry().span('record_and_transcribe', mode='stream'):
+            return self._record_and_transcribe()
+
+    def _record_and_transcribe(self) -> dict:
+        handler = self.speech_handler
+        try:
+            handler._ensure_models_loaded()
+            with handler.source_factory() as source:
+                console.print("[yellow]正在快速检查环境...[/yellow]")
+                handler.quick_ambient_check(source)
+                console.print("[green]开始录音，请说话...[/green]")
+                return self.transcribe_stream(source)
+        except Exception as e:
+            raise Exception(f"系统错误: {str(e)}")
+
+    def transcribe_stream(self, source) -> dict:
+        """从音频源逐块读取，录音的同时在后台线程解码"""
+        self._reset(source.SAMPLE_RATE)
+        decoder = threading.Thread(target=self._decode_loop, daemon=True)
+
+        with Live(Panel("...", title="实时识别"), console=console, refresh_per_second=8) as live:
+            self._live = live
+            decoder.start()
+            try:
+                self._capture(source)
+            finally:
+                # 正在解码的窗口在下一次模型前向计算前取消，尾部解码不必等它跑完
+                self._stop.set()
+
+        try:
+            return self._finalize()
+        finally:
+            decoder.join()
+
+    def _reset(self, sample_rate: int):
+        """初始化一次录音的状态"""
+        self.sample_rate = sample_rate
+        self._preprocessor = AudioPreprocessor(sample_rate=sample_rate)
+        # 预分配整段录音的缓冲区，解码线程读取时不会因扩容而失效
+        self._buffer = np.zeros(int(self.config['phrase_time_limit'] * sample_rate), dtype=np.float32)
+        self._length = 0
+        self._commit_pos = 0
+        self._committed = []
+        self._tentative = ''
+        self._windows = 0
+        self._stop = threading.Event()
+        # 保护提交点和已提交文本：解码线程提交分段与结束时读取尾部互斥
+        self._state_lock = threading.Lock()
+        self._live = None
+
+    def _append(self, samples: np.ndarray) -> bool:
+        """写入已降噪的音频块，缓冲区写满时返回 False"""
+        count = min(len(samples), len(self._buffer) - self._length)
+        self._buffer[self._length:self._length + count] = samples[:count]
+        self._length += count
+        return self._length < len(self._buffer)
+
+    def _capture(self, source):
+        """逐块采集音频，边采集边降噪，检测到停顿后结束"""
+        recognizer = self.speech_handler.recognizer
+        chunk_seconds = source.CHUNK / source.SAMPLE_RATE
+        pre_roll = deque(maxlen=int(recognizer.non_speaking_duration / chunk_seconds) + 1)
+        waited = 0.0
+        silence = 0.0
+        started = False
+
+        while True:
+            raw = source.stream.read(source.CHUNK)
+            if not raw:
+                break
+            chunk = np.frombuffer(raw, dtype=np.int16)
+            filtered = self._preprocessor.process_chunk(chunk)
+            is_speech = np.sqrt(np.mean(np.square(chunk, dtype=np.float32))) > recognizer.energy_threshold
+
+            if not started:
+                # 保留语音开始前的一小段音频
+                pre_roll.append(filtered)
+                waited += chunk_seconds
+                if is_speech:
+                    started = True
+                    for block in pre_roll:
+                        self._append(block)
+                elif waited > self.config['timeout']:
+                    raise Exception("等待语音超时")
+                continue
+
+            silence = 0.0 if is_speech else silence + chunk_seconds
+            if not self._append(filtered) or silence >= recognizer.pause_threshold:
+                break
+
+        self._speech_end = time.perf_counter()
+
+    def _decode_loop(self):
+        """录音期间，每积累 step_seconds 的新音频就用快速模型解码一次当前窗口"""
+        step = int(self.config['step_seconds'] * self.sample_rate)
+        decoded_until = 0
+        while not self._stop.is_set():
+            end = self._length
+            if end - decoded_until < step:
+                self._stop.wait(0.05)
+                continue
+            decoded_until = end
+            self._decode_window(end)
+
+    def _decode_window(self, end: int):
+        """解码 [提交点, end) 窗口，提交已稳定的分段并刷新实时显示"""
+        handler = self.speech_handler
+        start = self._commit_pos
+        result = handler._transcribe_with_model(
+            handler._load_model(handler.fast_model_name),
+            to_whisper_input(self._buffer[start:end], self.sample_rate),
+            cancel_event=self._stop,
+            stage='stream_window',
+            **handler.fast_options
+        )
+        self._windows += 1
+        if not result:
+            return
+
+        with self._state_lock:
+            # 录音已结束时尾部已交给精确模型，丢弃这个窗口的结果
+            if self._stop.is_set():
+                return
+            segments = self._commit_stable(result['segments'], start, end)
+            self._tentative = ''.join(segment['text'].strip() for segment in segments)
+        if self._live is not None:
+            text = ''.join(self._committed) + f"[dim]{self._tentative}[/dim]"
+            self._live.update(Panel(text or "...", title="实时识别"))
+
+    def _commit_stable(self, segments: list, start: int, end: int) -> list:
+        """提交窗口中已稳定的分段，返回仍未稳定的分段"""
+        window_seconds = (end - start) / self.sample_rate
+        if not segments or window_seconds <= self.config['tail_seconds']:
+            return segments
+
+        # 最后一个分段始终视为未稳定，除非窗口已超过上限
+        limit = window_seconds - self.config['tail_seconds']
+        stable = [segment for segment in segments[:-1] if segment['end'] <= limit]
+        if not stable and window_seconds > self.config['max_window_seconds']:
+            stable = segments[:-1] or segments
+
+        if stable:
+            self._committed.append(''.join(segment['text'].strip() for segment in stable))
+            if len(stable) == len(segments):
+                # 整个窗口都已提交
+                self._commit_pos = end
+            else:
+                self._commit_pos = min(end, start + int(stable[-1]['end'] * self.sample_rate))
+        return segments[len(stable):]
+
+    def _finalize(self) -> dict:
+        """说话结束后只用精确模型重新解码未提交的尾部"""
+        handler = self.speech_handler
+        with self._state_lock:
+            tail = self._buffer[self._commit_pos:self._length]
+            committed = ''.join(self._committed)
+            tail_text = self._tentative
+        if len(tail) > 0.1 * self.sample_rate:
+            result = handler._transcribe_with_model(
+                handler._load_model(handler.accurate_model_name),
+                to_whisper_input(tail, self.sample_rate),
+                stage='stream_tail',
+                **handler.accurate_options
+            )
+            if result and result['text']:
+                tail_text = result['text']
+
+        text = committed + tail_text
+        if not text:
+            raise Exception("未能识别到有效内容")
+
+        metrics = {
+            'path': 'stream',
+            'finalize_seconds': time.perf_counter() - self._speech_end,
+            'tail_seconds': len(tail) / self.sample_rate,
+            'audio_seconds': self._length / self.sample_rate,
+            'windows': self._windows,
+        }
+        console.print(
+            f"[blue]语音结束后 {metrics['finalize_seconds']:.2f}s 完成，"
+            f"重新解码尾部 {metrics['tail_seconds']:.1f}s / 共 {metrics['audio_seconds']:.1f}s[/blue]"
+        )
+        return {
+            'original': text,
+            'type': 'stream',
+            'metrics': metrics,
+        }
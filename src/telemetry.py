@@ -0,0 +1,261 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+
+from config.settings import TELEMETRY_CONFIG
+
+# 当前线程的 span 栈，用于记录父子关系
+_span_state = threading.local()
+_span_ids = itertools.count(1)
+
+
+def current_rss_bytes() -> int:
+    """当前进程的常驻内存（RSS），Linux 读取 /proc，其他平台退化为峰值 RSS"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 为 KB
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ''
+    escaped = []
+    for name, value in items:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class Telemetry:
+    """轻量级埋点：阶段耗时 span、计数器、直方图和 RSS，可导出为 Prometheus 文本或 JSONL 轨迹"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or TELEMETRY_CONFIG
+        self.buckets = tuple(self.config['buckets'])
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._trace_file = None
+        self._server = None
+
+    def configure(self, trace_file: str = None, metrics_port: int = None):
+        """开启 JSONL 轨迹文件和/或 Prometheus 指标端点"""
+        if trace_file:
+            path = Path(trace_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._trace_file = open(path, 'a', encoding='utf-8', buffering=1)
+        if metrics_port is not None:
+            self._server = _MetricsServer(self, metrics_port)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if self._trace_file is not None:
+            with self._lock:
+                self._trace_file.close()
+                self._trace_file = None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """记录一个阶段的耗时；嵌套的 span 在轨迹中记录父 span"""
+        stack = getattr(_span_state, 'stack', None)
+        if stack is None:
+            stack = _span_state.stack = []
+        span_id = next(_span_ids)
+        parent_id = stack[-1] if stack else None
+        stack.append(span_id)
+
+        start_time = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self.observe('stage_seconds', duration, stage=name)
+            if error:
+                self.increment('stage_errors_total', stage=name)
+            if self._trace_file is not None:
+                self._write_trace({
+                    'ts': start_time,
+                    'span': name,
+                    'id': span_id,
+                    'parent': parent_id,
+                    'thread': threading.current_thread().name,
+                    'duration_ms': round(duration * 1000, 3),
+                    'rss_mb': round(current_rss_bytes() / 1024 / 1024, 1),
+                    'error': error,
+                    'attributes': attributes,
+                })
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """计数器加一（或加 value）"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """向直方图记录一次观测值（秒）"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def event(self, name: str, **attributes):
+        """在轨迹中记录一个瞬时事件（如级联决策）"""
+        if self._trace_file is not None:
+            self._write_trace({'ts': time.time(), 'event': name, 'attributes': attributes})
+
+    def _write_trace(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.write(line)
+
+    def render_prometheus(self) -> str:
+        """生成 Prometheus 文本格式（0.0.4）"""
+        self.set_gauge('resident_memory_bytes', current_rss_bytes())
+        prefix = self.config['prefix']
+        lines = []
+        with self._lock:
+            for metric_type, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+                    for (metric_name, labels), value in metrics.items():
+                        if metric_name == name:
+                            lines.append(f"{prefix}_{name}{_format_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for (metric_name, labels), histogram in self._histograms.items():
+                    if metric_name != name:
+                        continue
+                    for bound, count in zip(self.buckets, histogram['buckets']):
+                        lines.append(f"{prefix}_{name}_bucket{_format_labels(labels, {'le': bound})} {count}")
+                    lines.append(f"{prefix}_{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram['count']}")
+                    lines.append(f"{prefix}_{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                    lines.append(f"{prefix}_{name}_count{_format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> dict:
+        """各阶段的调用次数和平均耗时"""
+        with self._lock:
+            return {
+                dict(labels)['stage']: {'count': histogram['count'], 'mean': histogram['sum'] / histogram['count']}
+                for (name, labels), histogram in self._histograms.items()
+                if name == 'stage_seconds' and histogram['count']
+            }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.telemetry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, telemetry: Telemetry, port: int):
+        super().__init__((telemetry.config['metrics_host'], port), _MetricsHandler)
+        self.telemetry = telemetry
+
+
+@contextmanager
+def profile_session(output_file: str = None):
+    """对整个会话做 cProfile 采样，结束时写入 pstats 文件
+
+    识别、增强等工作大多在流水线和线程池的线程中执行。Python 3.12 之前 cProfile 只采样
+    调用 enable() 的线程，因此通过 threading.setprofile 为会话中新启动的每个线程各建一个
+    profiler，结束时与主线程的结果合并为一个 pstats 文件（会话开始前已在运行的线程不采样）。
+    """
+    if not output_file:
+        yield
+        return
+    profiler = cProfile.Profile()
+    thread_profilers = []
+    lock = threading.Lock()
+    per_thread = sys.version_info < (3, 12)
+
+    def start_thread_profiler(frame, event, arg):
+        # 线程的第一个事件：换成该线程自己的 profiler
+        sys.setprofile(None)
+        thread_profiler = cProfile.Profile()
+        with lock:
+            thread_profilers.append(thread_profiler)
+        thread_profiler.enable()
+
+    if per_thread:
+        threading.setprofile(start_thread_profiler)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if per_thread:
+            threading.setprofile(None)
+        stats = pstats.Stats(profiler)
+        with lock:
+            for thread_profiler in thread_profilers:
+                thread_profiler.create_stats()
+                if thread_profiler.stats:
+                    stats.add(thread_profiler)
+        stats.dump_stats(output_file)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """进程级共享的埋点实例"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+        return _telemetry
@@ -1,34 +1,99 @@
 from rich.console import Console
+from typing import Callable
 import ollama
+import json
+import re
+import threading
 import time
 
+from src.translation_cache import TranslationCache
+from src.telemetry import get_telemetry
+from config.settings import CACHE_CONFIG, OLLAMA_CONFIG
+
 console = Console()
 
+# 提示词版本，修改提示词时递增以使旧的缓存失效
+PROMPT_VERSION = 1
+
+# 批量结果校验：译文与原文的长度比范围，以及译文中允许的中文字符比例
+_MIN_LENGTH_RATIO = 0.3
+_MAX_LENGTH_RATIO = 10.0
+_MAX_CJK_RATIO = 0.2
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+# 拒答或自我说明（小模型常见），出现时结果不可用
+_REFUSAL_PATTERN = re.compile(
+    r"I'?m sorry,? but|I (?:cannot|can't|am unable to) (?:help|assist|translate|provide|comply)|as an AI\b|抱歉|无法翻译",
+    re.IGNORECASE,
+)
+# 用于估计句子复杂度的分句标点
+_CLAUSE_PATTERN = re.compile(r'[，。！？；,.!?;]')
+
 class TextProcessor:
     def __init__(self):
-        self.model = "qwen2.5:32b"
+        self.model = OLLAMA_CONFIG['model']
+        self.keep_alive = OLLAMA_CONFIG['keep_alive']
+        # 模型级联，未配置时只使用 model
+        self.tiers = OLLAMA_CONFIG['tiers'] or [{'name': 'default', 'model': self.model}]
+        self.last_metrics = None
+        self.last_tier = None
+        self.telemetry = get_telemetry()
+        # LLM 调用统计
+        self.stats = {'calls': 0, 'batched_calls': 0, 'batched_items': 0, 'fallback_items': 0, 'llm_seconds': 0.0}
+        self.tier_stats = {tier['name']: {'served': 0, 'escalated': 0, 'failed': 0, 'seconds': 0.0} for tier in self.tiers}
+        self.cache = TranslationCache() if CACHE_CONFIG['enabled'] else None
+        # 专用客户端，底层 HTTP 连接池在多次请求间保持长连接
+        self.client = ollama.Client(host=OLLAMA_CONFIG['host'], timeout=OLLAMA_CONFIG['timeout'])
         self._ensure_model_available()
         
+    @staticmethod
+    def _model_names(models) -> set:
+        """兼容不同版本 ollama 客户端返回的模型名字段"""
+        return {model.get('model') or model.get('name') for model in models}
+    
+    def _tier_models(self) -> list:
+        """级联中用到的模型（去重，保持顺序）"""
+        return list(dict.fromkeys(tier['model'] for tier in self.tiers))
+    
     def _ensure_model_available(self):
-        """确保模型已经下载"""
-        try:
-            # 检查模型是否存在
-            ollama.list()
-        except Exception as e:
-            console.print("[yellow]正在下载 Qwen 模型，这可能需要一些时间...[/yellow]")
+        """确保级联中的模型都已经下载"""
+        # 检查模型是否存在
+        available = self._model_names(self.client.list()['models'])
+        for model in self._tier_models():
+            if model in available:
+                continue
+            console.print(f"[yellow]正在下载 {model} 模型，这可能需要一些时间...[/yellow]")
             try:
-                ollama.pull(self.model)
+                self.client.pull(model)
             except Exception as e:
                 console.print(f"[red]模型下载失败: {str(e)}[/red]")
                 raise
     
-    def enhance_text(self, text: str) -> str:
-        """使用 Ollama 增强文本"""
+    def is_model_warm(self, model: str = None) -> bool:
+        """健康检查：模型是否已加载在 Ollama 内存中"""
         try:
-            # 去除重复的文本
-            text = self._remove_duplicates(text)
-            
-            prompt = f"""
+            return (model or self.model) in self._model_names(self.client.ps()['models'])
+        except Exception:
+            return False
+    
+    def prewarm(self):
+        """发送空对话让 Ollama 提前加载级联中的模型，并按 keep_alive 保持常驻"""
+        for model in self._tier_models():
+            start = time.perf_counter()
+            try:
+                self.client.chat(model=model, messages=[], keep_alive=self.keep_alive)
+                console.print(f"[blue]{model} 模型预热完成（{time.perf_counter() - start:.1f}s）[/blue]")
+            except Exception as e:
+                console.print(f"[yellow]{model} 模型预热失败: {str(e)}[/yellow]")
+    
+    def prewarm_async(self) -> threading.Thread:
+        """在后台线程预热模型，可与 Whisper 模型加载并行"""
+        thread = threading.Thread(target=self.prewarm, daemon=True)
+        thread.start()
+        return thread
+    
+    def _build_prompt(self, text: str) -> str:
+        """构造翻译提示词"""
+        return f"""
 将以下中文文本翻译成英文，要求：
 1. 使用简单直白的表达
 2. 保持原意
@@ -37,51 +102,342 @@ class TextProcessor:
 
 原文：{text}
 """
+    
+    def _token_budget(self, text: str) -> int:
+        """根据输入长度估算输出 token 上限，避免长文本被截断"""
+        budget = OLLAMA_CONFIG['token_budget']
+        estimate = budget['base'] + budget['per_char'] * len(text)
+        return int(min(budget['max'], max(budget['min'], estimate)))
+    
+    def _request_options(self, num_predict: int) -> dict:
+        return {**OLLAMA_CONFIG['options'], 'num_predict': num_predict}
+    
+    def _cache_key(self, text: str) -> str:
+        # 级联配置变化时译文来源可能不同，旧的缓存失效
+        models = '>'.join(tier['model'] for tier in self.tiers)
+        return TranslationCache.make_key(text, models, PROMPT_VERSION, OLLAMA_CONFIG['options'])
+    
+    def get_stats(self) -> dict:
+        """返回 LLM 调用次数和耗时统计，以及各级模型的服务次数"""
+        return {**self.stats, 'tiers': {name: dict(stats) for name, stats in self.tier_stats.items()}}
+    
+    @staticmethod
+    def _tier_accepts(tier: dict, text: str) -> bool:
+        """文本是否足够短、足够简单，可以交给该级模型"""
+        if tier.get('max_chars') is not None and len(text) > tier['max_chars']:
+            return False
+        if tier.get('max_clauses') is not None and len(_CLAUSE_PATTERN.split(text.strip('，。！？；,.!?; '))) > tier['max_clauses']:
+            return False
+        return True
+    
+    def _first_tier(self, text: str) -> int:
+        """文本可以使用的最低一级；最后一级总是接受"""
+        for index, tier in enumerate(self.tiers[:-1]):
+            if self._tier_accepts(tier, text):
+                return index
+        return len(self.tiers) - 1
+    
+    def _record_tier(self, index: int, seconds: float, result: str, count: int = 1):
+        """记录某一级模型的处理结果（served / escalated / failed）和耗时"""
+        name = self.tiers[index]['name']
+        stats = self.tier_stats[name]
+        stats[result] += count
+        stats['seconds'] += seconds
+        self.telemetry.increment('llm_tier_requests_total', count, tier=name, result=result)
+        self.telemetry.observe('llm_tier_seconds', seconds, tier=name)
+    
+    def enhance_text(self, text: str) -> str:
+        """使用 Ollama 增强文本"""
+        return self.enhance_text_stream(text)
+    
+    def enhance_text_stream(self, text: str, on_update: Callable[[str], None] = None) -> str:
+        """使用 Ollama 流式增强文本，每收到一个 token 就以当前累计文本回调 on_update"""
+        with self.telemetry.span('enhance_text', chars=len(text)) as span:
+            return self._enhance_text_stream(text, on_update, span)
+    
+    def _enhance_text_stream(self, text: str, on_update: Callable[[str], None], span: dict) -> str:
+        try:
+            # 去除重复的文本
+            text = self._remove_duplicates(text)
             
-            console.print("[yellow]正在调用 Ollama 进行文本增强...[/yellow]")
+            # 先查询翻译缓存
+            cache_key = self._cache_key(text)
+            cached_text = self.cache.get(cache_key) if self.cache else None
+            span['cached'] = bool(cached_text)
+            if self.cache:
+                self.telemetry.increment('translation_cache_total', result='hit' if cached_text else 'miss')
+            if cached_text:
+                stats = self.cache.stats()
+                console.print(f"[blue]命中翻译缓存（命中率 {stats['hit_rate']:.0%}）[/blue]")
+                if on_update:
+                    on_update(cached_text)
+                return cached_text
             
-            # 重试机制
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = ollama.chat(
-                        model=self.model,
-                        messages=[{
-                            'role': 'user',
-                            'content': prompt
-                        }],
-                        stream=False,
-                        options={
-                            'num_predict': 100,
-                            'top_k': 50,
-                            'top_p': 0.95,
-                            'repeat_penalty': 1.1,
-                        }
-                    )
-                    
-                    enhanced_text = response['message']['content'].strip()
-                    
-                    # 如果返回内容包含解释性文字，尝试提取实际翻译部分
-                    if 'Translation:' in enhanced_text:
-                        enhanced_text = enhanced_text.split('Translation:')[1].strip()
-                    
-                    if not enhanced_text:
-                        raise Exception("AI 增强返回空结果")
-                        
-                    return enhanced_text
-                    
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        console.print(f"[yellow]AI 增强失败，正在重试 ({attempt + 1}/{max_retries})...[/yellow]")
-                        time.sleep(1)
-                    else:
-                        raise
+            enhanced_text = self._request_single(text, on_update)
+            span['tier'] = self.last_tier
+            if self.cache:
+                self.cache.put(cache_key, enhanced_text)
+            return enhanced_text
             
         except Exception as e:
             console.print(f"[red]AI 增强失败: {str(e)}[/red]")
             # 如果增强失败，返回原文
             return text
     
+    def _request_single(self, text: str, on_update: Callable[[str], None] = None, first_tier: int = 0) -> str:
+        """单条文本按模型级联请求 Ollama，失败时抛出异常
+        
+        从能处理该文本的最低一级开始；结果未通过质量检查或请求出错时升级到下一级，
+        最后一级带重试，其结果不再检查。
+        """
+        prompt = self._build_prompt(text)
+        console.print("[yellow]正在调用 Ollama 进行文本增强...[/yellow]")
+        
+        last = len(self.tiers) - 1
+        for index in range(max(first_tier, self._first_tier(text)), last + 1):
+            tier = self.tiers[index]
+            start = time.perf_counter()
+            try:
+                enhanced_text = self._request_model(tier['model'], prompt, text, on_update, max_retries=3 if index == last else 1)
+                issue = None if index == last else self._quality_issue(text, enhanced_text)
+            except Exception as e:
+                if index == last:
+                    self._record_tier(index, time.perf_counter() - start, 'failed')
+                    raise
+                issue = str(e)
+            
+            if issue is None:
+                self._record_tier(index, time.perf_counter() - start, 'served')
+                self.last_tier = tier['name']
+                self.last_metrics['tier'] = tier['name']
+                return enhanced_text
+            self._record_tier(index, time.perf_counter() - start, 'escalated')
+            console.print(f"[yellow]{tier['name']} 模型结果不可用（{issue}），升级到 {self.tiers[index + 1]['name']}[/yellow]")
+            if on_update:
+                on_update('')
+    
+    def _request_model(self, model: str, prompt: str, text: str, on_update: Callable[[str], None], max_retries: int) -> str:
+        """用指定模型请求（带重试），失败时抛出异常"""
+        for attempt in range(max_retries):
+            try:
+                enhanced_text = self._stream_chat(prompt, on_update, num_predict=self._token_budget(text), model=model)
+                
+                # 如果返回内容包含解释性文字，尝试提取实际翻译部分
+                if 'Translation:' in enhanced_text:
+                    enhanced_text = enhanced_text.split('Translation:')[1].strip()
+                
+                if not enhanced_text:
+                    raise Exception("AI 增强返回空结果")
+                return enhanced_text
+                
+            except Exception as e:
+                self.telemetry.increment('llm_failures_total')
+                if attempt < max_retries - 1:
+                    console.print(f"[yellow]AI 增强失败，正在重试 ({attempt + 1}/{max_retries})...[/yellow]")
+                    if on_update:
+                        on_update('')
+                    time.sleep(1)
+                else:
+                    raise
+    
+    def enhance_texts(self, texts: list) -> list:
+        """批量增强多条文本，结果顺序与输入一致
+        
+        缓存未命中的文本合并为一次结构化请求，返回结果逐条校验；
+        批量请求失败或未通过校验的条目改为单独请求。
+        """
+        with self.telemetry.span('enhance_texts', items=len(texts)):
+            texts = [self._remove_duplicates(text) for text in texts]
+            results = [None] * len(texts)
+            pending = []
+            for index, text in enumerate(texts):
+                cached_text = self.cache.get(self._cache_key(text)) if self.cache else None
+                if self.cache:
+                    self.telemetry.increment('translation_cache_total', result='hit' if cached_text else 'miss')
+                if cached_text:
+                    results[index] = cached_text
+                else:
+                    pending.append(index)
+            
+            # 逐条请求时从哪一级开始：批量结果未通过校验的条目直接升级
+            first_tiers = {}
+            max_items = OLLAMA_CONFIG['max_batch_items']
+            for start in range(0, len(pending), max_items):
+                group = pending[start:start + max_items]
+                if len(group) < 2:
+                    continue
+                # 整批使用所有条目都能接受的一级
+                tier_index = max(self._first_tier(texts[index]) for index in group)
+                try:
+                    translations = self._batch_chat([texts[index] for index in group], tier_index)
+                    escalate_to = min(tier_index + 1, len(self.tiers) - 1)
+                except Exception as e:
+                    console.print(f"[yellow]批量增强失败，改为逐条请求: {str(e)}[/yellow]")
+                    translations = {}
+                    escalate_to = 0
+                for position, index in enumerate(group):
+                    if position in translations:
+                        results[index] = translations[position]
+                        if self.cache:
+                            self.cache.put(self._cache_key(texts[index]), translations[position])
+                    else:
+                        self.stats['fallback_items'] += 1
+                        first_tiers[index] = escalate_to
+            
+            for index in pending:
+                if results[index] is None:
+                    try:
+                        results[index] = self._request_single(texts[index], first_tier=first_tiers.get(index, 0))
+                        if self.cache:
+                            self.cache.put(self._cache_key(texts[index]), results[index])
+                    except Exception as e:
+                        console.print(f"[red]AI 增强失败: {str(e)}[/red]")
+                        results[index] = texts[index]
+            return results
+    
+    def _build_batch_prompt(self, texts: list) -> str:
+        """构造批量翻译提示词，每条文本带编号，要求返回 JSON"""
+        items = json.dumps([{'id': index, 'text': text} for index, text in enumerate(texts)], ensure_ascii=False)
+        return f"""
+将以下 JSON 数组中每一项的中文文本分别翻译成英文，要求：
+1. 使用简单直白的表达
+2. 保持原意
+3. 去除不必要的修饰
+4. 每一项单独翻译，不要合并或拆分
+
+只返回 JSON，格式为 {{"items": [{{"id": 编号, "translation": "英文翻译"}}]}}
+
+输入：{items}
+"""
+    
+    def _batch_chat(self, texts: list, tier_index: int = None) -> dict:
+        """用指定一级的模型一次请求翻译多条文本，返回通过校验的 {序号: 译文}"""
+        if tier_index is None:
+            tier_index = len(self.tiers) - 1
+        num_predict = sum(self._token_budget(text) for text in texts) + 16 * len(texts)
+        num_predict = min(num_predict, OLLAMA_CONFIG['token_budget']['max'] * 2)
+        start = time.perf_counter()
+        try:
+            response = self.client.chat(
+                model=self.tiers[tier_index]['model'],
+                messages=[{
+                    'role': 'user',
+                    'content': self._build_batch_prompt(texts)
+                }],
+                format='json',
+                options=self._request_options(num_predict),
+                keep_alive=self.keep_alive
+            )
+        finally:
+            self.stats['calls'] += 1
+            self.stats['batched_calls'] += 1
+            self.stats['batched_items'] += len(texts)
+            self.stats['llm_seconds'] += time.perf_counter() - start
+        
+        content = json.loads(response['message']['content'])
+        items = content.get('items', []) if isinstance(content, dict) else content
+        translations = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index, translation = item.get('id'), item.get('translation')
+            if isinstance(index, int) and 0 <= index < len(texts) \
+                    and self._is_valid_translation(texts[index], translation):
+                translations[index] = translation.strip()
+        self._record_tier(tier_index, time.perf_counter() - start, 'served', count=len(translations))
+        console.print(f"[blue]批量增强 {len(texts)} 条，{len(translations)} 条通过校验[/blue]")
+        return translations
+    
+    @staticmethod
+    def _quality_issue(source: str, translation) -> str:
+        """检查译文质量，返回不合格的原因，合格时返回 None
+        
+        依次检查：非空、是英文（中文字符比例）、长度与原文相称、不是拒答。
+        """
+        if not isinstance(translation, str) or not translation.strip():
+            return '空结果'
+        translation = translation.strip()
+        if len(_CJK_PATTERN.findall(translation)) > _MAX_CJK_RATIO * len(translation):
+            return '包含中文'
+        ratio = len(translation) / max(len(source), 1)
+        if not _MIN_LENGTH_RATIO <= ratio <= _MAX_LENGTH_RATIO:
+            return f"长度比 {ratio:.1f}"
+        if _REFUSAL_PATTERN.search(translation):
+            return '拒答'
+        return None
+    
+    @staticmethod
+    def _is_valid_translation(source: str, translation) -> bool:
+        """校验单条译文：非空、是英文、长度与原文相称、不是拒答"""
+        return TextProcessor._quality_issue(source, translation) is None
+    
+    def _stream_chat(self, prompt: str, on_update: Callable[[str], None] = None, num_predict: int = None, model: str = None) -> str:
+        """流式调用 Ollama，并记录首 token 时间和生成速度"""
+        model = model or self.model
+        start = time.perf_counter()
+        first_token_time = None
+        chunks = []
+        final = None
+        
+        stream = self.client.chat(
+            model=model,
+            messages=[{
+                'role': 'user',
+                'content': prompt
+            }],
+            stream=True,
+            options=self._request_options(num_predict or OLLAMA_CONFIG['token_budget']['min']),
+            keep_alive=self.keep_alive
+        )
+        for chunk in stream:
+            content = chunk['message']['content']
+            if content:
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                chunks.append(content)
+                if on_update:
+                    on_update(''.join(chunks))
+            if chunk.get('done'):
+                final = chunk
+        
+        end = time.perf_counter()
+        self.stats['calls'] += 1
+        self.stats['llm_seconds'] += end - start
+        self.last_metrics = self._stream_metrics(start, first_token_time, end, len(chunks), final)
+        # 模型已被卸载时首个 token 包含加载时间；由响应自带的 load_duration 判断，无需每次请求前查询 ps
+        load_seconds = (final.get('load_duration') or 0) / 1e9 if final else 0.0
+        is_cold = load_seconds >= OLLAMA_CONFIG['cold_load_seconds']
+        if is_cold:
+            console.print(f"[yellow]{model} 模型未常驻，本次请求包含 {load_seconds:.1f}s 冷启动[/yellow]")
+        self.last_metrics['cold'] = is_cold
+        self.last_metrics['load_seconds'] = load_seconds
+        self.last_metrics['model'] = model
+        self.telemetry.observe('llm_ttft_seconds', self.last_metrics['ttft'], cold=is_cold)
+        self.telemetry.increment('llm_tokens_total', self.last_metrics['tokens'])
+        console.print(
+            f"[blue]首 token {self.last_metrics['ttft']:.2f}s，"
+            f"{self.last_metrics['tokens_per_second']:.1f} tokens/s[/blue]"
+        )
+        return ''.join(chunks).strip()
+    
+    def _stream_metrics(self, start, first_token_time, end, chunk_count, final) -> dict:
+        """计算首 token 时间和 tokens/s，优先使用 Ollama 返回的统计"""
+        ttft = (first_token_time or end) - start
+        eval_count = final.get('eval_count') if final else None
+        eval_duration = final.get('eval_duration') if final else None
+        if eval_count and eval_duration:
+            tokens, tokens_per_second = eval_count, eval_count / (eval_duration / 1e9)
+        else:
+            generation = end - (first_token_time or end)
+            tokens = chunk_count
+            tokens_per_second = chunk_count / generation if generation > 0 else 0.0
+        return {
+            'ttft': ttft,
+            'tokens': tokens,
+            'tokens_per_second': tokens_per_second,
+            'total_seconds': end - start,
+        }
+    
     def _remove_duplicates(self, text: str) -> str:
         """去除文本中的重复部分"""
         # 分词并去除重复
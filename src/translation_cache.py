@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from config.settings import CACHE_CONFIG
+
+
+def normalize_text(text: str) -> str:
+    """归一化原文，使近似相同的语句命中同一缓存条目"""
+    text = unicodedata.normalize('NFKC', text).strip().lower()
+    text = re.sub(r'\s+', ' ', text)
+    return text.rstrip('。.！!；;，, ')
+
+
+class TranslationCache:
+    """两级翻译缓存：内存 LRU + SQLite 持久化存储"""
+
+    def __init__(self, db_path: Path = None, memory_entries: int = None,
+                 max_entries: int = None, ttl_seconds: float = None):
+        self.db_path = Path(db_path or CACHE_CONFIG['db_path'])
+        self.memory_entries = memory_entries or CACHE_CONFIG['memory_entries']
+        self.max_entries = max_entries or CACHE_CONFIG['max_entries']
+        self.ttl_seconds = ttl_seconds or CACHE_CONFIG['ttl_seconds']
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_accessed ON translations (accessed_at)')
+        self._db.commit()
+        # 磁盘条目数只在启动时统计一次，之后随插入和删除增减，写入时无需 COUNT(*) 全表扫描
+        self._disk_entries = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    @staticmethod
+    def make_key(text: str, model: str, prompt_version: int, options: dict) -> str:
+        """由归一化原文、模型名、提示词版本和生成参数计算缓存键"""
+        payload = json.dumps(
+            [normalize_text(text), model, prompt_version, options],
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """查询缓存，未命中或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[0]
+
+            row = self._db.execute(
+                'SELECT value, created_at FROM translations WHERE key = ?', (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                self._db.execute('UPDATE translations SET accessed_at = ? WHERE key = ?', (now, key))
+                self._db.commit()
+                self._remember(key, row[0], row[1])
+                self._stats['disk_hits'] += 1
+                return row[0]
+
+            if row:
+                # 过期条目直接删除
+                deleted = self._db.execute('DELETE FROM translations WHERE key = ?', (key,)).rowcount
+                self._db.commit()
+                self._disk_entries -= deleted
+            self._memory.pop(key, None)
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key: str, value: str):
+        """写入两级缓存，超出容量时淘汰最久未使用的条目"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            updated = self._db.execute(
+                'UPDATE translations SET value = ?, created_at = ?, accessed_at = ? WHERE key = ?',
+                (value, now, now, key),
+            ).rowcount
+            if not updated:
+                self._db.execute(
+                    'INSERT INTO translations (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, value, now, now),
+                )
+                self._disk_entries += 1
+            if self._disk_entries > self.max_entries:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """淘汰最久未使用的条目，一次多淘汰 10%，避免每次写入都触发清理
+
+        淘汰前重新统计条目数，校正其他进程写入同一数据库造成的计数偏差。
+        """
+        count = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        if count > self.max_entries:
+            excess = count - self.max_entries + self.max_entries // 10
+            self._db.execute(
+                'DELETE FROM translations WHERE key IN '
+                '(SELECT key FROM translations ORDER BY accessed_at LIMIT ?)',
+                (excess,),
+            )
+            count -= excess
+        self._disk_entries = count
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """返回命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
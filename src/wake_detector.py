@@ -1,19 +1,34 @@
 import speech_recognition as sr
 from rich.console import Console
+from rich.table import Table
+from contextlib import contextmanager
+import numpy as np
 import time
 import threading
 from queue import Queue
 
+from src.audio_pipeline import pcm_to_float32, to_whisper_input
+from src.inference_scheduler import get_scheduler
+from src.model_registry import get_registry
+from src.telemetry import get_telemetry
+from src.wake_gate import EnergyGate, KeywordMatcher
+from config.settings import WAKE_CONFIG
+
 console = Console()
 
 class WakeDetector:
-    def __init__(self):
-        """初始化唤醒检测器"""
+    def __init__(self, capture=None):
+        """初始化唤醒检测器
+        
+        capture 为常驻采集（AudioCapture）时与语音识别共享同一个麦克风流，
+        唤醒后命令录音从唤醒词结束处开始。
+        """
         self.is_running = False
         self.is_listening = False
         self.wake_queue = Queue()
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self.capture = capture
+        self.microphone = capture.source() if capture else sr.Microphone()
         
         # 配置识别器
         with self.microphone as source:
@@ -22,7 +37,27 @@ class WakeDetector:
             self.recognizer.energy_threshold = 4000
             
         # 唤醒词配置
-        self.wake_phrase = "小王小王"
+        self.wake_phrase = WAKE_CONFIG['wake_phrase']
+        
+        # 分级检测：能量门限 -> 模板匹配 -> Whisper 确认
+        self.registry = get_registry()
+        self.telemetry = get_telemetry()
+        self.scheduler = get_scheduler()
+        self.energy_gate = EnergyGate()
+        self.keyword_matcher = KeywordMatcher()
+        self.stats = {
+            'chunks': 0,
+            'energy_rejected': 0,
+            'keyword_rejected': 0,
+            'whisper_rejected': 0,
+            'wakes': 0,
+            # 模板不确定或定期回退、仍交给 Whisper 确认的片段数
+            'keyword_uncertain': 0,
+            'keyword_fallback': 0,
+            # 监听线程自身的 CPU 时间，以及同期整个进程的 CPU 时间（含 Whisper 的 intra-op 线程池）
+            'thread_cpu_seconds': {'energy': 0.0, 'keyword': 0.0, 'whisper': 0.0},
+            'process_cpu_seconds': {'energy': 0.0, 'keyword': 0.0, 'whisper': 0.0},
+        }
         
     def start(self):
         """启动后台监听"""
@@ -40,32 +75,156 @@ class WakeDetector:
             self.is_running = False
             if self.stop_listening:
                 self.stop_listening(wait_for_stop=False)
+            self.report_stats()
+    
+    @contextmanager
+    def _tier(self, name: str):
+        """统计每一级检测的 CPU 时间
+
+        线程 CPU 只含监听线程（Whisper 确认时不含 intra-op 线程池，偏低）；
+        进程 CPU 含线程池，但也包含同时运行的解码线程（偏高）。
+        """
+        start = time.thread_time()
+        process_start = time.process_time()
+        try:
+            with self.telemetry.span(f"wake_{name}"):
+                yield
+        finally:
+            self.stats['thread_cpu_seconds'][name] += time.thread_time() - start
+            self.stats['process_cpu_seconds'][name] += time.process_time() - process_start
+    
+    def _count(self, key: str):
+        """更新本地统计和埋点计数器"""
+        self.stats[key] += 1
+        self.telemetry.increment('wake_chunks_total', result=key)
+    
+    def get_stats(self) -> dict:
+        """返回各级检测的拒绝计数和 CPU 时间"""
+        stats = dict(self.stats)
+        stats['thread_cpu_seconds'] = dict(self.stats['thread_cpu_seconds'])
+        stats['process_cpu_seconds'] = dict(self.stats['process_cpu_seconds'])
+        return stats
+    
+    def report_stats(self):
+        """显示各级检测统计"""
+        table = Table(show_header=True, header_style="bold magenta", title="Wake Detection")
+        table.add_column("Tier", style="cyan")
+        table.add_column("Rejected", style="green")
+        table.add_column("Thread CPU s", style="green")
+        table.add_column("Process CPU s", style="green")
+        for tier in ('energy', 'keyword', 'whisper'):
+            table.add_row(
+                tier,
+                str(self.stats[f'{tier}_rejected']),
+                f"{self.stats['thread_cpu_seconds'][tier]:.3f}",
+                f"{self.stats['process_cpu_seconds'][tier]:.3f}",
+            )
+        console.print(table)
+        console.print(f"[blue]共 {self.stats['chunks']} 段音频，唤醒 {self.stats['wakes']} 次"
+                      f"（模板不确定 {self.stats['keyword_uncertain']} 次、定期回退 {self.stats['keyword_fallback']} 次交给 Whisper）[/blue]")
             
     def _audio_callback(self, recognizer, audio):
         """音频回调处理"""
         if not self.is_running:
             return
-            
+        # 后台监听线程使用唤醒检测的线程预算，不与识别争抢核心
+        self.scheduler.configure_thread('wake')
+        # 回调在监听线程中同步执行，此时的读取位置就是 listen 返回时的位置
+        listen_end = self.microphone.stream.position if self.capture else None
+        with self.telemetry.span('wake_callback'):
+            self._handle_audio(audio, listen_end)
+    
+    def _handle_audio(self, audio, listen_end: int = None):
         try:
-            # 使用本地 Whisper 模型进行识别
-            text = recognizer.recognize_whisper(
-                audio,
-                model="tiny",
-                language="zh"
-            )
+            self.stats['chunks'] += 1
+            samples = pcm_to_float32(np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16))
             
-            text = text.lower().strip()
+            # 第一级：帧能量门限，静音和环境噪声直接丢弃
+            with self._tier('energy'):
+                bounds = self.energy_gate.speech_bounds(samples, audio.sample_rate)
+            if bounds is None:
+                self._count('energy_rejected')
+                return
+            speech = samples[bounds[0]:bounds[1]]
+            
+            # 第二级：频谱模板匹配
+            with self._tier('keyword'):
+                is_candidate = self.keyword_matcher.match(speech, audio.sample_rate)
+            if not is_candidate:
+                self._count('keyword_rejected')
+                return
+            if self.keyword_matcher.last_reason in ('uncertain', 'fallback'):
+                self._count(f"keyword_{self.keyword_matcher.last_reason}")
+            
+            # 第三级：只对候选片段使用本地 Whisper 模型确认（与语音识别共享同一模型，解码时持有模型的推理锁）
+            model = self.registry.get(WAKE_CONFIG['model'])
+            with self._tier('whisper'), self.registry.inference_lock(model):
+                result = model.transcribe(
+                    to_whisper_input(samples, audio.sample_rate),
+                    language="zh",
+                    fp16=self.registry.default_device() == "cuda",
+                    # 词时间戳用于从片段中截出唤醒词，登记为模板
+                    word_timestamps=True,
+                )
+            
+            text = result['text'].lower().strip()
             if self.wake_phrase in text:
+                self._count('wakes')
+                self._enroll_wake_phrase(samples, bounds, result, audio.sample_rate)
                 console.print("[green]已唤醒！[/green]")
+                self._mark_command_start(audio, result, listen_end)
                 self.wake_queue.put(True)
                 time.sleep(0.5)  # 防止重复触发
+            else:
+                self._count('whisper_rejected')
                 
-        except sr.UnknownValueError:
-            pass  # 忽略无法识别的音频
         except Exception as e:
             if self.is_running:
                 console.print(f"[red]监听错误: {str(e)}[/red]")
                 
+    def _wake_phrase_end(self, result: dict):
+        """根据词时间戳找到唤醒词结束的时间（秒），找不到时返回 None"""
+        heard = ''
+        for segment in result.get('segments', []):
+            for word in segment.get('words') or []:
+                heard += word['word'].strip().lower()
+                if self.wake_phrase in heard:
+                    return word['end']
+        return None
+    
+    def _enroll_wake_phrase(self, samples: np.ndarray, bounds: tuple, result: dict, sample_rate: int):
+        """只把唤醒词部分（语音开始到唤醒词结束）登记为模板，不包含其后的命令"""
+        end_seconds = self._wake_phrase_end(result)
+        if end_seconds is None:
+            return
+        end = min(bounds[1], int(end_seconds * sample_rate))
+        # 太短说明时间戳不可靠，不登记
+        if (end - bounds[0]) / sample_rate < WAKE_CONFIG['energy']['min_speech_seconds']:
+            return
+        self.keyword_matcher.enroll(samples[bounds[0]:end], sample_rate)
+    
+    def _mark_command_start(self, audio, result: dict, listen_end: int):
+        """让接下来的命令录音从唤醒词结束处（减去预留时长）开始，避免丢失开头的音节
+
+        起点为片段在采集时间轴上的起点加上唤醒词结束的时间戳；
+        没有词时间戳时视为整段都是唤醒词，从片段结尾开始。
+        """
+        if not self.capture or listen_end is None:
+            return
+        frame_data = audio.get_raw_data()
+        # listen 丢掉的末尾静音不超过 pause_threshold 加一块
+        max_trailing = self.capture.seconds_to_frames(self.recognizer.pause_threshold) + self.capture.chunk
+        phrase_start = self.capture.find_phrase_start(frame_data, listen_end, max_trailing)
+        if phrase_start is None:
+            return
+        wake_end = self._wake_phrase_end(result)
+        if wake_end is None:
+            command_start = phrase_start + len(frame_data) // audio.sample_width
+        else:
+            command_start = phrase_start + self.capture.seconds_to_frames(wake_end)
+        preroll = self.capture.seconds_to_frames(self.capture.config['preroll_seconds'])
+        self.capture.rewind_to(max(phrase_start, command_start - preroll))
+    
     def wait_for_wake(self):
         """等待唤醒"""
         return self.wake_queue.get()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+import os
+from scipy.signal import find_peaks
+import time
+
+from src.audio_pipeline import frame_energy_db, frame_signal
+from config.settings import WAKE_CONFIG
+
+
+class EnergyGate:
+    """第一级：帧能量门限，过滤静音和低能量噪声"""
+
+    def __init__(self, config: dict = None):
+        self.config = config or WAKE_CONFIG['energy']
+        self.noise_floor_db = None
+
+    def speech_bounds(self, samples: np.ndarray, sample_rate: int):
+        """返回语音的起止采样点 (start, end)，能量不足时返回 None"""
+        hop_length = max(1, int(sample_rate * self.config['hop_ms'] / 1000))
+        energy = frame_energy_db(samples, sample_rate, self.config['frame_ms'], self.config['hop_ms'])
+
+        # 用每段音频中最安静的帧持续跟踪噪声基底
+        floor = float(np.percentile(energy, 10))
+        if self.noise_floor_db is None:
+            self.noise_floor_db = floor
+        else:
+            self.noise_floor_db = 0.9 * self.noise_floor_db + 0.1 * floor
+
+        threshold = max(self.noise_floor_db + self.config['margin_db'], self.config['min_level_db'])
+        speech_frames = np.flatnonzero(energy > threshold)
+        if len(speech_frames) * self.config['hop_ms'] / 1000 < self.config['min_speech_seconds']:
+            return None
+
+        start = int(speech_frames[0] * hop_length)
+        end = min(len(samples), int((speech_frames[-1] + 1) * hop_length))
+        return start, end
+
+
+@lru_cache(maxsize=8)
+def _band_matrix(sample_rate: int, n_fft: int, n_bands: int) -> np.ndarray:
+    """Mel 刻度三角滤波器组（缓存）"""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)[:, None]
+    to_mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    mel_points = np.linspace(to_mel(80.0), to_mel(min(7600.0, sample_rate / 2)), n_bands + 2)
+    hz = 700.0 * (10 ** (mel_points / 2595.0) - 1.0)
+    lower, center, upper = hz[:-2], hz[1:-1], hz[2:]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def spectral_features(samples: np.ndarray, sample_rate: int, n_bands: int) -> np.ndarray:
+    """计算对数频带能量特征，并做均值方差归一化"""
+    frame_length = int(sample_rate * 0.025)
+    hop_length = int(sample_rate * 0.010)
+    n_fft = 1 << (frame_length - 1).bit_length()
+    frames = frame_signal(samples, frame_length, hop_length) * np.hanning(frame_length).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, n=n_fft, axis=1)) ** 2
+    features = np.log(power @ _band_matrix(sample_rate, n_fft, n_bands) + 1e-10)
+    features -= features.mean(axis=0)
+    features /= features.std() + 1e-5
+    return features.astype(np.float32)
+
+
+def subsequence_dtw(template: np.ndarray, query: np.ndarray) -> float:
+    """子序列 DTW：模板可以匹配查询中的任意一段，返回按模板长度归一化的距离"""
+    # 帧间欧氏距离矩阵（模板帧 x 查询帧）
+    cost = (template ** 2).sum(axis=1)[:, None] + (query ** 2).sum(axis=1)[None, :] - 2.0 * template @ query.T
+    cost = np.sqrt(np.maximum(cost, 0.0)) / np.sqrt(template.shape[1])
+
+    # 每一步模板前进一帧，查询前进 0~2 帧，使整行可以向量化计算
+    accumulated = cost[0].copy()
+    for row in cost[1:]:
+        best = accumulated.copy()
+        best[1:] = np.minimum(best[1:], accumulated[:-1])
+        best[2:] = np.minimum(best[2:], accumulated[:-2])
+        accumulated = row + best
+    return float(accumulated.min() / len(template))
+
+
+class KeywordMatcher:
+    """第二级：轻量级频谱模板匹配，只有疑似唤醒词才交给 Whisper 确认
+
+    模板只能在 Whisper 确认唤醒后登记。为了不让一个登记得不好的模板、换了说话人或环境
+    把唤醒永久挡住，距离落在不确定区间的片段、以及连续被拒一定次数后的下一个多音节片段，
+    仍交给 Whisper 确认；确认后登记的新模板替换最久没有匹配上的模板。
+    """
+
+    def __init__(self, config: dict = None):
+        self.config = config or WAKE_CONFIG['keyword']
+        self.template_dir = Path(self.config['template_dir'])
+        # 模板文件名带登记时间，按从旧到新排序
+        self.template_paths = sorted(self.template_dir.glob('*.npy')) if self.template_dir.exists() else []
+        self.templates = [np.load(path) for path in self.template_paths]
+        # 每个模板最近一次匹配成功的时间，替换模板时淘汰最久未匹配的
+        self.last_matched = [path.stat().st_mtime for path in self.template_paths]
+        self.last_distance = None
+        # 本次判断的依据：syllables / template / uncertain / fallback / rejected
+        self.last_reason = None
+        self._rejections = 0
+
+    def match(self, samples: np.ndarray, sample_rate: int) -> bool:
+        """判断语音片段是否可能包含唤醒词"""
+        # 尚未登记模板时，退化为音节数检查
+        if not self.templates:
+            self.last_reason = 'syllables'
+            return self._count_syllables(samples, sample_rate) >= self.config['min_syllables']
+
+        features = spectral_features(samples, sample_rate, self.config['n_bands'])
+        distances = [subsequence_dtw(template, features) for template in self.templates]
+        best = int(np.argmin(distances))
+        self.last_distance = distances[best]
+        if self.last_distance <= self.config['max_distance']:
+            self.last_matched[best] = time.time()
+            # 修改时间记录最近匹配，重启后仍能判断哪个模板最久没用
+            os.utime(self.template_paths[best])
+            return self._accept('template')
+        if self.last_distance <= self.config['uncertain_distance']:
+            return self._accept('uncertain')
+
+        # 模板可能已不适用：定期放一个多音节片段给 Whisper，确认后会登记新模板
+        self._rejections += 1
+        if self._rejections >= self.config['fallback_every'] \
+                and self._count_syllables(samples, sample_rate) >= self.config['min_syllables']:
+            return self._accept('fallback')
+        self.last_reason = 'rejected'
+        return False
+
+    def _accept(self, reason: str) -> bool:
+        self.last_reason = reason
+        self._rejections = 0
+        return True
+
+    def enroll(self, samples: np.ndarray, sample_rate: int):
+        """Whisper 确认唤醒后，登记唤醒词部分的音频作为新模板
+
+        samples 应只包含唤醒词（调用方按 Whisper 的词时间戳裁掉其后的命令语音）。
+        模板数达到上限时替换最久没有匹配上的模板，使模板跟随说话人和环境的变化。
+        """
+        features = spectral_features(samples, sample_rate, self.config['n_bands'])
+        while len(self.templates) >= self.config['max_templates']:
+            stale = int(np.argmin(self.last_matched))
+            self.templates.pop(stale)
+            self.last_matched.pop(stale)
+            self.template_paths.pop(stale).unlink(missing_ok=True)
+        self.template_dir.mkdir(parents=True, exist_ok=True)
+        path = self.template_dir / f"template_{time.time_ns()}.npy"
+        np.save(path, features)
+        self.templates.append(features)
+        self.template_paths.append(path)
+        self.last_matched.append(time.time())
+
+    def _count_syllables(self, samples: np.ndarray, sample_rate: int) -> int:
+        """根据平滑后的能量包络估计音节数"""
+        energy = frame_energy_db(samples, sample_rate)
+        envelope = np.convolve(energy, np.ones(5) / 5, mode='same')
+        peaks, _ = find_peaks(envelope, prominence=6.0, distance=12)
+        return len(peaks)
@@ -0,0 +1,72 @@
+"""测试公共夹具：仓库根目录加入导入路径，本地 Ollama 桩服务，随机权重的小 Whisper 模型"""
+from pathlib import Path
+import sys
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.stub_ollama import start_stub_server  # noqa: E402
+from config.settings import CACHE_CONFIG, OLLAMA_CONFIG  # noqa: E402
+
+# 两级模型级联，与 config/settings.py 的默认配置一致
+SMALL_MODEL = 'qwen2.5:3b'
+LARGE_MODEL = 'qwen2.5:32b'
+
+
+@pytest.fixture
+def stub_ollama(monkeypatch):
+    """启动桩服务并让 TextProcessor 连接它：small / large 两级，关闭翻译缓存
+
+    返回的工厂函数接受 start_stub_server 的配置，例如小模型的 max_source_chars。
+    """
+    servers = []
+
+    def start(small_profile: dict = None, **config):
+        config = {'first_token_latency': 0.01, 'token_interval': 0.0, **config}
+        server = start_stub_server(
+            models=[SMALL_MODEL, LARGE_MODEL],
+            model_profiles={SMALL_MODEL: small_profile or {}},
+            **config,
+        )
+        servers.append(server)
+        monkeypatch.setitem(OLLAMA_CONFIG, 'host', server.url)
+        monkeypatch.setitem(OLLAMA_CONFIG, 'tiers', [
+            {'name': 'small', 'model': SMALL_MODEL, 'max_chars': 40, 'max_clauses': 2},
+            {'name': 'large', 'model': LARGE_MODEL},
+        ])
+        monkeypatch.setitem(CACHE_CONFIG, 'enabled', False)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch, tmp_path):
+    """whisper.load_model 返回随机权重的小模型（不下载），模型缓存目录指向临时目录
+
+    返回记录了每次加载的模型名的列表。
+    """
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+    from config.settings import MODEL_CONFIG
+
+    loads = []
+
+    def load_model(name, device=None, download_root=None, **kwargs):
+        loads.append(name)
+        torch.manual_seed(len(loads))
+        dims = ModelDimensions(
+            n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=2,
+            n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=2,
+        )
+        return Whisper(dims).to(device or 'cpu').eval()
+
+    monkeypatch.setattr(whisper, 'load_model', load_model)
+    monkeypatch.setitem(MODEL_CONFIG, 'cache_dir', tmp_path / 'model_cache')
+    return loads
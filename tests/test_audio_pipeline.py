@@ -0,0 +1,94 @@
+"""音频预处理：降噪滤波、Whisper 输入转换和首尾静音裁剪"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.signal import sosfilt
+
+import pytest
+
+from config.settings import TRIM_CONFIG
+from src.audio_pipeline import WHISPER_SAMPLE_RATE, AudioPreprocessor, speech_bounds, to_whisper_input
+
+
+def _noise(seconds: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * sample_rate)) * 3000).astype(np.int16)
+
+
+def test_to_whisper_input_resamples_pcm16_to_16k_float32():
+    samples = (np.sin(np.arange(44100) * 2 * np.pi * 440 / 44100) * 16000).astype(np.int16)
+
+    audio = to_whisper_input(samples, 44100)
+
+    assert audio.dtype == np.float32
+    assert len(audio) == WHISPER_SAMPLE_RATE
+    assert 0.4 < np.abs(audio).max() <= 1.0
+
+
+def test_to_whisper_input_keeps_16k_audio():
+    samples = np.zeros(1600, dtype=np.int16)
+
+    assert len(to_whisper_input(samples, WHISPER_SAMPLE_RATE)) == 1600
+
+
+def test_process_is_stateless():
+    preprocessor = AudioPreprocessor(sample_rate=16000)
+    clip = _noise(1.0)
+
+    first = preprocessor.process(clip).copy()
+    preprocessor.process(_noise(1.0, seed=1))
+    preprocessor.process_chunk(_noise(0.1, seed=2))
+
+    np.testing.assert_array_equal(preprocessor.process(clip), first)
+
+
+def test_process_matches_across_threads():
+    preprocessor = AudioPreprocessor(sample_rate=16000)
+    clips = [_noise(0.5, seed=seed) for seed in range(8)]
+    expected = [AudioPreprocessor(sample_rate=16000).process(clip) for clip in clips]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(preprocessor.process, clips * 4))
+
+    for index, result in enumerate(results):
+        np.testing.assert_array_equal(result, expected[index % len(clips)])
+
+
+def test_process_chunk_continues_filter_state():
+    clip = _noise(1.0)
+    whole = AudioPreprocessor(sample_rate=16000)
+    chunked = AudioPreprocessor(sample_rate=16000)
+
+    zi = np.zeros((whole.sos.shape[0], 2), dtype=np.float32)
+    expected, _ = sosfilt(whole.sos, clip.astype(np.float32) / 32768.0, zi=zi)
+    streamed = np.concatenate([chunked.process_chunk(chunk) for chunk in np.array_split(clip, 10)])
+
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+
+def _level(seconds: float, amplitude: float, seed: int = 1) -> np.ndarray:
+    """[-1, 1] 的 float32 噪声，amplitude 为标准差"""
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * 16000)) * amplitude).astype(np.float32)
+
+
+def test_speech_bounds_trims_padding_silence():
+    samples = np.concatenate([_level(1.0, 0.0005), _level(1.0, 0.1), _level(1.0, 0.0005)])
+
+    start, end = speech_bounds(samples, 16000, TRIM_CONFIG)
+
+    pad = TRIM_CONFIG['pad_seconds']
+    assert start / 16000 == pytest.approx(1.0 - pad, abs=0.03)
+    assert end / 16000 == pytest.approx(2.0 + pad, abs=0.03)
+
+
+def test_speech_bounds_keeps_steady_loud_clip():
+    # 没有停顿的响亮语音：噪声基底就是语音电平
+    samples = _level(2.0, 0.1)
+
+    assert speech_bounds(samples, 16000, TRIM_CONFIG) == (0, len(samples))
+
+
+def test_speech_bounds_skips_silence():
+    assert speech_bounds(_level(2.0, 0.0005), 16000, TRIM_CONFIG) is None
+    assert speech_bounds(np.zeros(32000, dtype=np.float32), 16000, TRIM_CONFIG) is None
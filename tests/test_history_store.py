@@ -0,0 +1,99 @@
+"""识别历史：后台批量写入、全文检索（trigram / 二元组 / LIKE）和旧数据库升级"""
+import sqlite3
+
+from src.history_store import HistoryStore, cjk_bigrams
+
+ENTRIES = [
+    ('今天天气很好', 'The weather is nice today'),
+    ('明天早上见面吧', 'See you tomorrow morning'),
+    ('天气预报说明天下雨，记得带伞', 'The forecast says rain tomorrow'),
+]
+
+
+def _store(tmp_path, **kwargs) -> HistoryStore:
+    store = HistoryStore(db_path=tmp_path / 'history.db', markdown_file='', **kwargs)
+    for original, enhanced in ENTRIES:
+        store.add(original, enhanced, entry_type='fast')
+    store.flush()
+    return store
+
+
+def _ids(results: list) -> list:
+    return [entry['id'] for entry in results]
+
+
+def test_cjk_bigrams_per_word_run():
+    assert cjk_bigrams('记得带伞，好') == '记得 得带 带伞 伞 好'
+
+
+def test_long_query_uses_trigram_index(tmp_path):
+    store = _store(tmp_path)
+
+    assert _ids(store.search('说明天')) == [3]
+    assert _ids(store.search('tomorrow')) == [3, 2]
+
+
+def test_short_queries_use_bigram_index(tmp_path):
+    store = _store(tmp_path)
+    statements = []
+    store._db.set_trace_callback(statements.append)
+
+    assert _ids(store.search('天气')) == [3, 1]
+    assert _ids(store.search('明天')) == [3, 2]
+    assert _ids(store.search('伞')) == [3]
+    assert _ids(store.search('天')) == [3, 2, 1]
+    assert not any('LIKE' in statement for statement in statements)
+
+
+def test_short_query_with_punctuation_falls_back_to_scan(tmp_path):
+    store = _store(tmp_path)
+
+    assert _ids(store.search('，记')) == [3]
+    assert _ids(store.search('')) == [3, 2, 1]
+
+
+def test_deleted_entries_leave_both_indexes(tmp_path):
+    store = _store(tmp_path)
+
+    with store._db:
+        store._db.execute('DELETE FROM entries WHERE id = 3')
+
+    assert _ids(store.search('天气')) == [1]
+    assert _ids(store.search('说明天')) == []
+
+
+def test_markdown_mirror_appended(tmp_path):
+    markdown = tmp_path / 'whisperpen.md'
+    store = HistoryStore(db_path=tmp_path / 'history.db', markdown_file=markdown)
+    store.add('今天天气很好', 'The weather is nice today')
+    store.flush()
+
+    text = markdown.read_text(encoding='utf-8')
+    assert '### Original Text\n今天天气很好' in text
+    assert '### Enhanced Text\nThe weather is nice today' in text
+
+
+def test_old_database_backfills_bigram_index(tmp_path):
+    db_path = tmp_path / 'history.db'
+    # 没有 entries_bigram 的旧版数据库
+    db = sqlite3.connect(str(db_path))
+    db.executescript(
+        'CREATE TABLE entries (id INTEGER PRIMARY KEY, created_at REAL NOT NULL, '
+        'original TEXT NOT NULL, enhanced TEXT NOT NULL, type TEXT);'
+        "CREATE VIRTUAL TABLE entries_fts USING fts5("
+        "original, enhanced, content='entries', content_rowid='id', tokenize='trigram');"
+        'CREATE TRIGGER entries_ai AFTER INSERT ON entries BEGIN '
+        'INSERT INTO entries_fts (rowid, original, enhanced) VALUES (new.id, new.original, new.enhanced); END;'
+    )
+    db.executemany('INSERT INTO entries (created_at, original, enhanced) VALUES (0, ?, ?)', ENTRIES)
+    db.commit()
+    db.close()
+
+    store = HistoryStore(db_path=db_path, markdown_file='')
+
+    assert _ids(store.search('天气')) == [3, 1]
+    assert _ids(store.search('伞')) == [3]
+    # 升级后的新记录同样进入二元组索引
+    store.add('带伞出门', 'Take an umbrella')
+    store.flush()
+    assert _ids(store.search('伞')) == [4, 3]
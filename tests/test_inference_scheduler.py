@@ -0,0 +1,59 @@
+"""推理线程调度：split 策略的进程级线程数，以及工作进程线程预算不被覆盖"""
+import threading
+
+import pytest
+import torch
+
+from config.settings import INFERENCE_CONFIG
+from src import inference_scheduler
+from src.inference_scheduler import InferenceScheduler, set_process_threads
+
+SPLIT = {**INFERENCE_CONFIG, 'policy': 'split', 'pin_cores': False}
+
+
+@pytest.fixture(autouse=True)
+def restore_threads(monkeypatch):
+    monkeypatch.setattr(inference_scheduler, '_process_threads', None)
+    threads = torch.get_num_threads()
+    yield
+    torch.set_num_threads(threads)
+
+
+def _threads_in_role(scheduler, role: str) -> int:
+    """在新线程中配置角色并做一次并行计算，返回该线程实际生效的线程数"""
+    seen = []
+
+    def run():
+        scheduler.configure_thread(role)
+        torch.ones(64, 64) @ torch.ones(64, 64)
+        seen.append(torch.get_num_threads())
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    return seen[0]
+
+
+def test_split_shares_cores_between_concurrent_decodes():
+    scheduler = InferenceScheduler(config=SPLIT, cores=list(range(6)))
+
+    assert {role: plan['threads'] for role, plan in scheduler.plan.items()} == {'fast': 3, 'accurate': 3, 'wake': 3}
+    assert _threads_in_role(scheduler, 'fast') == 3
+
+
+def test_worker_thread_budget_survives_configure_thread():
+    # 批量转写的工作进程：cpu_count // workers
+    set_process_threads(1)
+    scheduler = InferenceScheduler(config=SPLIT, cores=list(range(8)))
+
+    assert scheduler.plan['fast']['threads'] == 1
+    assert _threads_in_role(scheduler, 'fast') == 1
+    assert _threads_in_role(scheduler, 'accurate') == 1
+    assert torch.get_num_threads() == 1
+
+
+def test_default_policy_leaves_threads_alone():
+    torch.set_num_threads(2)
+    scheduler = InferenceScheduler(config={**SPLIT, 'policy': 'default'}, cores=list(range(8)))
+
+    assert _threads_in_role(scheduler, 'fast') == 2
@@ -0,0 +1,75 @@
+"""长录音转写的流式 VAD 切分"""
+import numpy as np
+import pytest
+
+from config.settings import INGEST_CONFIG
+from src.ingest import SilenceSegmenter
+
+SAMPLE_RATE = 16000
+
+
+def _noise(seconds: float, rng) -> np.ndarray:
+    return rng.normal(0, 30, int(seconds * SAMPLE_RATE))
+
+
+def _tone(seconds: float, rng) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 8000 * np.sin(2 * np.pi * 440 * t) + rng.normal(0, 30, len(t))
+
+
+def _recording(*parts) -> np.ndarray:
+    """parts 为 ('noise' | 'tone', 秒数) 序列，返回 int16 音频"""
+    rng = np.random.default_rng(0)
+    return np.concatenate([(_tone if kind == 'tone' else _noise)(seconds, rng) for kind, seconds in parts]).astype(np.int16)
+
+
+def _segment(audio: np.ndarray, **config) -> list:
+    segmenter = SilenceSegmenter(SAMPLE_RATE, config={**INGEST_CONFIG, **config})
+    segments = []
+    for offset in range(0, len(audio), segmenter.block_size):
+        segments.extend(segmenter.feed(audio[offset:offset + segmenter.block_size]))
+    return segments + segmenter.flush()
+
+
+def test_splits_at_pauses_with_padding():
+    audio = _recording(('noise', 1), ('tone', 1.5), ('noise', 1), ('tone', 1), ('noise', 1))
+
+    segments = _segment(audio)
+
+    pad = INGEST_CONFIG['pad_seconds']
+    assert [(begin, end) for begin, end, _ in segments] == [
+        (pytest.approx(1.0 - pad, abs=0.05), pytest.approx(2.5 + pad, abs=0.05)),
+        (pytest.approx(3.5 - pad, abs=0.05), pytest.approx(4.5 + pad, abs=0.05)),
+    ]
+    for begin, end, samples in segments:
+        # 16kHz float32，峰值归一化
+        assert samples.dtype == np.float32
+        assert len(samples) == pytest.approx((end - begin) * 16000, abs=1)
+        assert np.abs(samples).max() <= 1.0
+
+
+def test_short_bursts_dropped():
+    audio = _recording(('noise', 1), ('tone', 0.1), ('noise', 1))
+
+    assert _segment(audio) == []
+
+
+def test_long_speech_force_split_below_max_length():
+    audio = _recording(('noise', 0.5), ('tone', 5), ('noise', 1))
+
+    segments = _segment(audio, max_segment_seconds=2.0)
+
+    assert len(segments) >= 3
+    assert all(end - begin <= 2.0 for begin, end, _ in segments)
+    # 强制切分的片段首尾相接，不丢音频
+    assert all(previous[1] == current[0] for previous, current in zip(segments, segments[1:]))
+
+
+def test_silence_does_not_grow_buffer():
+    segmenter = SilenceSegmenter(SAMPLE_RATE)
+    audio = _recording(('noise', 30))
+
+    for offset in range(0, len(audio), segmenter.block_size):
+        assert segmenter.feed(audio[offset:offset + segmenter.block_size]) == []
+
+    assert segmenter._length <= 2 * segmenter.pad_frames + segmenter.frames_per_block
@@ -0,0 +1,152 @@
+"""进程级模型注册表：复用、LRU 淘汰、推理锁、量化检查点校验和工作进程共享权重"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import pytest
+
+from config.settings import MODEL_CONFIG
+from src import model_registry
+from src.model_registry import ModelRegistry, model_footprint, process_memory
+
+
+def test_get_reuses_loaded_model(fake_whisper, tmp_path):
+    registry = ModelRegistry(cache_dir=tmp_path)
+
+    first = registry.get('tiny', device='cpu', quantization='none')
+
+    assert registry.get('tiny', device='cpu', quantization='none') is first
+    assert fake_whisper == ['tiny']
+
+
+def test_concurrent_get_loads_once(fake_whisper, tmp_path):
+    registry = ModelRegistry(cache_dir=tmp_path)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        models = list(executor.map(lambda _: registry.get('tiny', device='cpu', quantization='none'), range(8)))
+
+    assert all(model is models[0] for model in models)
+    assert fake_whisper == ['tiny']
+
+
+def test_evicts_least_recently_used_over_memory_cap(fake_whisper, tmp_path):
+    registry = ModelRegistry(cache_dir=tmp_path)
+    tiny = registry.get('tiny', device='cpu', quantization='none')
+    # 只容得下两个模型
+    registry.memory_cap = int(model_footprint(tiny) * 2.5)
+    registry.get('base', device='cpu', quantization='none')
+    registry.get('tiny', device='cpu', quantization='none')
+
+    registry.get('small', device='cpu', quantization='none')
+
+    assert [entry['name'] for entry in registry.stats()] == ['tiny', 'small']
+    assert registry.total_bytes() <= registry.memory_cap
+
+
+def test_inference_lock_is_per_model_instance(fake_whisper, tmp_path):
+    registry = ModelRegistry(cache_dir=tmp_path)
+    tiny = registry.get('tiny', device='cpu', quantization='none')
+    base = registry.get('base', device='cpu', quantization='none')
+
+    assert registry.inference_lock(tiny) is registry.inference_lock(tiny)
+    assert registry.inference_lock(tiny) is not registry.inference_lock(base)
+
+
+def _load_source(cache_dir, quantization='none') -> str:
+    """用新的注册表（模拟下次启动）加载 tiny 模型，返回加载来源"""
+    registry = ModelRegistry(cache_dir=cache_dir)
+    registry.get('tiny', device='cpu', quantization=quantization)
+    return registry.stats()[0]['source']
+
+
+def test_checkpoint_reused_without_rehash(fake_whisper, tmp_path, monkeypatch):
+    assert _load_source(tmp_path) == 'fresh'
+    hashed = []
+    monkeypatch.setattr(model_registry, '_file_sha256', lambda path: hashed.append(path) or 'unused')
+
+    assert _load_source(tmp_path) == 'checkpoint'
+    assert fake_whisper == ['tiny']
+    # 大小和修改时间未变，不重新哈希
+    assert hashed == []
+
+
+def test_touched_checkpoint_rehashed_once(fake_whisper, tmp_path, monkeypatch):
+    _load_source(tmp_path)
+    checkpoint = next(tmp_path.glob('*.pt'))
+    os.utime(checkpoint, ns=(0, 0))
+    real_sha256 = model_registry._file_sha256
+    hashed = []
+    monkeypatch.setattr(model_registry, '_file_sha256', lambda path: hashed.append(path) or real_sha256(path))
+
+    assert _load_source(tmp_path) == 'checkpoint'
+    assert _load_source(tmp_path) == 'checkpoint'
+    # 内容未变：第一次重新哈希后记录新的修改时间
+    assert hashed == [checkpoint]
+
+
+def test_corrupt_checkpoint_regenerated(fake_whisper, tmp_path):
+    _load_source(tmp_path)
+    checkpoint = next(tmp_path.glob('*.pt'))
+    data = bytearray(checkpoint.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    checkpoint.write_bytes(bytes(data))
+
+    assert _load_source(tmp_path) == 'fresh'
+    assert _load_source(tmp_path) == 'checkpoint'
+    assert fake_whisper == ['tiny', 'tiny']
+
+
+def test_checkpoint_invalidated_by_format_change(fake_whisper, tmp_path, monkeypatch):
+    _load_source(tmp_path)
+    monkeypatch.setattr(model_registry, 'CHECKPOINT_FORMAT', model_registry.CHECKPOINT_FORMAT + 1)
+
+    assert _load_source(tmp_path) == 'fresh'
+
+
+def test_int8_checkpoint_quantizes_whisper_linears(fake_whisper, tmp_path):
+    import torch
+
+    registry = ModelRegistry(cache_dir=tmp_path)
+    fp32 = model_footprint(registry.get('tiny', device='cpu', quantization='none'))
+    model = registry.get('tiny', device='cpu', quantization='int8')
+
+    assert not any(type(module) is torch.nn.Linear for module in model.modules())
+    assert model_footprint(model) < fp32
+    assert _load_source(tmp_path, quantization='int8') == 'checkpoint'
+
+
+def test_few_workers_get_private_int8_checkpoints(fake_whisper, tmp_path):
+    registry = ModelRegistry(cache_dir=tmp_path)
+
+    assert registry.prepare_worker_weights(['tiny', 'tiny'], workers=2) is False
+    assert [path.name for path in tmp_path.glob('*.pt')] == ['whisper_tiny_cpu_int8.pt']
+    assert fake_whisper == ['tiny']
+
+
+def test_many_workers_share_fp32_checkpoint(fake_whisper, tmp_path):
+    workers = MODEL_CONFIG['shared_weights_min_workers']
+    assert ModelRegistry(cache_dir=tmp_path).prepare_worker_weights(['tiny'], workers=workers) is True
+    assert [path.name for path in tmp_path.glob('*.pt')] == ['whisper_tiny_cpu_none.pt']
+
+    # 工作进程：内存映射加载父进程准备的 fp32 检查点，不再加载原始权重
+    worker = ModelRegistry(cache_dir=tmp_path)
+    worker.use_shared_weights()
+    worker.get('tiny', device='cpu')
+
+    assert worker.stats()[0]['quantization'] == 'none'
+    assert worker.stats()[0]['source'] == 'checkpoint'
+    assert fake_whisper == ['tiny']
+
+
+def test_private_worker_weights_setting(fake_whisper, tmp_path, monkeypatch):
+    monkeypatch.setitem(MODEL_CONFIG, 'worker_weights', 'private')
+
+    assert ModelRegistry(cache_dir=tmp_path).prepare_worker_weights(['tiny'], workers=16) is False
+
+
+def test_process_memory_reports_rss():
+    memory = process_memory()
+
+    assert memory['rss'] > 0
+    if 'anon' in memory:
+        # Linux：RSS 由私有匿名页、文件页和共享内存组成
+        assert memory['anon'] + memory['file'] + memory.get('shmem', 0) == pytest.approx(memory['rss'], rel=0.05)
@@ -0,0 +1,112 @@
+"""持续模式流水线：停止（Ctrl+C）后已采集的语音全部输出"""
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src.pipeline import SpeechPipeline
+
+CONFIG = {'queue_size': 50, 'listen_timeout': 1, 'phrase_time_limit': 5}
+
+
+class FakeSource:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeRecognizer:
+    """每 0.1 秒“录到”一句，内容为序号"""
+
+    def __init__(self):
+        self.captured = 0
+
+    def listen(self, source, timeout, phrase_time_limit):
+        time.sleep(0.1)
+        self.captured += 1
+        return self.captured
+
+
+class FakeBatchDecoder:
+    def choose_batch_size(self, pending: int) -> int:
+        return 1
+
+
+class FakeSpeechHandler:
+    """识别比采集慢，停止时识别队列中有积压"""
+
+    def __init__(self):
+        self.recognizer = FakeRecognizer()
+        self.batch_decoder = FakeBatchDecoder()
+
+    def quick_ambient_check(self, source):
+        pass
+
+    def preprocess(self, audio):
+        return audio
+
+    def transcribe_samples(self, samples):
+        time.sleep(0.2)
+        return {'original': str(samples), 'type': 'fast'}
+
+    def get_trim_stats(self) -> dict:
+        return {'trim_ratio': 0.0, 'skipped': 0, 'clips': 0}
+
+    def get_cpu_stats(self) -> dict:
+        empty = {'fast_decode': 0.0, 'accurate_decode': 0.0, 'cancelled': 0.0}
+        return {'thread': empty, 'process': empty, 'cancelled_decodes': 0}
+
+
+class FakeTextProcessor:
+    def enhance_text(self, text: str) -> str:
+        return text.upper()
+
+    def enhance_texts(self, texts: list) -> list:
+        return [text.upper() for text in texts]
+
+
+class FakeFileHandler:
+    def __init__(self):
+        self.saved = []
+
+    def save_and_copy(self, original_text, enhanced_text, entry_type=None):
+        self.saved.append(original_text)
+
+
+def _pipeline():
+    handler, file_handler = FakeSpeechHandler(), FakeFileHandler()
+    pipeline = SpeechPipeline(handler, FakeTextProcessor(), file_handler, config=CONFIG, source_factory=FakeSource)
+    return pipeline, handler, file_handler
+
+
+def test_stop_drains_queued_utterances():
+    pipeline, handler, file_handler = _pipeline()
+    threading.Timer(0.8, pipeline.stop).start()
+
+    pipeline.run()
+
+    # 停止时仍在队列中的语音也全部输出
+    assert handler.recognizer.captured > 3
+    assert sorted(file_handler.saved, key=int) == [str(i) for i in range(1, handler.recognizer.captured + 1)]
+    assert pipeline._in_flight == 0
+
+
+def test_sigint_drains_queued_utterances():
+    # 与 main.py 持续模式一致：SIGINT 抛出 KeyboardInterrupt，由流水线处理
+    previous = signal.signal(signal.SIGINT, signal.default_int_handler)
+    pipeline, handler, file_handler = _pipeline()
+    threading.Timer(0.8, os.kill, (os.getpid(), signal.SIGINT)).start()
+
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            pipeline.run()
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+    assert handler.recognizer.captured > 3
+    assert len(file_handler.saved) == handler.recognizer.captured
+    assert pipeline._in_flight == 0
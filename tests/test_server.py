@@ -0,0 +1,153 @@
+"""常驻服务的 JSON Lines 协议：客户端调用、错误响应、套接字清理和关闭"""
+import json
+import socket
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from config.settings import SERVER_CONFIG
+from src.client import WhisperPenClient
+from src.server import WhisperPenServer
+
+
+class FakeSpeechHandler:
+    def __init__(self):
+        self.audio = []
+
+    def transcribe_file(self, path: str) -> dict:
+        return {'original': f'file:{path}', 'type': 'fast'}
+
+    def transcribe_audio(self, audio, fast_timeout=None, accurate_timeout=None) -> dict:
+        self.audio.append(audio)
+        return {'original': '你好', 'type': 'fast', 'confidence': np.float32(0.5)}
+
+    def record_and_transcribe(self) -> dict:
+        return {'original': '录音', 'type': 'accurate'}
+
+
+class FakeTextProcessor:
+    def enhance_text(self, text: str) -> str:
+        return f'en:{text}'
+
+    def enhance_texts(self, texts: list) -> list:
+        return [f'en:{text}' for text in texts]
+
+
+class FakeFileHandler:
+    def __init__(self):
+        self.saved = []
+
+    def save_and_copy(self, original_text, enhanced_text, entry_type=None):
+        self.saved.append((original_text, enhanced_text, entry_type))
+
+
+@pytest.fixture
+def server(tmp_path):
+    instance = WhisperPenServer(
+        FakeSpeechHandler(), FakeTextProcessor(), FakeFileHandler(),
+        socket_path=tmp_path / 'whisperpen.sock',
+        config={**SERVER_CONFIG, 'max_request_bytes': 64 * 1024},
+    )
+    thread = threading.Thread(target=instance.serve, daemon=True)
+    thread.start()
+    yield instance
+    instance.shutdown()
+    thread.join(5)
+
+
+def _raw_call(server, payload: bytes) -> bytes:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(str(server.socket_path))
+        sock.sendall(payload)
+        return sock.makefile('rb').readline()
+
+
+def test_requests_share_one_connection(server):
+    with WhisperPenClient(server.socket_path, timeout=5) as client:
+        assert client.call('enhance', text='你好') == {'enhanced': 'en:你好'}
+        assert client.call('enhance', texts=['一', '二']) == {'enhanced': ['en:一', 'en:二']}
+        assert client.call('ping')['requests'] == 3
+
+
+def test_errors_returned_as_responses(server):
+    with WhisperPenClient(server.socket_path, timeout=5) as client:
+        with pytest.raises(Exception, match='未知方法'):
+            client.call('delete_everything')
+        with pytest.raises(Exception, match='缺少 text 参数'):
+            client.call('enhance')
+        # 出错后连接仍可继续使用
+        assert client.call('ping')['pid'] > 0
+
+    response = json.loads(_raw_call(server, b'not json\n'))
+    assert response['ok'] is False and response['id'] is None
+
+
+def test_oversized_request_rejected(server):
+    line = json.dumps({'id': 1, 'method': 'enhance', 'params': {'text': 'x' * 70 * 1024}}).encode() + b'\n'
+
+    response = json.loads(_raw_call(server, line))
+
+    assert response['ok'] is False
+    assert '字节' in response['error']
+
+
+def test_uploaded_wav_uses_first_channel(server, tmp_path):
+    path = tmp_path / 'stereo.wav'
+    frames = np.array([[1, -1], [2, -2], [3, -3]], dtype=np.int16)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(frames.tobytes())
+
+    with WhisperPenClient(server.socket_path, timeout=5) as client:
+        result = client.transcribe_wav(path)
+
+    # numpy 标量可以序列化
+    assert result == {'original': '你好', 'type': 'fast', 'confidence': 0.5, 'duration': 3 / 16000}
+    audio = server.speech_handler.audio[0]
+    assert np.frombuffer(audio.frame_data, dtype=np.int16).tolist() == [1, 2, 3]
+    assert audio.sample_rate == 16000
+
+
+def test_record_enhances_and_saves(server):
+    with WhisperPenClient(server.socket_path, timeout=5) as client:
+        result = client.call('record')
+
+    assert result['enhanced'] == 'en:录音'
+    assert server.file_handler.saved == [('录音', 'en:录音', 'accurate')]
+
+
+def test_second_server_on_live_socket_refused(server):
+    with pytest.raises(Exception, match='已在运行'):
+        WhisperPenServer(None, None, None, socket_path=server.socket_path)
+
+
+def test_stale_socket_file_replaced(tmp_path):
+    path = tmp_path / 'whisperpen.sock'
+    # 异常退出后遗留的套接字文件：文件存在但没有进程监听
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+
+    instance = WhisperPenServer(FakeSpeechHandler(), FakeTextProcessor(), FakeFileHandler(), socket_path=path)
+    instance.close()
+
+    assert not path.exists()
+
+
+def test_shutdown_request_stops_server_and_removes_socket(tmp_path):
+    instance = WhisperPenServer(FakeSpeechHandler(), FakeTextProcessor(), FakeFileHandler(),
+                                socket_path=tmp_path / 'whisperpen.sock')
+    thread = threading.Thread(target=instance.serve, daemon=True)
+    thread.start()
+
+    with WhisperPenClient(instance.socket_path, timeout=5) as client:
+        assert client.call('shutdown') == {'stopping': True}
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert not instance.socket_path.exists()
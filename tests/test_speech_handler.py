@@ -0,0 +1,49 @@
+"""SpeechHandler：内存中的音频交给 Whisper，不依赖 ffmpeg；解码 CPU 时间统计"""
+from src.model_registry import ModelRegistry
+from src.speech_handler import SpeechHandler
+
+
+def test_starts_without_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setenv('PATH', str(tmp_path))
+    monkeypatch.setenv('HOME', str(tmp_path))
+
+    handler = SpeechHandler()
+
+    assert handler.preprocessor is not None
+
+
+def _decode_setup(tmp_path):
+    import numpy as np
+
+    handler = SpeechHandler()
+    handler.registry = ModelRegistry(cache_dir=tmp_path)
+    model = handler.registry.get('tiny', device='cpu', quantization='none')
+    audio = np.random.default_rng(0).normal(0, 0.1, 16000).astype(np.float32)
+    return handler, model, audio
+
+
+def test_decode_records_thread_and_process_cpu(fake_whisper, tmp_path):
+    handler, model, audio = _decode_setup(tmp_path)
+
+    result = handler._transcribe_with_model(model, audio, stage='fast_decode', temperature=0.0)
+
+    assert 0 < result['thread_cpu_seconds'] <= result['process_cpu_seconds']
+    cpu = handler.get_cpu_stats()
+    # 线程 CPU 是下限，进程 CPU 是上限
+    assert result['thread_cpu_seconds'] <= cpu['thread']['fast_decode'] <= cpu['process']['fast_decode']
+    assert cpu['cancelled_decodes'] == 0
+
+
+def test_cancelled_decode_counted_until_cancel(fake_whisper, tmp_path):
+    import threading
+
+    handler, model, audio = _decode_setup(tmp_path)
+    cancel = threading.Event()
+    cancel.set()
+
+    assert handler._transcribe_with_model(model, audio, cancel_event=cancel, stage='accurate_decode') is None
+
+    cpu = handler.get_cpu_stats()
+    assert cpu['cancelled_decodes'] == 1
+    assert cpu['thread']['cancelled'] == cpu['thread']['accurate_decode']
+    assert cpu['process']['cancelled'] == cpu['process']['accurate_decode']
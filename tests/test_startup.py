@@ -0,0 +1,13 @@
+"""CLI 启动回归：--help 在时间预算内完成，且不导入重量级依赖"""
+import statistics
+
+from benchmarks.startup import DEFAULT_BUDGET, HEAVY_MODULES, imported_heavy_modules, time_help
+
+
+def test_help_within_budget():
+    assert statistics.median(time_help(runs=3)) <= DEFAULT_BUDGET
+
+
+def test_main_does_not_import_heavy_modules():
+    assert {'whisper', 'torch', 'scipy', 'speech_recognition', 'ollama'} <= set(HEAVY_MODULES)
+    assert imported_heavy_modules() == []
@@ -0,0 +1,21 @@
+"""会话级性能分析：工作线程中的调用也写入 pstats 文件"""
+import pstats
+import threading
+
+from src.telemetry import profile_session
+
+
+def _work_in_thread():
+    return sum(i * i for i in range(10000))
+
+
+def test_profile_session_includes_worker_threads(tmp_path):
+    output = tmp_path / 'session.prof'
+
+    with profile_session(str(output)):
+        worker = threading.Thread(target=_work_in_thread)
+        worker.start()
+        worker.join()
+
+    functions = {name for _, _, name in pstats.Stats(str(output)).stats}
+    assert '_work_in_thread' in functions
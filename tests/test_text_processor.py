@@ -0,0 +1,108 @@
+"""TextProcessor 与 Ollama 桩服务的集成测试：模型级联升级、批量回退和首 token 时间"""
+import pytest
+
+from src.telemetry import Telemetry
+from src.text_processor import TextProcessor
+
+# 与 conftest 中的级联配置一致
+SMALL_MODEL = 'qwen2.5:3b'
+LARGE_MODEL = 'qwen2.5:32b'
+
+# 小模型在桩服务中处理不超过 10 个字符的原文，更长的拒答
+SHORT_TEXT = '今天天气很好'
+OTHER_SHORT_TEXT = '明天早上见面吧'
+LONG_TEXT = '我们明天早上九点在公司门口集合'
+
+
+def _chat_models(server) -> list:
+    """桩服务收到的非预热 chat 请求依次使用的模型"""
+    return [request['model'] for request in server.request_log if request.get('messages')]
+
+
+def test_short_text_served_by_small_tier(stub_ollama):
+    server = stub_ollama(small_profile={'max_source_chars': 10})
+    processor = TextProcessor()
+
+    assert processor.enhance_text(SHORT_TEXT) == 'This is a stub translation of 6 characters.'
+    assert processor.last_tier == 'small'
+    assert _chat_models(server) == [SMALL_MODEL]
+
+
+def test_refusal_escalates_to_large_tier(stub_ollama):
+    server = stub_ollama(small_profile={'max_source_chars': 10})
+    processor = TextProcessor()
+
+    assert processor.enhance_text(LONG_TEXT) == f'This is a stub translation of {len(LONG_TEXT)} characters.'
+    assert processor.last_tier == 'large'
+    assert _chat_models(server) == [SMALL_MODEL, LARGE_MODEL]
+    tiers = processor.get_stats()['tiers']
+    assert tiers['small']['escalated'] == 1
+    assert tiers['large']['served'] == 1
+
+
+def test_batch_falls_back_for_rejected_items(stub_ollama):
+    server = stub_ollama(small_profile={'max_source_chars': 10})
+    processor = TextProcessor()
+
+    results = processor.enhance_texts([SHORT_TEXT, LONG_TEXT])
+
+    assert results == [
+        'This is a stub translation of 6 characters.',
+        f'This is a stub translation of {len(LONG_TEXT)} characters.',
+    ]
+    stats = processor.get_stats()
+    assert stats['batched_calls'] == 1
+    assert stats['fallback_items'] == 1
+    # 被拒答的条目直接从下一级开始逐条请求
+    assert _chat_models(server) == [SMALL_MODEL, LARGE_MODEL]
+    assert server.request_log[-2]['format'] == 'json'
+
+
+def test_failed_batch_request_falls_back_to_single_requests(stub_ollama):
+    server = stub_ollama()
+    processor = TextProcessor()
+    # 小模型在启动检查之后被删除：批量请求和小模型的逐条请求都返回 404
+    server.models.remove(SMALL_MODEL)
+
+    results = processor.enhance_texts([SHORT_TEXT, OTHER_SHORT_TEXT])
+
+    assert results == ['This is a stub translation of 6 characters.', 'This is a stub translation of 7 characters.']
+    stats = processor.get_stats()
+    assert stats['fallback_items'] == 2
+    assert stats['tiers']['large']['served'] == 2
+    assert _chat_models(server) == [SMALL_MODEL, SMALL_MODEL, LARGE_MODEL, SMALL_MODEL, LARGE_MODEL]
+
+
+def test_ttft_recorded_for_cold_and_warm_requests(stub_ollama):
+    stub_ollama(first_token_latency=0.05, load_latency=0.1)
+    processor = TextProcessor()
+    processor.telemetry = telemetry = Telemetry()
+
+    processor.enhance_text(SHORT_TEXT)
+    cold = processor.last_metrics
+    processor.enhance_text(OTHER_SHORT_TEXT)
+    warm = processor.last_metrics
+
+    assert cold['cold'] and not warm['cold']
+    # 冷启动的首 token 时间包含模型加载
+    assert cold['ttft'] >= 0.15
+    assert 0.05 <= warm['ttft'] < cold['ttft']
+    metrics = telemetry.render_prometheus()
+    prefix = telemetry.config['prefix']
+    assert f'{prefix}_llm_ttft_seconds_count{{cold="True"}} 1' in metrics
+    assert f'{prefix}_llm_ttft_seconds_count{{cold="False"}} 1' in metrics
+
+
+def test_cold_start_inferred_from_load_duration(stub_ollama, monkeypatch):
+    stub_ollama(load_latency=0.1)
+    processor = TextProcessor()
+    # 冷热判断不再在每次请求前查询已加载的模型
+    monkeypatch.setattr(processor.client, 'ps', lambda: pytest.fail('ps() called per request'))
+
+    processor.enhance_text(SHORT_TEXT)
+    cold = processor.last_metrics
+    processor.enhance_text(OTHER_SHORT_TEXT)
+    warm = processor.last_metrics
+
+    assert cold['cold'] and cold['load_seconds'] >= 0.1
+    assert not warm['cold'] and warm['load_seconds'] < 0.05
@@ -0,0 +1,72 @@
+"""两级翻译缓存：归一化键、TTL 过期和磁盘容量淘汰"""
+from src import translation_cache
+from src.translation_cache import TranslationCache
+
+
+def _cache(tmp_path, **config) -> TranslationCache:
+    return TranslationCache(db_path=tmp_path / 'translations.db', **config)
+
+
+def _disk_keys(cache) -> set:
+    return {row[0] for row in cache._db.execute('SELECT key FROM translations')}
+
+
+def test_key_ignores_spacing_case_and_trailing_punctuation():
+    assert TranslationCache.make_key('  Hello   World。', 'm', 1, {}) == TranslationCache.make_key('hello world', 'm', 1, {})
+    assert TranslationCache.make_key('hello', 'm', 1, {}) != TranslationCache.make_key('hello', 'm', 2, {})
+
+
+def test_persisted_entry_served_from_disk(tmp_path):
+    _cache(tmp_path).put('k', 'v')
+    cache = _cache(tmp_path)
+
+    assert cache.get('k') == 'v'
+    assert cache.get('k') == 'v'
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+
+def test_expired_entry_removed(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, 'time', lambda: now[0])
+    _cache(tmp_path, ttl_seconds=60).put('k', 'v')
+    cache = _cache(tmp_path, ttl_seconds=60)
+    now[0] += 61
+
+    assert cache.get('k') is None
+    assert _disk_keys(cache) == set()
+    assert cache._disk_entries == 0
+
+
+def test_evicts_least_recently_accessed_over_capacity(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, 'time', lambda: now[0])
+    cache = _cache(tmp_path, memory_entries=1, max_entries=10)
+    for i in range(10):
+        now[0] += 1
+        cache.put(f'k{i}', 'v')
+    # k0 从磁盘命中后成为最近访问
+    now[0] += 1
+    assert cache.get('k0') == 'v'
+
+    now[0] += 1
+    cache.put('k10', 'v')
+
+    # 超出容量时多淘汰 10%：k1、k2 被淘汰
+    assert _disk_keys(cache) == {f'k{i}' for i in range(11)} - {'k1', 'k2'}
+    assert cache._disk_entries == 9
+
+
+def test_put_does_not_count_rows(tmp_path):
+    cache = _cache(tmp_path, max_entries=10)
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+
+    for i in range(10):
+        cache.put(f'k{i}', 'v')
+    # 覆盖已有条目不增加计数
+    cache.put('k0', 'v2')
+
+    assert not any('COUNT' in statement for statement in statements)
+    assert cache._disk_entries == 10
+    assert len(_disk_keys(cache)) == 10
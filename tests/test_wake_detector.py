@@ -0,0 +1,104 @@
+"""唤醒后命令录音的起点：常驻采集时间轴上的片段起点 + 唤醒词结束时间 - 预留时长"""
+import numpy as np
+import speech_recognition as sr
+
+from config.settings import CAPTURE_CONFIG
+from src.audio_capture import AudioCapture
+from src.wake_detector import WakeDetector
+
+SAMPLE_RATE = 16000
+CHUNK = 1024
+
+
+def _signal() -> tuple:
+    """静音 1s、唤醒词 0.8s、命令 1s、静音 1.5s，返回 (int16 音频, 唤醒词与命令的分界帧)"""
+    rng = np.random.default_rng(0)
+    t = lambda seconds: np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    quiet = lambda seconds: rng.normal(0, 20, len(t(seconds)))
+    wake = 6000 * np.sin(2 * np.pi * 300 * t(0.8)) + quiet(0.8)
+    command = 6000 * np.sin(2 * np.pi * 700 * t(1.0)) + quiet(1.0)
+    audio = np.concatenate([quiet(1.0), wake, command, quiet(1.5)]).astype(np.int16)
+    return audio, int(1.8 * SAMPLE_RATE)
+
+
+class FileStream:
+    def __init__(self, data: bytes):
+        self.data, self.offset = data, 0
+
+    def read(self, size: int) -> bytes:
+        chunk = self.data[self.offset:self.offset + size * 2]
+        self.offset += len(chunk)
+        return chunk
+
+
+class FileSource(sr.AudioSource):
+    """按块回放音频的“麦克风”，供 AudioCapture 采集"""
+
+    SAMPLE_RATE = SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    CHUNK = CHUNK
+
+    def __init__(self, audio: np.ndarray):
+        self.stream = FileStream(audio.tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _detector(capture) -> WakeDetector:
+    """只设置 _mark_command_start 用到的属性，不打开麦克风、不加载模型"""
+    detector = WakeDetector.__new__(WakeDetector)
+    detector.capture = capture
+    detector.wake_phrase = '小王小王'
+    detector.recognizer = sr.Recognizer()
+    detector.recognizer.energy_threshold = 1000
+    detector.recognizer.dynamic_energy_threshold = False
+    return detector
+
+
+def _listen(capture, detector) -> tuple:
+    """与后台监听相同：从环形缓冲区开头读取一句，返回 (片段, 回调时的读取位置)"""
+    capture.rewind_to(0)
+    with capture.source() as source:
+        return detector.recognizer.listen(source), source.stream.position
+
+
+def test_command_starts_at_wake_phrase_end_minus_preroll():
+    audio, boundary = _signal()
+    capture = AudioCapture(source_factory=lambda: FileSource(audio)).start()
+    detector = _detector(capture)
+
+    clip, listen_end = _listen(capture, detector)
+    clip_start = audio.tobytes().find(clip.get_raw_data()) // 2
+    # listen 返回时已读过片段结尾之后的停顿
+    assert listen_end > clip_start + len(clip.get_raw_data()) // 2
+    result = {'segments': [{'words': [
+        {'word': '小王', 'end': (boundary - SAMPLE_RATE * 0.4 - clip_start) / SAMPLE_RATE},
+        {'word': '小王', 'end': (boundary - clip_start) / SAMPLE_RATE},
+        {'word': '打开', 'end': (boundary + SAMPLE_RATE * 0.5 - clip_start) / SAMPLE_RATE},
+    ]}]}
+
+    detector._mark_command_start(clip, result, listen_end)
+
+    preroll = int(CAPTURE_CONFIG['preroll_seconds'] * SAMPLE_RATE)
+    with capture.source() as command:
+        assert command.stream.position == boundary - preroll
+        head = np.frombuffer(command.stream.read(CHUNK), dtype=np.int16)
+    assert np.array_equal(head, audio[boundary - preroll:boundary - preroll + CHUNK])
+
+
+def test_command_starts_after_clip_without_word_timestamps():
+    audio, _ = _signal()
+    capture = AudioCapture(source_factory=lambda: FileSource(audio)).start()
+    detector = _detector(capture)
+    clip, listen_end = _listen(capture, detector)
+
+    detector._mark_command_start(clip, {'segments': []}, listen_end)
+
+    clip_end = audio.tobytes().find(clip.get_raw_data()) // 2 + len(clip.get_raw_data()) // 2
+    preroll = int(CAPTURE_CONFIG['preroll_seconds'] * SAMPLE_RATE)
+    with capture.source() as command:
+        assert command.stream.position == clip_end - preroll
@@ -0,0 +1,116 @@
+"""唤醒词前两级：能量门限、频谱模板匹配（子序列 DTW）和模板登记"""
+import numpy as np
+import pytest
+
+from src.wake_gate import EnergyGate, KeywordMatcher, spectral_features, subsequence_dtw
+
+SAMPLE_RATE = 16000
+
+
+def syllables(freqs: list, seed: int = 0, seconds: float = 0.2, gap: float = 0.1) -> np.ndarray:
+    """合成“音节”：每个频率一段加窗正弦，中间是低电平噪声"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for freq in freqs:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        parts.append(0.5 * np.sin(2 * np.pi * freq * t) * np.hanning(len(t)) + 0.01 * rng.standard_normal(len(t)))
+        parts.append(0.01 * rng.standard_normal(int(gap * SAMPLE_RATE)))
+    return np.concatenate(parts).astype(np.float32)
+
+
+WAKE = [400, 800, 1200, 600]
+OTHER = [2500, 150, 3000, 200]
+
+
+@pytest.fixture
+def matcher_config(tmp_path):
+    return {
+        'n_bands': 24,
+        'max_distance': 0.6,
+        'uncertain_distance': 0.9,
+        'fallback_every': 3,
+        'min_syllables': 2,
+        'max_templates': 2,
+        'template_dir': tmp_path / 'templates',
+    }
+
+
+def test_dtw_finds_template_inside_longer_query():
+    template = spectral_features(syllables(WAKE), SAMPLE_RATE, 24)
+    padded = np.concatenate([syllables(OTHER[:2], seed=1), syllables(WAKE, seed=2), syllables(OTHER[2:], seed=3)])
+
+    assert subsequence_dtw(template, spectral_features(padded, SAMPLE_RATE, 24)) < 0.6
+    assert subsequence_dtw(template, spectral_features(syllables(OTHER), SAMPLE_RATE, 24)) > 0.9
+
+
+def test_energy_gate_bounds_speech_in_silence():
+    gate = EnergyGate({'frame_ms': 20, 'hop_ms': 10, 'margin_db': 10.0, 'min_level_db': -50.0, 'min_speech_seconds': 0.4})
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    speech = syllables(WAKE)
+
+    assert gate.speech_bounds(silence, SAMPLE_RATE) is None
+    start, end = gate.speech_bounds(np.concatenate([silence, speech, silence]), SAMPLE_RATE)
+    assert SAMPLE_RATE - 800 <= start <= SAMPLE_RATE + 800
+    assert SAMPLE_RATE + len(speech) - 3200 <= end <= SAMPLE_RATE + len(speech) + 800
+
+
+def test_without_templates_counts_syllables(matcher_config):
+    matcher = KeywordMatcher(matcher_config)
+
+    assert matcher.match(syllables(WAKE), SAMPLE_RATE)
+    assert matcher.last_reason == 'syllables'
+    assert not matcher.match(np.zeros(SAMPLE_RATE, dtype=np.float32), SAMPLE_RATE)
+
+
+def test_template_match_and_rejection(matcher_config):
+    matcher = KeywordMatcher(matcher_config)
+    matcher.enroll(syllables(WAKE), SAMPLE_RATE)
+
+    assert matcher.match(syllables(WAKE, seed=3), SAMPLE_RATE)
+    assert matcher.last_reason == 'template'
+    assert not matcher.match(syllables(OTHER), SAMPLE_RATE)
+    assert matcher.last_reason == 'rejected'
+
+
+def test_uncertain_distance_still_goes_to_whisper(matcher_config):
+    matcher = KeywordMatcher({**matcher_config, 'max_distance': 0.1, 'uncertain_distance': 0.5})
+    matcher.enroll(syllables(WAKE), SAMPLE_RATE)
+
+    assert matcher.match(syllables(WAKE, seed=3), SAMPLE_RATE)
+    assert matcher.last_reason == 'uncertain'
+
+
+def test_bad_template_does_not_lock_out_wakes(matcher_config):
+    matcher = KeywordMatcher(matcher_config)
+    # 登记得不好的模板：与实际唤醒词完全不同
+    matcher.enroll(syllables(OTHER), SAMPLE_RATE)
+
+    decisions = [matcher.match(syllables(WAKE, seed=seed), SAMPLE_RATE) for seed in range(3)]
+
+    assert decisions == [False, False, True]
+    assert matcher.last_reason == 'fallback'
+
+
+def test_fallback_skips_non_speech(matcher_config):
+    matcher = KeywordMatcher(matcher_config)
+    matcher.enroll(syllables(OTHER), SAMPLE_RATE)
+    noise = (np.random.default_rng(9).standard_normal(SAMPLE_RATE) * 0.2).astype(np.float32)
+
+    assert not any(matcher.match(noise, SAMPLE_RATE) for _ in range(5))
+
+
+def test_enroll_replaces_least_recently_matched_template(matcher_config):
+    matcher = KeywordMatcher(matcher_config)
+    matcher.enroll(syllables(WAKE), SAMPLE_RATE)
+    matcher.enroll(syllables(OTHER), SAMPLE_RATE)
+    wake_template = matcher.template_paths[0]
+    # 唤醒词模板刚匹配过，另一个模板最久没用
+    assert matcher.match(syllables(WAKE, seed=3), SAMPLE_RATE)
+
+    matcher.enroll(syllables(WAKE, seed=4), SAMPLE_RATE)
+
+    assert len(matcher.templates) == 2
+    assert wake_template in matcher.template_paths
+    assert sorted(matcher_config['template_dir'].glob('*.npy')) == sorted(matcher.template_paths)
+    # 重启后从目录加载同样的模板
+    assert len(KeywordMatcher(matcher_config).templates) == 2